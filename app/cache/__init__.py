@@ -0,0 +1,3 @@
+from .decorators import cached, get_stats, report_states, close, CacheStats
+
+__all__ = ("cached", "get_stats", "report_states", "close", "CacheStats")
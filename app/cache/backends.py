@@ -0,0 +1,48 @@
+import asyncio
+from typing import Any, Optional
+
+from aiocache.base import BaseCache
+
+from app.cache import sqlite
+from app.cache.memory import BoundedMemoryCache
+from app.cache.serializers import ModelSerializer
+from app.cache.sqlite import SQLiteCache
+from app.settings import settings
+
+
+def get_cache_config(name: str, max_size: Optional[int] = None) -> tuple[type[BaseCache], dict[str, Any]]:
+    """
+    Get the cache class to use for a cached function, and its arguments, depending on the configured backend.
+    :param name: The qualified name of the cached function, used as namespace by shared backends.
+    :param max_size: The maximum number of entries to keep, for backends that support it.
+    :return: The cache class, and the arguments to instantiate it.
+    """
+
+    backend = settings.cache.backend
+    namespace = f"{settings.cache.namespace}{name}:"
+
+    if backend == "sqlite":
+        return SQLiteCache, {"path": settings.cache.sqlite_path, "max_size": max_size, "namespace": namespace,
+                             "serializer": ModelSerializer()}
+
+    if backend == "redis":
+        try:
+            from aiocache import RedisCache
+        except ImportError:
+            raise RuntimeError("The redis cache backend requires the redis package, install the redis extra") from None
+        # Redis bounds its memory by itself, according to its eviction policy
+        return RedisCache, {"endpoint": settings.cache.redis_endpoint, "port": settings.cache.redis_port,
+                            "db": settings.cache.redis_db, "password": settings.cache.redis_password,
+                            "namespace": namespace, "serializer": ModelSerializer()}
+
+    return BoundedMemoryCache, {"max_size": max_size}
+
+
+async def close_caches(caches: list[BaseCache]) -> None:
+    """
+    Close caches and their connections. Called on application shutdown.
+    :param caches: The caches to close.
+    """
+
+    await asyncio.gather(*(cache.close() for cache in caches))
+    sqlite.close_connections()
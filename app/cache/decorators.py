@@ -0,0 +1,391 @@
+import asyncio
+import inspect
+import logging
+import time
+from dataclasses import dataclass, asdict
+from typing import Optional
+
+import aiocache
+from aiocache.base import SENTINEL
+from fastapi import HTTPException
+
+from app.cache.backends import get_cache_config, close_caches
+from app.cache.entry import CacheEntry, MissingEntry, create_entry
+from app.cache.memory import BoundedMemoryCache
+from app.cache.revalidation import NotModified, Revalidation, current_revalidation
+from app.metrics import current_endpoint, record_cache_event, record_cache_state
+from app.ratelimit import Priority, current_priority
+from app.timeouts import current_deadline
+from app.settings import settings
+from app.upstream import is_transient_error
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CacheStats:
+    """
+    Counters of a cached function.
+    """
+
+    hits: int = 0
+    misses: int = 0
+    coalesced: int = 0
+    stale: int = 0
+    stale_on_error: int = 0
+    refreshes: int = 0
+    refresh_errors: int = 0
+    not_modified: int = 0
+    prefetches: int = 0
+    missing_hits: int = 0
+
+
+# Every cached function of the application, by qualified name, so that their counters can be exposed
+registry: dict[str, "cached"] = {}
+
+
+class cached(aiocache.cached):
+    """
+    aiocache's cached decorator, with single-flight coalescing of concurrent cache misses and stale-while-revalidate.
+
+    While a value is being computed for a key, other callers for the same key do not call the function again: they wait
+    for the ongoing call and share its result, or its error. The computation runs in its own task, so that it completes
+    and fills the cache even if the caller that started it is cancelled.
+
+    Values are kept after their TTL expired. For ``stale_while_revalidate`` seconds, a stale value is returned
+    immediately while it is refreshed in the background. For ``stale_if_error`` seconds, a stale value is returned if
+    refreshing it fails because of a transient upstream error. Fresh values may also be refreshed in the background
+    shortly before they expire, with a probability growing as expiration gets closer, and TTLs are shortened by a
+    random jitter, so that entries cached together do not all expire together. Background refreshes and prefetches send
+    their upstream requests with a background priority, after the ones clients are waiting for.
+
+    When refreshing a value, the function may revalidate it upstream with
+    :func:`app.cache.revalidation.conditional_get`. If the upstream answers that it did not change, the function raises
+    :class:`NotModified` and the previous value is kept for another TTL, without computing it again.
+
+    Unless a cache class is given, values are stored in the backend configured in settings: in memory by default, or
+    in a store shared by all workers. The maximum number of entries can be set with the ``max_size`` argument.
+
+    Resources that do not exist upstream are cached separately, for ``negative_ttl`` seconds, in a cache bounded by its
+    own size so that probes for missing resources do not evict existing ones. The function tells that a resource does
+    not exist by returning None, or by raising a 404 :class:`HTTPException`, which is raised again for cached misses.
+    Transient upstream errors are never cached.
+
+    Counters of hits, misses, coalesced calls and refreshes are available as ``<function_name>.stats``.
+
+    Values fetched by other means, such as bulk requests, can be stored for given arguments with
+    ``<function_name>.set_cached(value, *args, **kwargs)``, and fresh values read without calling the function with
+    ``<function_name>.get_cached(*args, **kwargs)``. Arguments are normalized against the function signature, so that
+    passing them positionally, by keyword or through defaults maps to the same entry. Values can be refreshed ahead of
+    their expiration with ``<function_name>.prefetch(*args, within=seconds, **kwargs)``.
+    """
+
+    def __init__(self, *args, cache=None, max_size=None, stale_while_revalidate: Optional[int] = None,
+                 stale_if_error: Optional[int] = None, negative_ttl: Optional[int] = None, **kwargs):
+        super().__init__(*args, cache=cache, **kwargs)
+        self.max_size = max_size
+        self.stale_while_revalidate = stale_while_revalidate if stale_while_revalidate is not None \
+            else settings.cache.stale_while_revalidate_seconds
+        self.stale_if_error = stale_if_error if stale_if_error is not None \
+            else settings.cache.stale_if_error_seconds
+        self.negative_ttl = negative_ttl if negative_ttl is not None else settings.cache.negative_expiration_seconds
+        self.missing_cache: Optional[aiocache.base.BaseCache] = None
+        self.stats = CacheStats()
+        self._in_flight: dict[str, asyncio.Task] = {}
+        self.name: Optional[str] = None
+        self._function = None
+        self._signature: Optional[inspect.Signature] = None
+
+    def __call__(self, f):
+        name = f"{f.__module__}.{f.__qualname__}"
+        if self._cache is None:
+            self._cache, config = get_cache_config(name=name, max_size=self.max_size)
+            serializer, namespace = config.pop("serializer", None), config.pop("namespace", None)
+            self._serializer = self._serializer or serializer
+            self._namespace = self._namespace or namespace
+            self._kwargs = {**config, **self._kwargs}
+        elif self.max_size is not None:
+            self._kwargs["max_size"] = self.max_size
+
+        self.name = name
+        self._function = f
+        self._signature = inspect.signature(f)
+        wrapper = super().__call__(f)
+        if self.negative_ttl:
+            cache_class, config = get_cache_config(name=f"{name}:missing", max_size=settings.cache.negative_max_size)
+            self.missing_cache = aiocache.Cache(cache_class, **config)
+        wrapper.stats = self.stats
+        wrapper.get_cached = self.get_cached
+        wrapper.set_cached = self.set_cached
+        wrapper.prefetch = self.prefetch
+        registry[name] = self
+        return wrapper
+
+    async def decorator(self, f, *args, cache_read=True, cache_write=True, aiocache_wait_for_write=True, **kwargs):
+        key = self.get_cache_key(f, args, kwargs)
+
+        entry = await self.get_entry_from_cache(key) if cache_read else None
+        if entry is not None:
+            now = time.time()
+            if entry.is_fresh(now):
+                self._count("hits")
+                if entry.should_refresh_early(now, settings.cache.early_refresh_beta):
+                    self._refresh(f, key, args, kwargs, entry)
+                return entry.value
+            if entry.stale_seconds(now) < self.stale_while_revalidate:
+                self._count("stale")
+                self._refresh(f, key, args, kwargs, entry)
+                return entry.value
+        elif cache_read:
+            missing = await self.get_missing_from_cache(key)
+            if missing is not None:
+                self._count("missing_hits")
+                return self._missing_value(missing)
+
+        try:
+            return await self._call(f, key, args, kwargs, entry, cache_write=cache_write,
+                                    wait_for_write=aiocache_wait_for_write)
+        except Exception as error:
+            # Fall back to the stale value while the upstream is unavailable
+            if entry is not None and entry.stale_seconds(time.time()) < self.stale_if_error \
+                    and is_transient_error(error):
+                self._count("stale_on_error")
+                logger.warning("Serving stale value of %s, refreshing it failed: %r", key, error)
+                return entry.value
+            raise
+
+    async def _call(self, f, key, args, kwargs, previous: Optional[CacheEntry], cache_write: bool = True,
+                    wait_for_write: bool = True):
+        task = self._in_flight.get(key)
+        if task is not None:
+            self._count("coalesced")
+        else:
+            self._count("misses")
+            task = self._start(f, key, args, kwargs, previous, cache_write=cache_write, wait_for_write=wait_for_write)
+
+        # Shield the shared call, cancelling one caller must not cancel it for the others
+        return await asyncio.shield(task)
+
+    def _refresh(self, f, key, args, kwargs, previous: CacheEntry) -> None:
+        if key in self._in_flight:
+            return
+        self._count("refreshes")
+        task = self._start(f, key, args, kwargs, previous, background=True)
+        task.add_done_callback(lambda done: self._refresh_done(key, done))
+
+    def _start(self, f, key, args, kwargs, previous: Optional[CacheEntry], cache_write: bool = True,
+               wait_for_write: bool = True, background: bool = False) -> asyncio.Task:
+        task = asyncio.ensure_future(self._call_and_store(f, key, args, kwargs, previous, cache_write=cache_write,
+                                                          wait_for_write=wait_for_write, background=background))
+        self._in_flight[key] = task
+        task.add_done_callback(lambda done: self._call_done(key, done))
+        return task
+
+    async def _call_and_store(self, f, key, args, kwargs, previous: Optional[CacheEntry], cache_write: bool,
+                              wait_for_write: bool, background: bool = False):
+        start = time.monotonic()
+        # Runs in its own task, so the revalidation context is only seen by this call
+        revalidation = Revalidation(previous=previous)
+        current_revalidation.set(revalidation)
+        # Nobody waits for background calls, their upstream requests are sent after the ones of clients, and are not
+        # bound by the deadline of the request that started them
+        if background:
+            current_priority.set(Priority.BACKGROUND)
+            current_deadline.set(None)
+        current_endpoint.set(f.__name__)
+        try:
+            result = await f(*args, **kwargs)
+        except NotModified:
+            self._count("not_modified")
+            result = previous.value
+            entry = create_entry(result, ttl=self._get_ttl(), jitter=settings.cache.expiration_jitter,
+                                 compute_seconds=previous.compute_seconds, etag=previous.etag,
+                                 last_modified=previous.last_modified)
+        except HTTPException as error:
+            if error.status_code == 404 and cache_write:
+                await self._store(self.set_missing_in_cache(key, MissingEntry(detail=str(error.detail))),
+                                  wait_for_write)
+            raise
+        else:
+            if result is None:
+                if cache_write:
+                    await self._store(self.set_missing_in_cache(key, MissingEntry()), wait_for_write)
+                return result
+            if self.skip_cache_func(result) or not cache_write:
+                return result
+            entry = create_entry(result, ttl=self._get_ttl(), jitter=settings.cache.expiration_jitter,
+                                 compute_seconds=time.monotonic() - start, etag=revalidation.etag,
+                                 last_modified=revalidation.last_modified)
+
+        await self._store(self.set_entry_in_cache(key, entry), wait_for_write)
+        return result
+
+    @staticmethod
+    async def _store(write, wait_for_write: bool) -> None:
+        if wait_for_write:
+            await write
+        else:
+            asyncio.create_task(write)
+
+    def get_cache_key(self, f, args, kwargs):
+        if self.key or self.key_builder or self._signature is None:
+            return super().get_cache_key(f, args, kwargs)
+        # Key on every argument by name, whether it was given positionally, by keyword or left to its default
+        arguments = self._signature.bind(*args, **kwargs)
+        arguments.apply_defaults()
+        return super().get_cache_key(f, (), arguments.arguments)
+
+    async def get_cached(self, *args, **kwargs):
+        """
+        Get the fresh cached value for the given arguments, without calling the function.
+        :return: The cached value, or None if there is no fresh value.
+        """
+
+        entry = await self.get_entry_from_cache(self.get_cache_key(self._function, args, kwargs))
+        if entry is None or not entry.is_fresh(time.time()):
+            return None
+        self._count("hits")
+        return entry.value
+
+    async def set_cached(self, value, *args, **kwargs) -> None:
+        """
+        Store a value for the given arguments, as if the function returned it.
+        :param value: The value to store.
+        """
+
+        if value is None or self.skip_cache_func(value):
+            return
+        entry = create_entry(value, ttl=self._get_ttl(), jitter=settings.cache.expiration_jitter, compute_seconds=0.0)
+        await self.set_entry_in_cache(self.get_cache_key(self._function, args, kwargs), entry)
+
+    async def prefetch(self, *args, within: float = 0, **kwargs):
+        """
+        Make sure a value is cached for the given arguments, and stays fresh for at least the given time. Otherwise, it
+        is computed again, and revalidated if it was already cached.
+        :param within: How many seconds the cached value must stay fresh for not to be computed again.
+        :return: The value.
+        """
+
+        key = self.get_cache_key(self._function, args, kwargs)
+        entry = await self.get_entry_from_cache(key)
+        if entry is not None and (entry.fresh_until is None or entry.fresh_until - time.time() > within):
+            return entry.value
+        if entry is None:
+            missing = await self.get_missing_from_cache(key)
+            if missing is not None:
+                return self._missing_value(missing)
+
+        task = self._in_flight.get(key)
+        if task is None:
+            self._count("prefetches")
+            task = self._start(self._function, key, args, kwargs, entry, background=True)
+        return await asyncio.shield(task)
+
+    def _get_ttl(self) -> Optional[float]:
+        return None if self.ttl is SENTINEL else self.ttl
+
+    async def get_entry_from_cache(self, key: str) -> Optional[CacheEntry]:
+        entry = await self.get_from_cache(key)
+        # Shared caches may still hold values stored by a previous version of the application
+        if not isinstance(entry, CacheEntry):
+            return None
+        return entry
+
+    async def set_entry_in_cache(self, key: str, entry: CacheEntry):
+        ttl = self._get_ttl()
+        # Keep entries in the backend after they expired, for as long as they may be served stale
+        if ttl:
+            ttl += max(self.stale_while_revalidate, self.stale_if_error)
+        try:
+            await self.cache.set(key, entry, ttl=ttl)
+        except Exception:
+            logger.exception("Couldn't set key %s, unexpected error", key)
+        self.report_state()
+
+    async def get_missing_from_cache(self, key: str) -> Optional[MissingEntry]:
+        if self.missing_cache is None:
+            return None
+        try:
+            missing = await self.missing_cache.get(key)
+        except Exception:
+            logger.exception("Couldn't retrieve missing key %s, unexpected error", key)
+            return None
+        return missing if isinstance(missing, MissingEntry) else None
+
+    async def set_missing_in_cache(self, key: str, missing: MissingEntry):
+        if self.missing_cache is None:
+            return
+        try:
+            await self.missing_cache.set(key, missing, ttl=self.negative_ttl)
+            # The resource does not exist anymore, its stale value must not be served
+            await self.cache.delete(key)
+        except Exception:
+            logger.exception("Couldn't set missing key %s, unexpected error", key)
+        self.report_state()
+
+    @staticmethod
+    def _missing_value(missing: MissingEntry):
+        if missing.detail is not None:
+            raise HTTPException(status_code=404, detail=missing.detail)
+        return None
+
+    def _count(self, event: str) -> None:
+        setattr(self.stats, event, getattr(self.stats, event) + 1)
+        record_cache_event(self.name, event)
+
+    def report_state(self) -> None:
+        """
+        Report the entries and evictions of the caches of this worker to metrics.
+        """
+
+        record_cache_state(self.name, self.cache)
+        if self.missing_cache is not None:
+            record_cache_state(f"{self.name}:missing", self.missing_cache)
+
+    def _call_done(self, key: str, task: asyncio.Task):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        # Mark the error as retrieved, all callers may have been cancelled before it was raised
+        if not task.cancelled():
+            task.exception()
+
+    def _refresh_done(self, key: str, task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            self._count("refresh_errors")
+            logger.warning("Refreshing %s in the background failed: %r", key, task.exception())
+
+
+def get_stats() -> dict[str, dict[str, int]]:
+    """
+    Get the counters of every cached function.
+    :return: The counters, by qualified name of function.
+    """
+
+    stats = {}
+    for name, decorator in registry.items():
+        stats[name] = asdict(decorator.stats)
+        if isinstance(decorator.cache, BoundedMemoryCache):
+            stats[name].update(size=len(decorator.cache), bytes=decorator.cache.used_bytes)
+        if hasattr(decorator.cache, "evictions"):
+            stats[name]["evictions"] = decorator.cache.evictions
+        if isinstance(decorator.missing_cache, BoundedMemoryCache):
+            stats[name]["missing_size"] = len(decorator.missing_cache)
+    return stats
+
+
+def report_states() -> None:
+    """
+    Report the entries and evictions of the caches of every cached function of this worker to metrics.
+    """
+
+    for decorator in registry.values():
+        decorator.report_state()
+
+
+async def close() -> None:
+    """
+    Close the caches of every cached function. Called on application shutdown.
+    """
+
+    await close_caches([cache for decorator in registry.values()
+                        for cache in (decorator.cache, decorator.missing_cache) if cache is not None])
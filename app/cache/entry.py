@@ -0,0 +1,81 @@
+import math
+import random
+import time
+from typing import Any, Optional
+
+from pydantic import BaseModel
+
+
+class CacheEntry(BaseModel):
+    """
+    A cached value, along with the information needed to decide when to refresh it.
+
+    Times are wall-clock timestamps, as entries may be shared between processes.
+    """
+
+    value: Any
+    created_at: float
+    fresh_until: Optional[float]
+    compute_seconds: float = 0
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+    class Config:
+        frozen = True
+
+    def is_fresh(self, now: float) -> bool:
+        return self.fresh_until is None or now < self.fresh_until
+
+    def stale_seconds(self, now: float) -> float:
+        return 0 if self.is_fresh(now) else now - self.fresh_until
+
+    def should_refresh_early(self, now: float, beta: float) -> bool:
+        """
+        Decide whether a fresh entry should be refreshed before it expires, using probabilistic early expiration.
+
+        The closer the entry is to its expiration, and the longer it took to compute, the more likely a refresh is. This
+        way, a single caller usually refreshes a popular entry shortly before it expires, instead of all of them at once
+        after it expired.
+        :param now: The current time.
+        :param beta: How eagerly entries are refreshed. 0 disables early refreshes, higher values refresh earlier.
+        :return: Whether the entry should be refreshed now.
+        """
+
+        if beta <= 0 or self.fresh_until is None:
+            return False
+        # 1 - random() is in (0, 1], so that the logarithm is defined
+        return now - self.compute_seconds * beta * math.log(1 - random.random()) >= self.fresh_until
+
+
+class MissingEntry(BaseModel):
+    """
+    A cached absence of value, when the upstream answered that the requested resource does not exist.
+    """
+
+    # Detail of the 404 error raised by the function, or None if it returned None
+    detail: Optional[str] = None
+
+    class Config:
+        frozen = True
+
+
+def create_entry(value: Any, ttl: Optional[float], jitter: float, compute_seconds: float, etag: Optional[str] = None,
+                 last_modified: Optional[str] = None) -> CacheEntry:
+    """
+    Create an entry for a freshly computed value.
+    :param value: The value.
+    :param ttl: How many seconds the value stays fresh, or None if it never expires.
+    :param jitter: Fraction of the TTL by which it is randomly shortened, so that entries computed together do not all
+        expire together.
+    :param compute_seconds: How many seconds it took to compute the value.
+    :param etag: The ETag of the upstream response the value was computed from, if any.
+    :param last_modified: The Last-Modified date of the upstream response the value was computed from, if any.
+    :return: The entry.
+    """
+
+    now = time.time()
+    fresh_until = None
+    if ttl:
+        fresh_until = now + ttl * (1 - jitter * random.random())
+    return CacheEntry(value=value, created_at=now, fresh_until=fresh_until, compute_seconds=compute_seconds, etag=etag,
+                      last_modified=last_modified)
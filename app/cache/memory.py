@@ -0,0 +1,217 @@
+import sys
+import time
+import weakref
+from collections import OrderedDict
+from typing import Any, Optional
+
+from aiocache.base import BaseCache
+from aiocache.serializers import NullSerializer
+from pydantic import BaseModel
+
+from app.settings import settings
+
+
+def estimate_size(value: Any, _seen: Optional[set[int]] = None) -> int:
+    """
+    Estimate the memory used by a value, including the objects it references.
+    Objects referenced several times are only counted once.
+    :param value: The value to estimate the size of.
+    :return: The estimated size, in bytes.
+    """
+
+    if _seen is None:
+        _seen = set()
+    if id(value) in _seen:
+        return 0
+    _seen.add(id(value))
+
+    size = sys.getsizeof(value)
+    if isinstance(value, (str, bytes, int, float, bool)) or value is None:
+        return size
+    if isinstance(value, dict):
+        return size + sum(estimate_size(k, _seen) + estimate_size(v, _seen) for k, v in value.items())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return size + sum(estimate_size(item, _seen) for item in value)
+    if isinstance(value, BaseModel):
+        return size + estimate_size(value.__dict__, _seen)
+    if hasattr(value, "__dict__"):
+        return size + estimate_size(vars(value), _seen)
+    return size
+
+
+class MemoryBudget:
+    """
+    Total byte budget shared by all bounded memory caches of a worker.
+
+    When the budget is exceeded, least recently used entries of the biggest caches are evicted first.
+    """
+
+    def __init__(self, max_bytes: int = 0):
+        """
+        :param max_bytes: The maximum number of bytes used by all caches. 0 disables the budget.
+        """
+
+        self.max_bytes = max_bytes
+        self.used_bytes = 0
+        self._caches: weakref.WeakSet[BoundedMemoryCache] = weakref.WeakSet()
+
+    def register(self, cache: "BoundedMemoryCache") -> None:
+        self._caches.add(cache)
+
+    def enforce(self) -> None:
+        while self.max_bytes and self.used_bytes > self.max_bytes:
+            biggest = max(self._caches, key=lambda cache: cache.used_bytes, default=None)
+            if biggest is None or not biggest.evict_one():
+                break
+
+
+budget = MemoryBudget(settings.cache.max_memory_bytes)
+
+
+class BoundedMemoryCache(BaseCache):
+    """
+    Memory cache with a maximum number of entries, evicting least recently used entries first.
+
+    The size of every entry is estimated when it is stored, and accounted for in the worker's total byte budget.
+    Expired entries are removed lazily, when they are accessed or evicted.
+
+    Config options are the ones of :class:`aiocache.SimpleMemoryCache`, and:
+
+    :param max_size: int maximum number of entries kept. 0 or None means no limit.
+    :param memory_budget: :class:`MemoryBudget` byte budget this cache accounts for. Defaults to the worker's budget.
+    """
+
+    NAME = "bounded_memory"
+
+    def __init__(self, serializer=None, max_size: Optional[int] = None, memory_budget: MemoryBudget = budget,
+                 **kwargs):
+        super().__init__(serializer=serializer or NullSerializer(), **kwargs)
+        self.max_size = max_size
+        self.used_bytes = 0
+        self.evictions = 0
+        # Key to (value, estimated size, expiration time), from least to most recently used
+        self._cache: OrderedDict[str, tuple[Any, int, Optional[float]]] = OrderedDict()
+        self._budget = memory_budget
+        self._budget.register(self)
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def _lookup(self, key: str) -> Optional[tuple[Any, int, Optional[float]]]:
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        expires_at = entry[2]
+        if expires_at is not None and expires_at <= time.monotonic():
+            self._remove(key)
+            return None
+        return entry
+
+    def _remove(self, key: str) -> bool:
+        entry = self._cache.pop(key, None)
+        if entry is None:
+            return False
+        self.used_bytes -= entry[1]
+        self._budget.used_bytes -= entry[1]
+        return True
+
+    def evict_one(self) -> bool:
+        """
+        Evict the least recently used entry.
+        :return: Whether an entry was evicted.
+        """
+
+        if not self._cache:
+            return False
+        self._remove(next(iter(self._cache)))
+        self.evictions += 1
+        return True
+
+    async def _get(self, key, encoding="utf-8", _conn=None):
+        entry = self._lookup(key)
+        if entry is None:
+            return None
+        self._cache.move_to_end(key)
+        return entry[0]
+
+    async def _gets(self, key, encoding="utf-8", _conn=None):
+        return await self._get(key, encoding=encoding, _conn=_conn)
+
+    async def _multi_get(self, keys, encoding="utf-8", _conn=None):
+        return [await self._get(key) for key in keys]
+
+    async def _set(self, key, value, ttl=None, _cas_token=None, _conn=None):
+        if _cas_token is not None:
+            entry = self._lookup(key)
+            if _cas_token != (entry[0] if entry else None):
+                return 0
+
+        self._remove(key)
+        size = estimate_size(value)
+        expires_at = time.monotonic() + ttl if ttl else None
+        self._cache[key] = (value, size, expires_at)
+        self.used_bytes += size
+        self._budget.used_bytes += size
+
+        while self.max_size and len(self._cache) > self.max_size:
+            self.evict_one()
+        self._budget.enforce()
+        return True
+
+    async def _multi_set(self, pairs, ttl=None, _conn=None):
+        for key, value in pairs:
+            await self._set(key, value, ttl=ttl)
+        return True
+
+    async def _add(self, key, value, ttl=None, _conn=None):
+        if self._lookup(key) is not None:
+            raise ValueError("Key {} already exists, use .set to update the value".format(key))
+        return await self._set(key, value, ttl=ttl)
+
+    async def _exists(self, key, _conn=None):
+        return self._lookup(key) is not None
+
+    async def _increment(self, key, delta, _conn=None):
+        entry = self._lookup(key)
+        if entry is None:
+            value = delta
+        else:
+            try:
+                value = int(entry[0]) + delta
+            except ValueError:
+                raise TypeError("Value is not an integer") from None
+        await self._set(key, value, ttl=self._remaining_ttl(entry))
+        return value
+
+    async def _expire(self, key, ttl, _conn=None):
+        entry = self._lookup(key)
+        if entry is None:
+            return False
+        value, size, _ = entry
+        self._cache[key] = (value, size, time.monotonic() + ttl if ttl else None)
+        return True
+
+    async def _delete(self, key, _conn=None):
+        return int(self._remove(key))
+
+    async def _clear(self, namespace=None, _conn=None):
+        for key in list(self._cache):
+            if not namespace or key.startswith(namespace):
+                self._remove(key)
+        return True
+
+    async def _redlock_release(self, key, value):
+        entry = self._lookup(key)
+        if entry is not None and entry[0] == value:
+            return int(self._remove(key))
+        return 0
+
+    @staticmethod
+    def _remaining_ttl(entry: Optional[tuple[Any, int, Optional[float]]]) -> Optional[float]:
+        if entry is None or entry[2] is None:
+            return None
+        return max(entry[2] - time.monotonic(), 0.001)
+
+    @classmethod
+    def parse_uri_path(cls, path):
+        return {}
@@ -0,0 +1,65 @@
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Optional
+
+import httpx
+
+from app.cache.entry import CacheEntry
+
+
+class NotModified(Exception):
+    """
+    Raised by a cached function when the upstream confirmed that the previously cached value is still valid.
+    """
+
+
+@dataclass
+class Revalidation:
+    """
+    Upstream validators exchanged between a cached function and its decorator, during a call.
+
+    The decorator provides the previously cached entry, whose validators are sent with the upstream request. The
+    validators of the new response are recorded, to be stored with the new entry.
+    """
+
+    previous: Optional[CacheEntry] = None
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    used: bool = False
+
+
+current_revalidation: ContextVar[Optional[Revalidation]] = ContextVar("current_revalidation", default=None)
+
+
+async def conditional_get(client: httpx.AsyncClient, url: str, **kwargs) -> httpx.Response:
+    """
+    Send a GET request, conditional on the validators of the value previously cached by the current cached function.
+
+    Only the first request of a cached call is conditional, as the validators only apply to it.
+    :param client: The client to send the request with.
+    :param url: The URL to request.
+    :param kwargs: Other arguments of the request.
+    :return: The response.
+    :raises NotModified: If the upstream answered that the previous value is still valid.
+    """
+
+    revalidation = current_revalidation.get()
+    if revalidation is None or revalidation.used:
+        return await client.get(url, **kwargs)
+    revalidation.used = True
+
+    headers = dict(kwargs.pop("headers", None) or {})
+    previous = revalidation.previous
+    if previous is not None:
+        if previous.etag:
+            headers["If-None-Match"] = previous.etag
+        if previous.last_modified:
+            headers["If-Modified-Since"] = previous.last_modified
+
+    response = await client.get(url, headers=headers, **kwargs)
+    if response.status_code == 304 and previous is not None:
+        raise NotModified()
+
+    revalidation.etag = response.headers.get("ETag")
+    revalidation.last_modified = response.headers.get("Last-Modified")
+    return response
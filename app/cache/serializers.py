@@ -0,0 +1,108 @@
+import json
+import zlib
+from datetime import datetime
+from typing import Any
+
+from aiocache.serializers import BaseSerializer
+from pydantic import BaseModel, AnyUrl
+
+# Markers of values that JSON cannot represent by itself
+_MODEL = "$model"
+_FIELDS = "$fields"
+_DATETIME = "$datetime"
+_TUPLE = "$tuple"
+
+# Prefixes telling whether the payload is compressed
+_PLAIN = b"j"
+_COMPRESSED = b"z"
+
+
+def _model_classes() -> dict[str, type[BaseModel]]:
+    """
+    Get the models that may be deserialized, by name. Only the application's own models are allowed.
+    """
+
+    classes = {}
+    pending = [BaseModel]
+    while pending:
+        cls = pending.pop()
+        for subclass in cls.__subclasses__():
+            if subclass.__module__.startswith("app."):
+                classes[subclass.__name__] = subclass
+            pending.append(subclass)
+    return classes
+
+
+class ModelSerializer(BaseSerializer):
+    """
+    Compact serializer for cached upstream data, for caches shared between workers.
+
+    Values are stored as JSON, compressed with zlib when they are big enough for it to pay off. Pydantic models keep
+    their exact class, so that an ``ExpandedDependency`` stored in a ``Version.dependencies`` list is restored as such.
+    Datetimes and tuples are restored as well. Only the application's models may be restored, so that a tampered
+    shared cache cannot instantiate arbitrary classes.
+
+    :param compress_threshold: int minimum size, in bytes, of the JSON payload to compress it. Default is 512.
+    """
+
+    DEFAULT_ENCODING = None
+
+    def __init__(self, *args, compress_threshold: int = 512, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.compress_threshold = compress_threshold
+        self._classes: dict[str, type[BaseModel]] = {}
+
+    def dumps(self, value: Any) -> bytes:
+        payload = json.dumps(self._encode(value), separators=(",", ":"), ensure_ascii=False).encode()
+        if len(payload) >= self.compress_threshold:
+            return _COMPRESSED + zlib.compress(payload)
+        return _PLAIN + payload
+
+    def loads(self, value: bytes | None) -> Any:
+        if value is None:
+            return None
+        if value[:1] == _COMPRESSED:
+            payload = zlib.decompress(value[1:])
+        elif value[:1] == _PLAIN:
+            payload = value[1:]
+        else:
+            raise ValueError("Unknown serialized value format")
+        return self._decode(json.loads(payload))
+
+    def _encode(self, value: Any) -> Any:
+        if isinstance(value, BaseModel):
+            return {_MODEL: type(value).__name__,
+                    _FIELDS: {name: self._encode(field) for name, field in value.__dict__.items()}}
+        if isinstance(value, dict):
+            return {key: self._encode(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [self._encode(item) for item in value]
+        if isinstance(value, tuple):
+            return {_TUPLE: [self._encode(item) for item in value]}
+        if isinstance(value, datetime):
+            return {_DATETIME: value.isoformat()}
+        if isinstance(value, AnyUrl):
+            return str(value)
+        return value
+
+    def _decode(self, value: Any) -> Any:
+        if isinstance(value, list):
+            return [self._decode(item) for item in value]
+        if not isinstance(value, dict):
+            return value
+        if _MODEL in value:
+            return self._model_class(value[_MODEL]).model_validate(self._decode(value[_FIELDS]))
+        if _DATETIME in value:
+            return datetime.fromisoformat(value[_DATETIME])
+        if _TUPLE in value:
+            return tuple(self._decode(item) for item in value[_TUPLE])
+        return {key: self._decode(item) for key, item in value.items()}
+
+    def _model_class(self, name: str) -> type[BaseModel]:
+        cls = self._classes.get(name)
+        if cls is None:
+            self._classes = _model_classes()
+            cls = self._classes.get(name)
+            if cls is None:
+                raise ValueError(f"Unknown model {name}")
+        return cls
@@ -0,0 +1,210 @@
+import asyncio
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from aiocache.base import BaseCache
+
+from app.cache.serializers import ModelSerializer
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    namespace TEXT NOT NULL,
+    value BLOB NOT NULL,
+    expires_at REAL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cache_namespace_accessed_at ON cache (namespace, accessed_at);
+CREATE INDEX IF NOT EXISTS cache_expires_at ON cache (expires_at);
+"""
+
+# One connection per database file and process, shared by every cache using it
+_connections: dict[str, tuple[sqlite3.Connection, threading.Lock]] = {}
+_connections_lock = threading.Lock()
+
+
+def _connect(path: str) -> tuple[sqlite3.Connection, threading.Lock]:
+    with _connections_lock:
+        if path not in _connections:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(path, timeout=5, isolation_level=None, check_same_thread=False)
+            # Write-ahead logging lets workers read while another one writes
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(_SCHEMA)
+            _connections[path] = (connection, threading.Lock())
+        return _connections[path]
+
+
+class SQLiteCache(BaseCache):
+    """
+    Cache stored in a SQLite database, shared by all workers of a host and kept across restarts.
+
+    Queries run in a thread, not to block the event loop on disk access. Expiration uses wall-clock time, as entries
+    are shared between processes. When the namespace holds more than ``max_size`` entries, least recently used ones are
+    evicted first.
+
+    Config options are:
+
+    :param serializer: obj derived from :class:`aiocache.serializers.BaseSerializer`. Default is
+        :class:`ModelSerializer`.
+    :param plugins: list of :class:`aiocache.plugins.BasePlugin` derived classes.
+    :param namespace: string to use as default prefix for the key used in all operations of
+        the backend. Entries are bounded per namespace. Default is None.
+    :param timeout: int or float in seconds specifying maximum timeout for the operations to last.
+        By default its 5.
+    :param path: str path of the database file. Created if needed.
+    :param max_size: int maximum number of entries kept in the namespace. 0 or None means no limit.
+    :param purge_interval: int number of writes between two purges of expired entries. Default is 100.
+    """
+
+    NAME = "sqlite"
+
+    def __init__(self, serializer=None, path: str = "cache.sqlite3", max_size: Optional[int] = None,
+                 purge_interval: int = 100, **kwargs):
+        super().__init__(serializer=serializer or ModelSerializer(), **kwargs)
+        self.path = path
+        self.max_size = max_size
+        self.purge_interval = purge_interval
+        self.evictions = 0
+        self._writes = 0
+
+    async def _run(self, query, *args):
+        connection, lock = _connect(self.path)
+
+        def run():
+            with lock:
+                return query(connection, *args)
+
+        return await asyncio.to_thread(run)
+
+    @staticmethod
+    def _select(connection: sqlite3.Connection, key: str):
+        now = time.time()
+        row = connection.execute("SELECT value, accessed_at FROM cache WHERE key = ? AND "
+                                 "(expires_at IS NULL OR expires_at > ?)", (key, now)).fetchone()
+        if row is None:
+            return None
+        # Only refresh the access time once in a while, to avoid a write for every read
+        if now - row[1] > 60:
+            connection.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+        return row[0]
+
+    def _upsert(self, connection: sqlite3.Connection, key: str, value: bytes, ttl: Optional[float]):
+        now = time.time()
+        namespace = self.namespace or ""
+        connection.execute("INSERT OR REPLACE INTO cache (key, namespace, value, expires_at, accessed_at) "
+                           "VALUES (?, ?, ?, ?, ?)", (key, namespace, value, now + ttl if ttl else None, now))
+        self._writes += 1
+        if self.purge_interval and self._writes % self.purge_interval == 0:
+            connection.execute("DELETE FROM cache WHERE expires_at <= ?", (now,))
+        if self.max_size:
+            evicted = connection.execute(
+                "DELETE FROM cache WHERE key IN (SELECT key FROM cache WHERE namespace = ? "
+                "ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)", (namespace, self.max_size)).rowcount
+            self.evictions += max(evicted, 0)
+        return True
+
+    async def _get(self, key, encoding="utf-8", _conn=None):
+        return await self._run(self._select, key)
+
+    async def _gets(self, key, encoding="utf-8", _conn=None):
+        return await self._get(key, encoding=encoding, _conn=_conn)
+
+    async def _multi_get(self, keys, encoding="utf-8", _conn=None):
+        return [await self._get(key) for key in keys]
+
+    async def _set(self, key, value, ttl=None, _cas_token=None, _conn=None):
+        if _cas_token is not None and _cas_token != await self._get(key):
+            return 0
+        return await self._run(self._upsert, key, value, ttl)
+
+    async def _multi_set(self, pairs, ttl=None, _conn=None):
+        for key, value in pairs:
+            await self._set(key, value, ttl=ttl)
+        return True
+
+    async def _add(self, key, value, ttl=None, _conn=None):
+        if await self._exists(key):
+            raise ValueError("Key {} already exists, use .set to update the value".format(key))
+        return await self._set(key, value, ttl=ttl)
+
+    async def _exists(self, key, _conn=None):
+        return await self._get(key) is not None
+
+    async def _expire(self, key, ttl, _conn=None):
+        def expire(connection: sqlite3.Connection):
+            return connection.execute("UPDATE cache SET expires_at = ? WHERE key = ?",
+                                      (time.time() + ttl if ttl else None, key)).rowcount > 0
+
+        return await self._run(expire)
+
+    async def _delete(self, key, _conn=None):
+        def delete(connection: sqlite3.Connection):
+            return connection.execute("DELETE FROM cache WHERE key = ?", (key,)).rowcount
+
+        return await self._run(delete)
+
+    async def _clear(self, namespace=None, _conn=None):
+        def clear(connection: sqlite3.Connection):
+            if namespace:
+                connection.execute("DELETE FROM cache WHERE namespace = ?", (namespace,))
+            else:
+                connection.execute("DELETE FROM cache")
+            return True
+
+        return await self._run(clear)
+
+    def _add_to(self, connection: sqlite3.Connection, key: str, delta: int) -> int:
+        # Take the write lock before reading, so that workers cannot increment the same value concurrently
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = connection.execute("SELECT value FROM cache WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                                     (key, time.time())).fetchone()
+            if row is None:
+                value = delta
+                self._upsert(connection, key, self.serializer.dumps(value), None)
+            else:
+                try:
+                    current = self.serializer.loads(row[0])
+                except Exception:
+                    # Not a value of this serializer
+                    current = None
+                if not isinstance(current, int) or isinstance(current, bool):
+                    raise TypeError("Value is not an integer")
+                # Keep the expiration of the counter
+                value = current + delta
+                connection.execute("UPDATE cache SET value = ?, accessed_at = ? WHERE key = ?",
+                                   (self.serializer.dumps(value), time.time(), key))
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+        return value
+
+    async def _increment(self, key, delta, _conn=None):
+        return await self._run(self._add_to, key, delta)
+
+    async def _redlock_release(self, key, value):
+        if await self._get(key) == value:
+            return await self._delete(key)
+        return 0
+
+    @classmethod
+    def parse_uri_path(cls, path):
+        return {"path": path}
+
+
+def close_connections() -> None:
+    """
+    Close all database connections of the process.
+    """
+
+    with _connections_lock:
+        for connection, lock in _connections.values():
+            with lock:
+                connection.close()
+        _connections.clear()
@@ -0,0 +1,113 @@
+import asyncio
+
+from fastapi import HTTPException
+
+from app.cache import cached
+from app.maven import MavenDependency
+from app.models.resolution import DependencyClosure, DependencyNode, ResolvedArtifact
+from app.resolution import resolve_with_dependencies
+from app.settings import settings
+
+
+def is_transient_failure(artifact: ResolvedArtifact) -> bool:
+    return artifact.status >= 500
+
+
+async def resolve_dependency_nodes(values: list[str]) -> dict[str, DependencyNode]:
+    """
+    Resolve artifacts at once, along with the coordinates of their direct dependencies, as
+    :func:`app.resolution.resolve_with_dependencies` does.
+    :param values: Coordinates in Maven's "groupId:artifactId[:version]" format, without version for the latest one.
+    :return: The nodes of the artifacts in dependency graphs, by requested coordinates.
+    """
+
+    resolved = await resolve_with_dependencies(values)
+    return {value: DependencyNode(artifact=artifact, dependencies=dependencies)
+            for value, (artifact, dependencies) in resolved.items()}
+
+
+@cached(ttl=settings.resolve.closure_expiration_seconds, max_size=settings.resolve.closure_node_max_size,
+        skip_cache_func=lambda node: is_transient_failure(node.artifact))
+async def fetch_dependency_node(coordinates: str) -> DependencyNode:
+    """
+    Resolve an artifact, along with the coordinates of its direct dependencies. Nodes of dependency graphs are cached
+    by this function, including those of artifacts that do not exist, unless they failed because of a transient error.
+    :param coordinates: Coordinates in Maven's "groupId:artifactId[:version]" format, without version for the latest
+        one.
+    :return: The node of the artifact in dependency graphs.
+    """
+
+    return (await resolve_dependency_nodes([coordinates]))[coordinates]
+
+
+async def fetch_dependency_nodes(values: list[str]) -> dict[str, DependencyNode]:
+    """
+    Get the nodes of many artifacts in dependency graphs. Cached nodes are used, a single missing node is fetched by
+    :func:`fetch_dependency_node`, and several ones are resolved all together then cached as if it fetched them.
+    :param values: Coordinates in Maven's "groupId:artifactId[:version]" format, without version for the latest one.
+    :return: The nodes, by requested coordinates, in their order.
+    """
+
+    cached_nodes = await asyncio.gather(*[fetch_dependency_node.get_cached(value) for value in values])
+    nodes = {value: node for value, node in zip(values, cached_nodes) if node is not None}
+    missing = [value for value in values if value not in nodes]
+    if len(missing) == 1:
+        nodes[missing[0]] = await fetch_dependency_node(missing[0])
+    elif missing:
+        resolved = await resolve_dependency_nodes(missing)
+        await asyncio.gather(*[fetch_dependency_node.set_cached(resolved[value], value) for value in missing])
+        nodes.update(resolved)
+    return {value: nodes[value] for value in values}
+
+
+@cached(ttl=settings.resolve.closure_expiration_seconds, max_size=settings.resolve.closure_max_size,
+        skip_cache_func=lambda closure: any(is_transient_failure(dependency) for dependency in closure.dependencies))
+async def fetch_dependency_closure(coordinates: str) -> DependencyClosure:
+    """
+    Resolve an artifact and all the artifacts it depends on, directly or not.
+
+    The dependency graph is walked level by level with :func:`fetch_dependency_nodes`: nodes of a level that are not
+    cached yet are resolved all together, then cached along with those :func:`fetch_dependency_node` fetches, so that
+    shared subgraphs, such as common libraries, are only resolved once for all the graphs they are part of.
+    :param coordinates: Coordinates in Maven's "groupId:artifactId[:version]" format, without version for the latest
+        one.
+    :return: The artifact and its dependencies, nearest first.
+    :raises HTTPException: If the artifact cannot be resolved, or if its dependency graph is too large.
+    """
+
+    artifacts: dict[str, ResolvedArtifact] = {}
+    level = [coordinates]
+    while level:
+        if len(artifacts) + len(level) > settings.resolve.closure_max_nodes:
+            raise HTTPException(status_code=400, detail=f"Dependency graph has more than "
+                                                        f"{settings.resolve.closure_max_nodes} artifacts")
+
+        nodes = await fetch_dependency_nodes(level)
+        artifacts.update((value, node.artifact) for value, node in nodes.items())
+        level = sorted({dependency for node in nodes.values() for dependency in node.dependencies
+                        if dependency not in artifacts})
+
+    artifact = artifacts.pop(coordinates)
+    if artifact.status != 200:
+        raise HTTPException(status_code=artifact.status, detail=artifact.detail)
+    # The artifact may be reached again through a cycle, under other coordinates than the requested ones
+    return DependencyClosure(artifact=artifact,
+                             dependencies=[dependency for dependency in artifacts.values()
+                                           if dependency.download_url is None
+                                           or dependency.download_url != artifact.download_url])
+
+
+def get_managed_dependencies(closure: DependencyClosure) -> list[MavenDependency]:
+    """
+    Get the dependencies a BOM of a closure manages: the artifact and its resolved dependencies. When the closure has
+    several versions of an artifact, the nearest one is managed, as Maven would pick it.
+    :param closure: The closure.
+    :return: The managed dependencies, sorted by group ID and artifact ID.
+    """
+
+    nearest: dict[tuple[str, str], str] = {}
+    for artifact in [closure.artifact, *closure.dependencies]:
+        if artifact.status == 200:
+            nearest.setdefault((artifact.group_id, artifact.artifact_id), artifact.version)
+    return [MavenDependency(group_id, artifact_id, version)
+            for (group_id, artifact_id), version in sorted(nearest.items())]
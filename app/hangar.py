@@ -1,26 +1,42 @@
+import asyncio
+from datetime import datetime, timezone
 from typing import Literal, Optional
 
-import httpx
-from aiocache import cached
 from fastapi import HTTPException
 
+from app.cache import cached
+from app.cache.revalidation import conditional_get, current_revalidation
 from app.settings import settings
+from app.upstream import get_client
 
 platform_type = Literal["paper", "velocity", "waterfall"]
 
 
+def parse_date(value: str) -> datetime:
+    """
+    Parse a date of the Hangar API as UTC, so that it compares with the dates of other backends.
+    :param value: The date in ISO 8601 format, e.g. "2024-01-01T12:00:00.000Z".
+    :return: The date, with a UTC timezone.
+    """
+
+    date = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return date.astimezone(timezone.utc) if date.tzinfo is not None else date.replace(tzinfo=timezone.utc)
+
+
 # Fetch project metadata from the Hangar API, with caching
-@cached(ttl=settings.hangar.cache_project_expiration_seconds)
+@cached(ttl=settings.hangar.cache_project_expiration_seconds,
+        max_size=settings.hangar.cache_project_max_size)
 async def fetch_project_metadata(slug: str) -> dict[str, any]:
     url = f"{settings.hangar.api_base_url}/projects/{slug}"
-    async with httpx.AsyncClient() as client:
-        response = await client.get(url)
-        if response.status_code == 404:
-            raise HTTPException(status_code=404, detail="Project not found")
-        return response.json()
+    response = await conditional_get(get_client("hangar"), url)
+    if response.status_code == 404:
+        raise HTTPException(status_code=404, detail="Project not found")
+    response.raise_for_status()
+    return response.json()
 
 
-@cached(ttl=settings.hangar.cache_version_expiration_seconds)
+@cached(ttl=settings.hangar.cache_version_expiration_seconds,
+        max_size=settings.hangar.cache_version_max_size)
 async def fetch_paginated_versions(slug: str, platform: Optional[platform_type] = None, channel: Optional[str] = None,
                                    limit: int = 10, offset: int = 0) -> tuple[dict[str, any], dict[str, any]]:
     """
@@ -33,6 +49,23 @@ async def fetch_paginated_versions(slug: str, platform: Optional[platform_type]
     :return: A list of versions and the pagination details.
     """
 
+    return await request_versions_page(slug=slug, platform=platform, channel=channel, limit=limit, offset=offset)
+
+
+async def request_versions_page(slug: str, platform: Optional[platform_type], channel: Optional[str], limit: int,
+                                offset: int) -> tuple[list[dict[str, any]], dict[str, any]]:
+    """
+    Request a page of versions of a specific plugin (slug) from the Hangar API, conditional on the validators of the
+    value previously cached by the current cached function.
+    :param slug: The slug of the project.
+    :param platform: Filter results to a supported platform.
+    :param channel: Filter results to a specific versions channel.
+    :param limit: The number of versions to fetch per request.
+    :param offset: The starting point for fetching versions.
+    :return: A list of versions and the pagination details.
+    :raises NotModified: If the Hangar API answered that the previously cached value is still valid.
+    """
+
     url = f"{settings.hangar.api_base_url}/projects/{slug}/versions"
 
     params = {
@@ -45,47 +78,206 @@ async def fetch_paginated_versions(slug: str, platform: Optional[platform_type]
     if channel is not None:
         params["channel"] = channel
 
-    async with httpx.AsyncClient() as client:
-        response = await client.get(url, params=params)
-        response.raise_for_status()
-        data = response.json()
+    response = await conditional_get(get_client("hangar"), url, params=params)
+    if response.status_code == 404:
+        raise HTTPException(status_code=404, detail="Project not found")
+    response.raise_for_status()
+    data = response.json()
 
     return data['result'], data['pagination']
 
 
-# Fetch specific version metadata from the Hangar API, with caching
-@cached(ttl=settings.hangar.cache_version_expiration_seconds)
-async def fetch_versions_metadata(slug: str, platform: Optional[platform_type] = None, channel: Optional[str] = None) -> \
-        list[dict[str, any]]:
+async def fetch_all_versions(slug: str, platform: Optional[platform_type] = None, channel: Optional[str] = None,
+                             refresh: bool = False,
+                             first_page: Optional[tuple[list[dict[str, any]], dict[str, any]]] = None) -> \
+        tuple[list[dict[str, any]], int]:
     """
-    Fetch versions of a specific plugin (slug) from the Hangar API with pagination.
+    Fetch versions of a specific plugin (slug) from the Hangar API with pagination. Once the first page tells how many
+    versions there are, the remaining pages are fetched concurrently.
     :param slug: The slug of the project.
     :param platform: Filter results to a supported platform.
     :param channel: Filter results to a specific versions channel.
-    :return: A list of versions and the pagination details.
+    :param refresh: Whether to ask the Hangar API for every page, instead of using cached pages.
+    :param first_page: The first page of versions and its pagination details, if it was already fetched.
+    :return: A list of versions, in the order of the Hangar API, and the total number of versions of the project.
     """
 
     limit = settings.hangar.versions_limit_per_batch
-    offset = 0
-    all_versions = []
 
-    while True:
-        versions, pagination = await fetch_paginated_versions(slug=slug, platform=platform, channel=channel,
-                                                              limit=limit, offset=offset)
-        all_versions.extend(versions)
+    # Pages are only taken from the cache if all of them are: offsets shift whenever a version is published, so a page
+    # fetched now cannot be merged with pages cached before
+    if not refresh and first_page is None:
+        cached_pages = await get_cached_pages(slug=slug, platform=platform, channel=channel)
+        if cached_pages is not None:
+            return cached_pages
+
+    # The first page tells how many versions there are
+    if first_page is None:
+        first_page = await fetch_paginated_versions(slug=slug, platform=platform, channel=channel, limit=limit,
+                                                    offset=0, cache_read=False)
+    versions, pagination = first_page
+    total = min(pagination['count'], settings.hangar.versions_total_to_fetch)
+
+    # Fetch the remaining pages concurrently, with bounded parallelism
+    semaphore = asyncio.Semaphore(settings.hangar.versions_fetch_concurrency)
+
+    async def fetch_page(offset: int) -> list[dict[str, any]]:
+        async with semaphore:
+            page, _ = await fetch_paginated_versions(slug=slug, platform=platform, channel=channel, limit=limit,
+                                                     offset=offset, cache_read=False)
+            return page
+
+    pages = await asyncio.gather(*(fetch_page(offset) for offset in range(limit, total, limit)))
+
+    # Merge pages in order
+    all_versions = list(versions)
+    for page in pages:
+        all_versions.extend(page)
+
+    return all_versions[:settings.hangar.versions_total_to_fetch], pagination['count']
+
+
+async def get_cached_pages(slug: str, platform: Optional[platform_type], channel: Optional[str]) -> \
+        Optional[tuple[list[dict[str, any]], int]]:
+    """
+    Get the versions of a specific plugin (slug) from cached pages only, without calling the Hangar API.
+    :param slug: The slug of the project.
+    :param platform: Filter results to a supported platform.
+    :param channel: Filter results to a specific versions channel.
+    :return: A list of versions, in the order of the Hangar API, and the total number of versions of the project, or
+        None if any of the pages is not cached and fresh.
+    """
+
+    limit = settings.hangar.versions_limit_per_batch
+    first_page = await fetch_paginated_versions.get_cached(slug=slug, platform=platform, channel=channel, limit=limit,
+                                                           offset=0)
+    if first_page is None:
+        return None
+    versions, pagination = first_page
+    total = min(pagination['count'], settings.hangar.versions_total_to_fetch)
+    pages = await asyncio.gather(*(fetch_paginated_versions.get_cached(slug=slug, platform=platform, channel=channel,
+                                                                       limit=limit, offset=offset)
+                                   for offset in range(limit, total, limit)))
+    if any(page is None for page in pages):
+        return None
 
-        # Check if there are no more pages to fetch or that we will go over the number of versions to fetch
-        if offset + limit >= pagination['count'] or len(all_versions) >= settings.hangar.versions_total_to_fetch:
-            break
+    all_versions = list(versions)
+    for page, _ in pages:
+        all_versions.extend(page)
+    return all_versions[:settings.hangar.versions_total_to_fetch], pagination['count']
 
-        # Update offset to fetch the next page
-        offset += limit
 
-    return all_versions
+async def set_cached_pages(slug: str, platform: Optional[platform_type], channel: Optional[str],
+                           versions: list[dict[str, any]], count: int) -> None:
+    """
+    Store the pages of an up-to-date list of versions, as if they were fetched from the Hangar API, so that cached pages
+    stay consistent with each other.
+    :param slug: The slug of the project.
+    :param platform: Filter results to a supported platform.
+    :param channel: Filter results to a specific versions channel.
+    :param versions: The versions, in the order of the Hangar API, up to the number of versions to fetch.
+    :param count: The total number of versions of the project.
+    """
+
+    limit = settings.hangar.versions_limit_per_batch
+    # The last page may be cut to the number of versions to fetch, as lists merged from pages are
+    await asyncio.gather(*(fetch_paginated_versions.set_cached((versions[offset:offset + limit],
+                                                                {"count": count, "limit": limit, "offset": offset}),
+                                                               slug=slug, platform=platform, channel=channel,
+                                                               limit=limit, offset=offset)
+                           for offset in range(0, len(versions), limit)))
+
+
+def sync_versions(page: list[dict[str, any]], pagination: dict[str, any], known_versions: list[dict[str, any]],
+                  known_count: int) -> Optional[tuple[list[dict[str, any]], int]]:
+    """
+    Update a previously fetched list of versions with the newest page of versions only.
+    :param page: The newest page of versions.
+    :param pagination: The pagination details of the newest page.
+    :param known_versions: The previously fetched versions.
+    :param known_count: The previously fetched total number of versions of the project.
+    :return: The updated versions and total number of versions, or None if the newest page does not connect with the
+        known versions, because too many versions were published or some were deleted, and all versions must be
+        fetched again.
+    """
+
+    if not known_versions:
+        return None
+
+    # Find where the newest known version is in the newest page
+    names = [version['name'] for version in page]
+    try:
+        new_count = names.index(known_versions[0]['name'])
+    except ValueError:
+        return None
+
+    # Following versions must be the known ones, and only the new versions may have been added
+    overlap = names[new_count:]
+    if overlap != [version['name'] for version in known_versions[:len(overlap)]] or \
+            pagination['count'] != known_count + new_count:
+        return None
+
+    versions = (page + known_versions[len(overlap):])[:settings.hangar.versions_total_to_fetch]
+    if len(versions) < min(pagination['count'], settings.hangar.versions_total_to_fetch):
+        return None
+    return versions, pagination['count']
+
+
+@cached(ttl=settings.hangar.cache_version_expiration_seconds,
+        max_size=settings.hangar.cache_version_max_size)
+async def fetch_versions_history(slug: str, platform: Optional[platform_type] = None,
+                                 channel: Optional[str] = None) -> tuple[list[dict[str, any]], int]:
+    """
+    Fetch versions of a specific plugin (slug) from the Hangar API, with caching.
+
+    The newest page of versions is requested by this function, so that its validators are stored with the versions.
+    When cached versions are refreshed, it is requested conditionally: if it did not change, the cached versions are
+    kept. Otherwise, it is merged with them, unless incremental synchronization is disabled or the newest page does not
+    connect with them, and all versions are fetched again.
+    :param slug: The slug of the project.
+    :param platform: Filter results to a supported platform.
+    :param channel: Filter results to a specific versions channel.
+    :return: A list of versions, in the order of the Hangar API, and the total number of versions of the project.
+    """
+
+    revalidation = current_revalidation.get(None)
+    previous = revalidation.previous if revalidation is not None else None
+    if previous is None:
+        cached_pages = await get_cached_pages(slug=slug, platform=platform, channel=channel)
+        if cached_pages is not None:
+            return cached_pages
+
+    page, pagination = await request_versions_page(slug=slug, platform=platform, channel=channel,
+                                                   limit=settings.hangar.versions_limit_per_batch, offset=0)
+    synced = None
+    if settings.hangar.versions_incremental_sync and previous is not None:
+        known_versions, known_count = previous.value
+        synced = sync_versions(page, pagination, known_versions=known_versions, known_count=known_count)
+    if synced is None:
+        # No versions were cached, or they changed in a way that cannot be merged: cached pages are outdated too
+        synced = await fetch_all_versions(slug=slug, platform=platform, channel=channel, first_page=(page, pagination))
+    # Offsets of the cached pages shifted by the new versions, and the first page was not cached
+    await set_cached_pages(slug=slug, platform=platform, channel=channel, versions=synced[0], count=synced[1])
+    return synced
+
+
+async def fetch_versions_metadata(slug: str, platform: Optional[platform_type] = None, channel: Optional[str] = None) -> \
+        list[dict[str, any]]:
+    """
+    Fetch versions of a specific plugin (slug) from the Hangar API, with caching.
+    :param slug: The slug of the project.
+    :param platform: Filter results to a supported platform.
+    :param channel: Filter results to a specific versions channel.
+    :return: A list of versions, in the order of the Hangar API.
+    """
+
+    versions, _ = await fetch_versions_history(slug=slug, platform=platform, channel=channel)
+    return versions
 
 
 # Fetch specific version metadata from the Hangar API, with caching
-@cached(ttl=settings.hangar.cache_version_expiration_seconds)
+@cached(ttl=settings.hangar.cache_version_expiration_seconds,
+        max_size=settings.hangar.cache_version_max_size)
 async def fetch_version_metadata(slug: str, version: str) -> dict[str, any]:
     """
     Fetch metadata for a specific version of a plugin from the Hangar API.
@@ -95,11 +287,11 @@ async def fetch_version_metadata(slug: str, version: str) -> dict[str, any]:
     """
 
     url = f"{settings.hangar.api_base_url}/projects/{slug}/versions/{version}"
-    async with httpx.AsyncClient() as client:
-        response = await client.get(url)
-        if response.status_code == 404:
-            raise HTTPException(status_code=404, detail="Version not found")
-        return response.json()
+    response = await conditional_get(get_client("hangar"), url)
+    if response.status_code == 404:
+        raise HTTPException(status_code=404, detail="Version not found")
+    response.raise_for_status()
+    return response.json()
 
 
 def get_version_download_url(slug: str, platform: platform_type, version: str) -> str:
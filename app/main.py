@@ -1,9 +1,17 @@
 import logging
+from contextlib import asynccontextmanager
 
+import httpx
 from fastapi import FastAPI
+from starlette.requests import Request
+from starlette.responses import JSONResponse
 
+from app import cache, metrics, prefetch
 from app.routers import api_router, tags_metadata
+from app.routers.rendered import metadata_cache, pom_cache
 from app.settings import settings
+from app.timeouts import DeadlineMiddleware
+from app.upstream import open_clients, close_clients, get_stats as get_upstream_stats
 
 title = "minecraft-maven-bridge"
 version = "1.0.0"
@@ -19,6 +27,20 @@ license_info = {
 
 logger = logging.getLogger(__name__)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Open pooled upstream clients once, and release their connections on shutdown
+    await open_clients()
+    # Warm caches up with hot projects, and keep them fresh
+    prefetch.start()
+    yield
+    await prefetch.stop()
+    await close_clients()
+    await cache.close()
+    metrics.mark_process_dead()
+
+
 # Initialize app with lifespan
 app = FastAPI(
     title=title,
@@ -27,11 +49,29 @@ app = FastAPI(
     contact=contact,
     license_info=license_info,
     debug=settings.debug,
-    openapi_tags=tags_metadata
+    openapi_tags=tags_metadata,
+    lifespan=lifespan
 )
 
 app.include_router(api_router)
 
+if settings.request_timeout_seconds > 0:
+    app.add_middleware(DeadlineMiddleware, seconds=settings.request_timeout_seconds)
+if metrics.enabled:
+    app.add_middleware(metrics.MetricsMiddleware)
+
+
+@app.exception_handler(httpx.TimeoutException)
+async def upstream_timeout_handler(request: Request, error: httpx.TimeoutException):
+    logger.warning("Upstream request timed out: %r", error)
+    return JSONResponse(status_code=504, content={"detail": "Upstream timed out"})
+
+
+@app.exception_handler(httpx.HTTPError)
+async def upstream_error_handler(request: Request, error: httpx.HTTPError):
+    logger.warning("Upstream request failed: %r", error)
+    return JSONResponse(status_code=502, content={"detail": "Upstream unavailable"})
+
 
 @app.get("/")
 async def root():
@@ -39,6 +79,21 @@ async def root():
             "description": description, "contact": contact, "license_info": license_info}
 
 
+@app.get("/stats")
+async def stats():
+    return {"caches": cache.get_stats(),
+            "rendered": {"metadata": metadata_cache.get_stats(), "pom": pom_cache.get_stats()},
+            "upstream": get_upstream_stats()}
+
+
+if metrics.enabled:
+    @app.get("/metrics", include_in_schema=False)
+    async def get_metrics():
+        # Sizes of caches are only reported by this worker when they change, refresh them first
+        cache.report_states()
+        return metrics.render_metrics()
+
+
 if __name__ == '__main__':
     import uvicorn
 
@@ -0,0 +1,136 @@
+from itertools import islice
+from typing import Iterable, Iterator, NamedTuple
+from xml.sax.saxutils import escape as _escape
+
+_POM_PROJECT = ('<project xmlns="http://maven.apache.org/POM/4.0.0"\n'
+                '         xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"\n'
+                '         xsi:schemaLocation="http://maven.apache.org/POM/4.0.0 '
+                'http://maven.apache.org/xsd/maven-4.0.0.xsd">\n')
+
+# Number of versions or dependencies rendered per chunk
+_CHUNK_SIZE = 1024
+# Separator of values escaped together, which cannot be part of an XML document
+_SEPARATOR = "\0"
+_VERSION_SEPARATOR = "</version>\n      <version>"
+# Number of tags of a rendered dependency, each with one "<" and one ">"
+_DEPENDENCY_TAGS = 8
+
+
+def escape(value: str) -> str:
+    """
+    Escape a value for use as XML text.
+    :param value: The value.
+    :return: The escaped value.
+    """
+
+    if "&" in value or "<" in value or ">" in value:
+        return _escape(value)
+    return value
+
+
+class MavenDependency(NamedTuple):
+    """
+    A dependency of a POM.
+    """
+
+    group_id: str
+    artifact_id: str
+    version: str
+
+
+def iter_maven_metadata(group_id: str, artifact_id: str, latest: str, versions: Iterable[str],
+                        last_updated: str) -> Iterator[str]:
+    """
+    Render a maven-metadata.xml file in a single pass, chunk by chunk.
+    :param group_id: The group ID of the artifact.
+    :param artifact_id: The ID of the artifact.
+    :param latest: The latest version of the artifact, also reported as its release.
+    :param versions: The versions of the artifact, consumed once.
+    :param last_updated: When the artifact was last updated, in Maven's format (YYYYMMDDHHMMSS).
+    :return: The chunks of the file, with escaped values.
+    """
+
+    latest = escape(latest)
+    yield (f"<metadata>\n"
+           f"  <groupId>{escape(group_id)}</groupId>\n"
+           f"  <artifactId>{escape(artifact_id)}</artifactId>\n"
+           f"  <versioning>\n"
+           f"    <latest>{latest}</latest>\n"
+           f"    <release>{latest}</release>\n"
+           f"    <versions>\n")
+    # Escape and join versions in bulk, rather than one by one
+    versions = iter(versions)
+    while chunk := list(islice(versions, _CHUNK_SIZE)):
+        yield f"      <version>{escape(_SEPARATOR.join(chunk)).replace(_SEPARATOR, _VERSION_SEPARATOR)}</version>\n"
+    yield (f"    </versions>\n"
+           f"    <lastUpdated>{escape(last_updated)}</lastUpdated>\n"
+           f"  </versioning>\n"
+           f"</metadata>")
+
+
+def iter_pom(group_id: str, artifact_id: str, version: str, dependencies: Iterable[MavenDependency]) -> Iterator[str]:
+    """
+    Render a POM file in a single pass, chunk by chunk.
+    :param group_id: The group ID of the artifact.
+    :param artifact_id: The ID of the artifact.
+    :param version: The version of the artifact.
+    :param dependencies: The dependencies of the artifact, consumed once.
+    :return: The chunks of the file, with escaped values.
+    """
+
+    yield (f"{_POM_PROJECT}"
+           f"  <modelVersion>4.0.0</modelVersion>\n"
+           f"  <groupId>{escape(group_id)}</groupId>\n"
+           f"  <artifactId>{escape(artifact_id)}</artifactId>\n"
+           f"  <version>{escape(version)}</version>\n"
+           f"  <dependencies>\n")
+    yield from _iter_dependencies(dependencies, indent="    ")
+    yield (f"  </dependencies>\n"
+           f"</project>")
+
+
+def iter_bom(group_id: str, artifact_id: str, version: str, dependencies: Iterable[MavenDependency]) -> Iterator[str]:
+    """
+    Render a BOM, a POM managing the versions of dependencies without depending on them, in a single pass, chunk by
+    chunk.
+    :param group_id: The group ID of the BOM.
+    :param artifact_id: The ID of the BOM.
+    :param version: The version of the BOM.
+    :param dependencies: The managed dependencies, consumed once.
+    :return: The chunks of the file, with escaped values.
+    """
+
+    yield (f"{_POM_PROJECT}"
+           f"  <modelVersion>4.0.0</modelVersion>\n"
+           f"  <groupId>{escape(group_id)}</groupId>\n"
+           f"  <artifactId>{escape(artifact_id)}</artifactId>\n"
+           f"  <version>{escape(version)}</version>\n"
+           f"  <packaging>pom</packaging>\n"
+           f"  <dependencyManagement>\n"
+           f"    <dependencies>\n")
+    yield from _iter_dependencies(dependencies, indent="      ")
+    yield (f"    </dependencies>\n"
+           f"  </dependencyManagement>\n"
+           f"</project>")
+
+
+def _iter_dependencies(dependencies: Iterable[MavenDependency], indent: str) -> Iterator[str]:
+    dependencies = iter(dependencies)
+    while chunk := list(islice(dependencies, _CHUNK_SIZE)):
+        text = "".join([f"{indent}<dependency>\n"
+                        f"{indent}  <groupId>{group_id}</groupId>\n"
+                        f"{indent}  <artifactId>{artifact_id}</artifactId>\n"
+                        f"{indent}  <version>{version}</version>\n"
+                        f"{indent}</dependency>\n"
+                        for group_id, artifact_id, version in chunk])
+        # Values rarely need escaping, only escape them one by one if the chunk has more markup characters than its tags
+        tags = _DEPENDENCY_TAGS * len(chunk)
+        if "&" in text or text.count("<") != tags or text.count(">") != tags:
+            text = "".join([f"{indent}<dependency>\n"
+                            f"{indent}  <groupId>{escape(str(group_id))}</groupId>\n"
+                            f"{indent}  <artifactId>{escape(str(artifact_id))}</artifactId>\n"
+                            f"{indent}  <version>{escape(str(version))}</version>\n"
+                            f"{indent}</dependency>\n"
+                            for group_id, artifact_id, version in chunk])
+        yield text
+
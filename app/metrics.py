@@ -0,0 +1,225 @@
+import functools
+import os
+import time
+from contextvars import ContextVar
+
+import httpx
+from starlette.responses import Response
+
+from app.settings import settings
+
+try:
+    import prometheus_client
+    from prometheus_client import multiprocess
+except ImportError:
+    prometheus_client = None
+
+enabled = settings.metrics.enabled
+if enabled and prometheus_client is None:
+    raise RuntimeError("Metrics require the prometheus-client package, install the metrics extra")
+
+# Name of the function sending upstream requests in the current task, set by cached functions and bulk fetches
+current_endpoint: ContextVar[str] = ContextVar("current_endpoint", default="unknown")
+
+if enabled:
+    _PREFIX = "minecraft_maven_bridge"
+    upstream_requests = prometheus_client.Counter(
+        f"{_PREFIX}_upstream_requests", "Requests sent to backends, by response status",
+        ["backend", "endpoint", "status"])
+    upstream_latency = prometheus_client.Histogram(
+        f"{_PREFIX}_upstream_request_duration_seconds", "Time until backends answered requests",
+        ["backend", "endpoint"])
+    upstream_in_flight = prometheus_client.Gauge(
+        f"{_PREFIX}_upstream_requests_in_flight", "Requests sent to backends and not answered yet",
+        ["backend"], multiprocess_mode="livesum")
+    upstream_waiting = prometheus_client.Gauge(
+        f"{_PREFIX}_upstream_requests_waiting", "Requests held by the rate limiter of backends",
+        ["backend"], multiprocess_mode="livesum")
+    upstream_events = prometheus_client.Counter(
+        f"{_PREFIX}_upstream_events",
+        "Hedged requests, hedges answered first, requests cut by their deadline, requests held by the rate limiter and "
+        "retries", ["backend", "event"])
+    cache_events = prometheus_client.Counter(
+        f"{_PREFIX}_cache_events", "Hits, misses, stale values served, refreshes and evictions of caches",
+        ["cache", "event"])
+    cache_entries = prometheus_client.Gauge(
+        f"{_PREFIX}_cache_entries", "Entries kept by in-memory caches", ["cache"], multiprocess_mode="livesum")
+    responses = prometheus_client.Counter(
+        f"{_PREFIX}_responses", "Responses to clients, by route family and status", ["family", "status"])
+    response_latency = prometheus_client.Histogram(
+        f"{_PREFIX}_response_duration_seconds", "Time to answer clients, by route family", ["family"])
+
+
+def endpoint(f):
+    """
+    Label the upstream requests sent by a function with its name. Cached functions are labelled by their decorator.
+    """
+
+    @functools.wraps(f)
+    async def wrapper(*args, **kwargs):
+        token = current_endpoint.set(f.__name__)
+        try:
+            return await f(*args, **kwargs)
+        finally:
+            current_endpoint.reset(token)
+
+    return wrapper
+
+
+def record_upstream_event(backend: str, event: str) -> None:
+    """
+    Count an event of the requests sent to a backend, if metrics are enabled.
+    :param backend: The name of the backend.
+    :param event: The event, such as "hedged", "deadline_exceeded", "throttled" or "retried".
+    """
+
+    if enabled:
+        upstream_events.labels(backend, event).inc()
+
+
+def record_upstream_waiting(backend: str, change: int) -> None:
+    """
+    Update the number of requests held by the rate limiter of a backend, if metrics are enabled.
+    :param backend: The name of the backend.
+    :param change: How many requests started (positive) or stopped (negative) waiting.
+    """
+
+    if enabled:
+        upstream_waiting.labels(backend).inc(change)
+
+
+def record_cache_event(cache: str, event: str, count: int = 1) -> None:
+    """
+    Count an event of a cache, if metrics are enabled.
+    :param cache: The name of the cache.
+    :param event: The event, such as "hits" or "misses".
+    :param count: How many times the event happened.
+    """
+
+    if enabled:
+        cache_events.labels(cache, event).inc(count)
+
+
+# Evictions of each cache already counted, as caches count their evictions by themselves
+_reported_evictions: dict[str, int] = {}
+
+
+def record_cache_state(name: str, cache) -> None:
+    """
+    Report the number of entries of a cache of this worker, and count its evictions since the last report, if metrics
+    are enabled.
+    :param name: The name of the cache.
+    :param cache: The cache.
+    """
+
+    if not enabled:
+        return
+    if hasattr(cache, "__len__"):
+        cache_entries.labels(name).set(len(cache))
+    evictions = getattr(cache, "evictions", 0)
+    reported = _reported_evictions.get(name, 0)
+    if evictions > reported:
+        cache_events.labels(name, "evictions").inc(evictions - reported)
+        _reported_evictions[name] = evictions
+
+
+class InstrumentedTransport(httpx.AsyncBaseTransport):
+    """
+    HTTP transport measuring the requests sent to a backend, labelled with the function that sent them.
+
+    Latency is measured until the response headers are received.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, backend: str):
+        self.transport = transport
+        self.backend = backend
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        name = current_endpoint.get()
+        in_flight = upstream_in_flight.labels(self.backend)
+        in_flight.inc()
+        start = time.perf_counter()
+        status = "error"
+        try:
+            response = await self.transport.handle_async_request(request)
+            status = str(response.status_code)
+            return response
+        finally:
+            upstream_latency.labels(self.backend, name).observe(time.perf_counter() - start)
+            upstream_requests.labels(self.backend, name, status).inc()
+            in_flight.dec()
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+
+
+# Route families, by suffix of the path of the file they serve
+_ROUTE_FAMILIES = (("metadata", "/maven-metadata.xml"), ("pom", ".pom"), ("jar", ".jar"))
+
+
+def get_route_family(path: str) -> str:
+    """
+    Classify a request by the kind of file it is for, so that responses are not labelled by every path.
+    :param path: The path of the request.
+    :return: "metadata", "pom" or "jar", with a ".checksum" suffix for their checksum files, or "other".
+    """
+
+    base = path.rpartition(".")[0]
+    for family, suffix in _ROUTE_FAMILIES:
+        if path.endswith(suffix):
+            return family
+        if base.endswith(suffix):
+            return f"{family}.checksum"
+    return "other"
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware measuring responses to clients, by route family.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        family = get_route_family(scope["path"])
+        status = "error"
+
+        async def send_measured(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_measured)
+        finally:
+            response_latency.labels(family).observe(time.perf_counter() - start)
+            responses.labels(family, status).inc()
+
+
+def render_metrics() -> Response:
+    """
+    Render the metrics in Prometheus' text format. When several worker processes write their metrics to the
+    directory set by the ``PROMETHEUS_MULTIPROC_DIR`` environment variable, the metrics of all of them are aggregated.
+    :return: The metrics.
+    """
+
+    registry = prometheus_client.REGISTRY
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = prometheus_client.CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return Response(prometheus_client.generate_latest(registry), media_type=prometheus_client.CONTENT_TYPE_LATEST)
+
+
+def mark_process_dead() -> None:
+    """
+    Drop the live gauges of this worker process from the aggregated metrics. Called on application shutdown.
+    """
+
+    if enabled and "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        multiprocess.mark_process_dead(os.getpid())
@@ -1,14 +1,14 @@
 from datetime import datetime
 from typing import List, Optional, Literal
 
-from pydantic import BaseModel, HttpUrl
+from pydantic import BaseModel
 
 DependencyType = Literal["required", "optional", "incompatible", "embedded"]
-FileType = Literal["required-resource-pack", "optional-resource-pack"]
 Loader = Literal["paper", "velocity", "waterfall", "bungeecord", "minecraft", "fabric", "forge", "sponge", "folia"]
-RequestedStatus = Literal["listed", "archived", "draft", "unlisted"]
-Status = Literal["listed", "archived", "draft", "unlisted", "scheduled", "unknown"]
-VersionType = Literal["release", "beta", "alpha", "unlisted", "scheduled", "unknown"]
+
+
+# Models only keep the fields the bridge uses, Modrinth's other fields are ignored when validating its responses so that
+# cached versions stay small
 
 
 class FileHashes(BaseModel):
@@ -21,11 +21,9 @@ class FileHashes(BaseModel):
 
 class File(BaseModel):
     hashes: FileHashes
-    url: HttpUrl
+    url: str
     filename: str
     primary: bool
-    size: int
-    file_type: Optional[FileType]
 
     class Config:
         frozen = True
@@ -42,22 +40,13 @@ class Dependency(BaseModel):
 
 
 class Version(BaseModel):
-    name: str
     version_number: str
-    changelog: Optional[str]
     dependencies: List[Dependency]
-    game_versions: List[str]
-    version_type: VersionType
-    loaders: List[Loader]
-    featured: bool
-    status: Status
-    requested_status: Optional[RequestedStatus]
+    # Modrinth supports more loaders than the bridge exposes
+    loaders: List[str]
     id: str
     project_id: str
-    author_id: str
     date_published: datetime
-    downloads: int
-    changelog_url: Optional[str]
     files: List[File]
 
     class Config:
@@ -69,50 +58,53 @@ class ExpandedDependency(Dependency, Version):
         frozen = True
 
 
-class License(BaseModel):
+class Project(BaseModel):
     id: str
-    name: str
-    url: Optional[str]
+    published: datetime
+    updated: datetime
+    versions: List[str]
+    loaders: List[str]
 
     class Config:
         frozen = True
 
 
-class GalleryImage(BaseModel):
-    url: str
-    featured: bool
-    title: Optional[str]
-    description: Optional[str]
-    created: datetime
-    ordering: int
-
-    class Config:
-        frozen = True
+class ProjectVersions(BaseModel):
+    """
+    All versions of a project, with the positions of the versions of each loader and of each version ID and number, so
+    that they can be filtered and found without copying them.
+    """
 
-
-class ModeratorMessage(BaseModel):
-    message: str
-    body: Optional[str]
+    versions: List[Version]
+    loaders: dict[str, tuple[int, ...]]
+    positions: dict[str, int]
 
     class Config:
         frozen = True
 
-
-class Project(BaseModel):
-    id: str
-    team: str
-    body_url: Optional[str]
-    moderator_message: Optional[ModeratorMessage]
-    published: datetime
-    updated: datetime
-    approved: Optional[datetime]
-    queued: Optional[datetime]
-    followers: int
-    license: License
-    versions: List[str]
-    game_versions: List[str]
-    loaders: List[Loader]
-    gallery: List[GalleryImage]
-
-    class Config:
-        frozen = True
+    @classmethod
+    def from_versions(cls, versions: List[Version]) -> "ProjectVersions":
+        loaders: dict[str, list[int]] = {}
+        positions: dict[str, int] = {}
+        for position, version in enumerate(versions):
+            for loader in version.loaders:
+                loaders.setdefault(loader, []).append(position)
+            positions.setdefault(version.version_number, position)
+        # IDs take precedence over version numbers, as they do for Modrinth
+        positions.update((version.id, position) for position, version in enumerate(versions))
+        return cls(versions=versions, loaders={loader: tuple(indices) for loader, indices in loaders.items()},
+                   positions=positions)
+
+    def for_loader(self, loader: str) -> List[Version]:
+        return [self.versions[position] for position in self.loaders.get(loader, ())]
+
+    def find(self, version_id_or_number: str, loader: Optional[str] = None) -> Optional[Version]:
+        position = self.positions.get(version_id_or_number)
+        if position is None:
+            return None
+        version = self.versions[position]
+        # Projects often publish the same version number once per loader, prefer the version of the requested one
+        if loader is not None and loader not in version.loaders and version.id != version_id_or_number:
+            return next((self.versions[position] for position in self.loaders.get(loader, ())
+                         if self.versions[position].version_number == version_id_or_number), version)
+        return version
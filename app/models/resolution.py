@@ -0,0 +1,65 @@
+from datetime import datetime
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+
+class ResolveRequest(BaseModel):
+    # Maven coordinates in "groupId:artifactId[:version]" format, with the group IDs of the repository routes
+    coordinates: List[str]
+
+    class Config:
+        frozen = True
+
+
+class ResolvedDependency(BaseModel):
+    group_id: str
+    artifact_id: str
+    version: str
+
+    class Config:
+        frozen = True
+
+
+class ResolvedArtifact(BaseModel):
+    coordinates: str
+    # Status the repository routes answer for this artifact, and why it could not be resolved if it is not 200
+    status: int = 200
+    detail: Optional[str] = None
+    group_id: Optional[str] = None
+    artifact_id: Optional[str] = None
+    version: Optional[str] = None
+    published: Optional[datetime] = None
+    download_url: Optional[str] = None
+    # Checksums of the JAR provided by the backend, by algorithm
+    hashes: dict[str, str] = {}
+    dependencies: List[ResolvedDependency] = []
+
+    class Config:
+        frozen = True
+
+
+class DependencyNode(BaseModel):
+    artifact: ResolvedArtifact
+    # Coordinates to resolve the direct dependencies of the artifact with
+    dependencies: List[str]
+
+    class Config:
+        frozen = True
+
+
+class DependencyClosure(BaseModel):
+    artifact: ResolvedArtifact
+    # Artifacts the artifact depends on, directly or not, nearest first. Those that could not be resolved have no
+    # dependencies of their own
+    dependencies: List[ResolvedArtifact]
+
+    class Config:
+        frozen = True
+
+
+class ResolveResponse(BaseModel):
+    artifacts: List[ResolvedArtifact]
+
+    class Config:
+        frozen = True
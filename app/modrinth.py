@@ -1,14 +1,22 @@
 import asyncio
+import json
 from typing import Optional, List
 
-import httpx
-from aiocache import cached
+from pydantic import TypeAdapter
 
-from app.models.modrinth import Version, Dependency, ExpandedDependency, Project
+from app.cache import cached
+from app.cache.revalidation import conditional_get
+from app.metrics import endpoint
+from app.models.modrinth import Version, Dependency, ExpandedDependency, Project, ProjectVersions
 from app.settings import settings
+from app.upstream import get_client, is_transient_status
 
+# Validator of Modrinth's version lists, parsing them straight from the response bytes
+_versions_adapter = TypeAdapter(List[Version])
 
-@cached(ttl=settings.modrinth.cache_project_expiration_seconds)
+
+@cached(ttl=settings.modrinth.cache_project_expiration_seconds,
+        max_size=settings.modrinth.cache_project_max_size)
 async def fetch_modrinth_project(project_id_or_slug: str) -> Optional[Project]:
     """
     Fetch Modrinth project's metadata.
@@ -17,23 +25,58 @@ async def fetch_modrinth_project(project_id_or_slug: str) -> Optional[Project]:
     - project_id_or_slug (str): The ID or slug of the Modrinth project to be fetched.
 
     Returns:
-    - Optional[Project]: A Project object containing the project's metadata if successful, or None if the project could
-      not be retrieved.
+    - Optional[Project]: A Project object containing the project's metadata if successful, or None if the project does
+      not exist.
+
+    Raises:
+    - httpx.HTTPStatusError: If Modrinth answers with another error than 404 Not Found, so that it is not cached as
+      missing.
     """
 
     url = f"{settings.modrinth.api_base_url}/project/{project_id_or_slug}"
-    async with httpx.AsyncClient() as client:
-        response = await client.get(url)
-        if response.status_code == 200:
-            return Project(**response.json())
-    return None
+    response = await conditional_get(get_client("modrinth"), url)
+    if response.status_code == 200:
+        return Project.model_validate_json(response.content)
+    if response.status_code == 404:
+        return None
+    response.raise_for_status()
+
+
+@cached(ttl=settings.modrinth.cache_version_expiration_seconds,
+        max_size=settings.modrinth.cache_project_versions_max_size)
+async def fetch_modrinth_project_versions(project_id_or_slug: str) -> Optional[ProjectVersions]:
+    """
+    Fetch all of Modrinth project's versions metadata, for every loader at once.
+
+    Only the fields used by the bridge are kept, changelogs being the largest part of the versions Modrinth sends.
+
+    Parameters:
+    - project_id_or_slug (str): The ID or slug of the Modrinth project for which versions are to be fetched.
+
+    Returns:
+    - Optional[ProjectVersions]: The project's versions, indexed by loader, version ID and version number, or None if
+      the project does not exist.
+
+    Raises:
+    - httpx.HTTPStatusError: If Modrinth answers with another error than 404 Not Found, so that it is not cached as
+      missing.
+    """
+
+    url = f"{settings.modrinth.api_base_url}/project/{project_id_or_slug}/version"
+    response = await conditional_get(get_client("modrinth"), url)
+    if response.status_code == 200:
+        return ProjectVersions.from_versions(_versions_adapter.validate_json(response.content))
+    if response.status_code == 404:
+        return None
+    response.raise_for_status()
 
 
-@cached(ttl=settings.modrinth.cache_version_expiration_seconds)
 async def fetch_modrinth_project_versions_for_loader(project_id_or_slug: str, loader: str) -> List[Version]:
     """
     Fetch Modrinth project's versions metadata for a specific loader.
 
+    Versions of all loaders are fetched and cached together, see `fetch_modrinth_project_versions`.
+
     Parameters:
     - project_id_or_slug (str): The ID or slug of the Modrinth project for which versions are to be fetched.
     - loader (str): The specific loader for which the project's versions are to be retrieved.
@@ -41,52 +84,115 @@ async def fetch_modrinth_project_versions_for_loader(project_id_or_slug: str, lo
     Returns:
     - list[Version]: A list of Version objects containing the project's version metadata for the specified loader.
       Returns an empty list if no versions are found for the loader or if the request fails.
+
+    Raises:
+    - httpx.HTTPStatusError: If Modrinth is temporarily unavailable, so that the failure is not cached.
     """
 
-    url = f"{settings.modrinth.api_base_url}/project/{project_id_or_slug}/version"
-    params = {
-        "loaders": [loader]
-    }
-    async with httpx.AsyncClient() as client:
-        response = await client.get(url, params=params)
-        if response.status_code == 200:
-            return [Version(**json_item) for json_item in response.json()]
-    return []
+    project_versions = await fetch_modrinth_project_versions(project_id_or_slug)
+    if project_versions is None:
+        return []
+    return project_versions.for_loader(loader)
 
 
-@cached(ttl=settings.modrinth.cache_version_expiration_seconds)
-async def fetch_modrinth_version_dependency(dependency: Dependency, depth: int) -> ExpandedDependency | Dependency:
+def batched(ids: list[str]) -> list[list[str]]:
     """
-    Expand a Modrinth version dependency to include full metadata.
+    Split IDs into batches small enough for a single Modrinth bulk request.
 
-    This function attempts to expand a given dependency by fetching additional version information from Modrinth.
-    If the version information is successfully retrieved, an expanded dependency object, containing both the original
-    dependency's data and the version data, is returned.
+    Parameters:
+    - ids (list[str]): The IDs to split.
+
+    Returns:
+    - list[list[str]]: The batches of IDs, in order.
+    """
+
+    size = settings.modrinth.ids_limit_per_batch
+    return [ids[i:i + size] for i in range(0, len(ids), size)]
+
+
+@endpoint
+async def fetch_modrinth_versions(version_ids: list[str], expand_dependencies_depth: int = 0) -> List[Version]:
+    """
+    Fetch metadata of multiple Modrinth versions with as few requests as possible.
+
+    Versions are fetched from Modrinth's multi-version endpoint, and stored in the per-version cache as if they were
+    fetched by `fetch_modrinth_project_version` with their project ID and version ID. Their dependencies are expanded
+    the same way, one bulk request per depth level.
 
     Parameters:
-    - dependency (Dependency): The dependency object to be expanded. It must contain a project ID and optionally a
-      version ID.
-    - depth (int): The recursion depth for expanding dependencies. If the depth is 0 or less, no expansion occurs.
+    - version_ids (list[str]): The IDs of the versions to be fetched.
+    - expand_dependencies_depth (int, optional): The depth to which dependencies should be expanded. Defaults to 0.
 
     Returns:
-    - ExpandedDependency | Dependency: An ExpandedDependency object if the version information is successfully retrieved
-      and merged with the original dependency. Otherwise, returns the original Dependency object if expansion is not
-      possible.
+    - list[Version]: The Version objects that could be retrieved, in the order of the given IDs. Unknown versions are
+      left out.
+
+    Raises:
+    - httpx.HTTPStatusError: If Modrinth is temporarily unavailable, so that the failure is not cached.
     """
 
-    # If no version is provided, just return the dependency. We do not have enough information to select the proper
-    # loader and channel
-    if not dependency.version_id:
-        return dependency
-    # Fetch version from Modrinth
-    version = await fetch_modrinth_project_version(dependency.project_id, dependency.version_id,
-                                                   expand_dependencies_depth=depth)
-    # If we cannot get the version, just return the dependency. Type can be used to differentiate between expanded and
-    # non-expanded dependencies
-    if not version:
-        return dependency
-    # Merge retrieved version information with dependency
-    return ExpandedDependency(**dependency.__dict__, **version.__dict__)
+    version_ids = list(dict.fromkeys(version_ids))
+    versions_by_id = {}
+    url = f"{settings.modrinth.api_base_url}/versions"
+    for batch in batched(version_ids):
+        response = await get_client("modrinth").get(url, params={"ids": json.dumps(batch)})
+        if is_transient_status(response.status_code):
+            response.raise_for_status()
+        if response.status_code != 200:
+            continue
+        for version in _versions_adapter.validate_json(response.content):
+            versions_by_id[version.id] = version
+
+    versions = [versions_by_id[version_id] for version_id in version_ids if version_id in versions_by_id]
+    versions = await expand_modrinth_versions_dependencies(versions, depth=expand_dependencies_depth)
+
+    await asyncio.gather(*[fetch_modrinth_project_version.set_cached(version, version.project_id, version.id,
+                                                                     expand_dependencies_depth)
+                           for version in versions])
+    return versions
+
+
+async def expand_modrinth_versions_dependencies(versions: list[Version], depth: int) -> List[Version]:
+    """
+    Expand the dependencies of multiple Modrinth versions together, with as few bulk requests as possible.
+
+    Parameters:
+    - versions (list[Version]): The versions, with unexpanded dependencies.
+    - depth (int): The depth to which dependencies should be expanded. Versions are returned as is if 0 or less.
+
+    Returns:
+    - list[Version]: The versions with their dependencies expanded, in the same order.
+
+    Raises:
+    - httpx.HTTPStatusError: If Modrinth is temporarily unavailable, so that the failure is not cached.
+    """
+
+    if depth <= 0:
+        return versions
+
+    expanded_dependencies = await fetch_modrinth_version_dependencies(
+        dependencies=[dependency for version in versions for dependency in version.dependencies], depth=depth)
+    expanded_versions = []
+    for version in versions:
+        count = len(version.dependencies)
+        expanded_versions.append(version.model_copy(update={"dependencies": expanded_dependencies[:count]}))
+        expanded_dependencies = expanded_dependencies[count:]
+    return expanded_versions
+
+
+def expand_dependency(dependency: Dependency, version: Version) -> ExpandedDependency:
+    """
+    Merge a Modrinth version dependency with the metadata of the version it points to.
+
+    Parameters:
+    - dependency (Dependency): The dependency to be expanded.
+    - version (Version): The version the dependency points to.
+
+    Returns:
+    - ExpandedDependency: The dependency's data and the version data. Fields present in both are taken from the version.
+    """
+
+    return ExpandedDependency(**{**dependency.__dict__, **version.__dict__})
 
 
 async def fetch_modrinth_version_dependencies(dependencies: list[Dependency], depth: int) -> List[
@@ -94,8 +200,9 @@ async def fetch_modrinth_version_dependencies(dependencies: list[Dependency], de
     """
     Expand Modrinth version dependencies to include full metadata.
 
-    This function takes a list of dependencies and attempts to expand each one to include full version metadata by
-    fetching additional information from Modrinth.
+    This function takes a list of dependencies and attempts to expand each one to include full version metadata.
+    Versions already in the per-version cache are taken from it, all the others are fetched from Modrinth with a single
+    bulk request.
 
     Parameters:
     - dependencies (list[Dependency]): A list of Dependency objects to be expanded.
@@ -103,19 +210,39 @@ async def fetch_modrinth_version_dependencies(dependencies: list[Dependency], de
 
     Returns:
     - list[ExpandedDependency | Dependency]: A list of dependencies, where each dependency is either expanded to include
-      full version metadata or left as is if expansion is not possible.
+      full version metadata or left as is if expansion is not possible. Type can be used to differentiate between
+      expanded and non-expanded dependencies.
+
+    Raises:
+    - httpx.HTTPStatusError: If Modrinth is temporarily unavailable, so that the failure is not cached.
     """
 
     # Stop if we go over recurse depth
     if depth <= 0:
         return []
     depth -= 1
-    # Fetch all expanded dependencies asynchronously
-    return await asyncio.gather(
-        *[fetch_modrinth_version_dependency(dependency=dependency, depth=depth) for dependency in dependencies])
 
+    # If no version is provided, the dependency is kept as is. We do not have enough information to select the proper
+    # loader and channel
+    known = [dependency for dependency in dependencies if dependency.version_id and dependency.project_id]
+    cached_versions = await asyncio.gather(*[fetch_modrinth_project_version.get_cached(dependency.project_id,
+                                                                                       dependency.version_id, depth)
+                                             for dependency in known])
+    versions: dict[str, Version] = {version.id: version for version in cached_versions if version}
+
+    # Fetch all the other versions at once
+    missing_ids = [dependency.version_id for dependency in dependencies
+                   if dependency.version_id and dependency.version_id not in versions]
+    if missing_ids:
+        for version in await fetch_modrinth_versions(missing_ids, expand_dependencies_depth=depth):
+            versions[version.id] = version
 
-@cached(ttl=settings.modrinth.cache_version_expiration_seconds)
+    return [expand_dependency(dependency, versions[dependency.version_id]) if dependency.version_id in versions
+            else dependency for dependency in dependencies]
+
+
+@cached(ttl=settings.modrinth.cache_version_expiration_seconds,
+        max_size=settings.modrinth.cache_version_max_size)
 async def fetch_modrinth_project_version(project_id_or_slug: str, version_id_or_number: str,
                                          expand_dependencies_depth: int = 1) -> Optional[Version]:
     """
@@ -133,19 +260,104 @@ async def fetch_modrinth_project_version(project_id_or_slug: str, version_id_or_
 
     Returns:
     - Optional[Version]: A Version object containing the project's version metadata if successful, or None if the
-      version could not be retrieved.
+      version does not exist.
+
+    Raises:
+    - httpx.HTTPStatusError: If Modrinth answers with another error than 404 Not Found, so that it is not cached as
+      missing.
     """
 
     url = f"{settings.modrinth.api_base_url}/project/{project_id_or_slug}/version/{version_id_or_number}"
-    async with httpx.AsyncClient() as client:
-        response = await client.get(url)
-        if response.status_code == 200:
-            data = response.json()
-            if expand_dependencies_depth <= 0:
-                return Version(**data)
-            dependencies = [Dependency(**dependency) for dependency in data['dependencies']]
-            expanded_dependencies = await fetch_modrinth_version_dependencies(dependencies=dependencies,
-                                                                              depth=expand_dependencies_depth)
-            data['dependencies'] = expanded_dependencies
-            return Version(**data)
-    return None
+    response = await conditional_get(get_client("modrinth"), url)
+    if response.status_code == 200:
+        version = Version.model_validate_json(response.content)
+        if expand_dependencies_depth <= 0:
+            return version
+        expanded_dependencies = await fetch_modrinth_version_dependencies(dependencies=version.dependencies,
+                                                                          depth=expand_dependencies_depth)
+        return version.model_copy(update={"dependencies": expanded_dependencies})
+    if response.status_code == 404:
+        return None
+    response.raise_for_status()
+
+
+async def find_modrinth_project_version(project_id_or_slug: str, version_id_or_number: str,
+                                        loader: Optional[str] = None) -> Optional[Version]:
+    """
+    Find a Modrinth project's version in the cached versions of the project, without calling Modrinth.
+
+    Parameters:
+    - project_id_or_slug (str): The ID or slug of the Modrinth project.
+    - version_id_or_number (str): The ID or version number of the project version to find.
+    - loader (str, optional): The loader whose version is preferred, when versions of several loaders share a version
+      number.
+
+    Returns:
+    - Optional[Version]: The version, with unexpanded dependencies, or None if the project's versions are not cached
+      or do not contain it.
+    """
+
+    project_versions = await fetch_modrinth_project_versions.get_cached(project_id_or_slug)
+    if project_versions is None:
+        return None
+    return project_versions.find(version_id_or_number, loader)
+
+
+async def resolve_modrinth_project_version(project_id_or_slug: str, version_id_or_number: str,
+                                           expand_dependencies_depth: int = 1,
+                                           loader: Optional[str] = None) -> Optional[Version]:
+    """
+    Get Modrinth project's version metadata, from cached data when possible.
+
+    The version is taken from the per-version cache if it is there, or else from the cached versions of the project,
+    with its dependencies expanded only if needed. It is only fetched from Modrinth if neither has it.
+
+    Projects often publish the same version number once per loader, while Modrinth only answers with one version for
+    it. When a loader is given and the version of another loader is cached or answered for the number, the version is
+    looked up in all versions of the project instead, and cached by its ID.
+
+    Parameters:
+    - project_id_or_slug (str): The ID or slug of the Modrinth project.
+    - version_id_or_number (str): The ID or version number of the project version to get.
+    - expand_dependencies_depth (int, optional): The depth to which dependencies should be expanded. Defaults to 1. No
+      dependency is expanded when 0, such as when only the version's files are needed.
+    - loader (str, optional): The loader whose version is wanted, or None for any version.
+
+    Returns:
+    - Optional[Version]: A Version object containing the project's version metadata if successful, or None if the
+      version could not be retrieved. It may be a version of another loader, if the loader has none with this number.
+
+    Raises:
+    - httpx.HTTPStatusError: If Modrinth is temporarily unavailable, so that the failure is not cached.
+    """
+
+    cached_version = await fetch_modrinth_project_version.get_cached(project_id_or_slug, version_id_or_number,
+                                                                     expand_dependencies_depth)
+    if cached_version is not None and (loader is None or loader in cached_version.loaders):
+        return cached_version
+
+    version = await find_modrinth_project_version(project_id_or_slug, version_id_or_number, loader)
+    if version is None:
+        if cached_version is None:
+            cached_version = await fetch_modrinth_project_version(project_id_or_slug, version_id_or_number,
+                                                                  expand_dependencies_depth=expand_dependencies_depth)
+        if cached_version is None or loader is None or loader in cached_version.loaders:
+            return cached_version
+        project_versions = await fetch_modrinth_project_versions(project_id_or_slug)
+        version = project_versions.find(version_id_or_number, loader) if project_versions is not None else None
+        if version is None or loader not in version.loaders:
+            return cached_version
+
+    # The version number is already cached with the version of another loader
+    key = version_id_or_number if cached_version is None else version.id
+    if expand_dependencies_depth > 0:
+        if key != version_id_or_number:
+            expanded = await fetch_modrinth_project_version.get_cached(project_id_or_slug, key,
+                                                                       expand_dependencies_depth)
+            if expanded is not None:
+                return expanded
+        dependencies = await fetch_modrinth_version_dependencies(dependencies=version.dependencies,
+                                                                 depth=expand_dependencies_depth)
+        version = version.model_copy(update={"dependencies": dependencies})
+        await fetch_modrinth_project_version.set_cached(version, project_id_or_slug, key, expand_dependencies_depth)
+    return version
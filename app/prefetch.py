@@ -0,0 +1,168 @@
+import asyncio
+import logging
+from collections import Counter
+from dataclasses import dataclass
+from typing import Optional
+
+from app.hangar import fetch_versions_history, fetch_version_metadata
+from app.modrinth import fetch_modrinth_project_versions, fetch_modrinth_project_version
+from app.settings import settings
+
+logger = logging.getLogger(__name__)
+
+HANGAR_GROUP_PREFIX = "io.papermc.hangar."
+MODRINTH_GROUP_PREFIX = "com.modrinth."
+
+
+@dataclass(frozen=True)
+class Coordinate:
+    """
+    A project exposed by the bridge, as Maven coordinates without version.
+    """
+
+    group_id: str
+    artifact_id: str
+
+    @classmethod
+    def parse(cls, value: str) -> "Coordinate":
+        """
+        Parse coordinates in Maven's "groupId:artifactId" format.
+        :param value: The coordinates, e.g. "io.papermc.hangar.paper:Example" or "com.modrinth.fabric:example".
+        :return: The coordinates.
+        :raises ValueError: If the coordinates are not of a project exposed by the bridge.
+        """
+
+        group_id, _, artifact_id = value.strip().partition(":")
+        if not artifact_id or not group_id.startswith((HANGAR_GROUP_PREFIX, MODRINTH_GROUP_PREFIX)):
+            raise ValueError(f"Invalid coordinates {value!r}, expected io.papermc.hangar.<platform>[.<channel>]:<slug> "
+                             f"or com.modrinth.<loader>:<project>")
+        return cls(group_id=group_id, artifact_id=artifact_id)
+
+    def __str__(self):
+        return f"{self.group_id}:{self.artifact_id}"
+
+
+# Coordinates configured in settings, parsed on startup
+_configured: list[Coordinate] = []
+# Requests per coordinates, halved at every prefetch round so that they reflect recent requests
+_requests: Counter[Coordinate] = Counter()
+
+
+def record_request(group_id: str, artifact_id: str) -> None:
+    """
+    Count a request for a project, so that the most requested ones are prefetched.
+    :param group_id: The group ID of the project.
+    :param artifact_id: The artifact ID of the project.
+    """
+
+    if settings.prefetch.learned_max > 0:
+        _requests[Coordinate(group_id=group_id, artifact_id=artifact_id)] += 1
+
+
+def get_hot_coordinates() -> list[Coordinate]:
+    """
+    Get the coordinates to prefetch: the configured ones, and the most requested ones.
+    :return: The coordinates, without duplicates.
+    """
+
+    coordinates = list(_configured)
+    if settings.prefetch.learned_max > 0:
+        coordinates += [coordinate for coordinate, _ in _requests.most_common(settings.prefetch.learned_max)]
+    return list(dict.fromkeys(coordinates))
+
+
+def _decay_requests() -> None:
+    for coordinate, count in list(_requests.items()):
+        if count <= 1:
+            del _requests[coordinate]
+        else:
+            _requests[coordinate] = count // 2
+
+
+async def prefetch(coordinate: Coordinate, within: float) -> None:
+    """
+    Make sure the versions of a project, and its latest version, are cached and stay fresh for at least the given time.
+    :param coordinate: The coordinates of the project.
+    :param within: How many seconds cached data must stay fresh for not to be fetched again.
+    """
+
+    if coordinate.group_id.startswith(HANGAR_GROUP_PREFIX):
+        platform, _, channel = coordinate.group_id.removeprefix(HANGAR_GROUP_PREFIX).partition(".")
+        versions, _ = await fetch_versions_history.prefetch(slug=coordinate.artifact_id, platform=platform,
+                                                            channel=channel or None, within=within)
+        if versions:
+            await fetch_version_metadata.prefetch(slug=coordinate.artifact_id, version=versions[0]['name'],
+                                                  within=within)
+    else:
+        loader = coordinate.group_id.removeprefix(MODRINTH_GROUP_PREFIX)
+        project_versions = await fetch_modrinth_project_versions.prefetch(project_id_or_slug=coordinate.artifact_id,
+                                                                          within=within)
+        versions = project_versions.for_loader(loader) if project_versions is not None else []
+        if versions:
+            await fetch_modrinth_project_version.prefetch(project_id_or_slug=coordinate.artifact_id,
+                                                          version_id_or_number=versions[0].version_number,
+                                                          within=within)
+
+
+async def prefetch_all(coordinates: list[Coordinate], within: float) -> None:
+    """
+    Prefetch projects concurrently, with the configured concurrency. Failures are logged, and do not stop the others.
+    :param coordinates: The coordinates of the projects.
+    :param within: How many seconds cached data must stay fresh for not to be fetched again.
+    """
+
+    semaphore = asyncio.Semaphore(settings.prefetch.concurrency)
+
+    async def prefetch_one(coordinate: Coordinate):
+        async with semaphore:
+            try:
+                await prefetch(coordinate, within=within)
+            except Exception as error:
+                logger.warning("Prefetching %s failed: %r", coordinate, error)
+
+    await asyncio.gather(*(prefetch_one(coordinate) for coordinate in coordinates))
+
+
+async def run_scheduler() -> None:
+    """
+    Prefetch hot projects at startup, then keep them fresh by refreshing them shortly before they expire, until
+    cancelled.
+    """
+
+    while True:
+        coordinates = get_hot_coordinates()
+        if coordinates:
+            logger.info("Prefetching %d projects", len(coordinates))
+            await prefetch_all(coordinates, within=settings.prefetch.refresh_ahead_seconds)
+        _decay_requests()
+        await asyncio.sleep(settings.prefetch.interval_seconds)
+
+
+_scheduler: Optional[asyncio.Task] = None
+
+
+def start() -> None:
+    """
+    Start the prefetch scheduler, if there is anything to prefetch. Called on application startup.
+    :raises ValueError: If configured coordinates are invalid.
+    """
+
+    global _scheduler
+    _configured[:] = [Coordinate.parse(value) for value in settings.prefetch.coordinates]
+    if _configured or settings.prefetch.learned_max > 0:
+        _scheduler = asyncio.create_task(run_scheduler())
+
+
+async def stop() -> None:
+    """
+    Stop the prefetch scheduler. Called on application shutdown.
+    """
+
+    global _scheduler
+    if _scheduler is not None:
+        _scheduler.cancel()
+        try:
+            await _scheduler
+        except asyncio.CancelledError:
+            pass
+        _scheduler = None
@@ -0,0 +1,239 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import math
+import time
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from enum import IntEnum
+from typing import Optional
+
+import httpx
+
+from app import metrics
+
+logger = logging.getLogger(__name__)
+
+# Statuses of responses telling that the backend is rate limiting or temporarily unavailable, retried after a while
+RETRIED_STATUS_CODES = (429, 503)
+
+# Minimum rate adapted from rate limit headers, in requests per second, so that requests are never held forever
+MIN_RATE = 1 / 3600
+
+
+class Priority(IntEnum):
+    """
+    Priority of an upstream request. When requests are rate limited, lower values are sent first.
+    """
+
+    INTERACTIVE = 0
+    BACKGROUND = 1
+
+
+# Priority of the upstream requests sent by the current task, background refreshes and prefetches lower it
+current_priority: ContextVar[Priority] = ContextVar("current_priority", default=Priority.INTERACTIVE)
+
+
+def _parse_number(value: Optional[str]) -> Optional[float]:
+    if value is None:
+        return None
+    try:
+        number = float(value)
+    except ValueError:
+        return None
+    return max(number, 0.0) if math.isfinite(number) else None
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a Retry-After header.
+    :param value: The header value, either a number of seconds or an HTTP date.
+    :return: How many seconds to wait before retrying, or None if the header is missing or invalid.
+    """
+
+    seconds = _parse_number(value)
+    if seconds is not None or value is None:
+        return seconds
+    try:
+        date = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    return max((date - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+class RateLimiter:
+    """
+    Token bucket limiting the rate of requests to a backend.
+
+    Tokens are refilled at a steady rate, up to a burst. Once a backend tells its quota with ``X-Ratelimit-Remaining``
+    and ``X-Ratelimit-Reset`` headers, the rate is adapted so that the remaining requests are spread until the quota is
+    reset, and requests are held when it is exhausted or when the backend asked to retry later. Waiting requests are
+    sent by priority, then in order of arrival.
+    """
+
+    def __init__(self, name: str, rate: float, burst: int):
+        self.name = name
+        self.default_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.throttled = 0
+        self.retries = 0
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._waiting: list[tuple[Priority, int]] = []
+        self._sequence = itertools.count()
+        self._changed = asyncio.Event()
+
+    async def acquire(self, priority: Priority = Priority.INTERACTIVE) -> None:
+        """
+        Wait until a request may be sent to the backend.
+        :param priority: The priority of the request.
+        """
+
+        entry = (priority, next(self._sequence))
+        heapq.heappush(self._waiting, entry)
+        metrics.record_upstream_waiting(self.name, 1)
+        if self._waiting[0] == entry:
+            # A request that was first in line must now wait for this one
+            self._notify()
+        try:
+            throttled = False
+            while True:
+                delay = self._take() if self._waiting[0] == entry else None
+                if delay == 0.0:
+                    return
+                if not throttled:
+                    throttled = True
+                    self.throttled += 1
+                    metrics.record_upstream_event(self.name, "throttled")
+                await self._wait(delay)
+        finally:
+            metrics.record_upstream_waiting(self.name, -1)
+            self._waiting.remove(entry)
+            heapq.heapify(self._waiting)
+            self._notify()
+
+    def update(self, headers: httpx.Headers) -> None:
+        """
+        Adapt the rate to the quota told by the rate limit headers of a response of the backend, if any.
+        :param headers: The headers of the response.
+        """
+
+        remaining = _parse_number(headers.get("X-Ratelimit-Remaining"))
+        reset = _parse_number(headers.get("X-Ratelimit-Reset"))
+        if remaining is None or reset is None:
+            return
+
+        self._refill(time.monotonic())
+        # Requests sent since this response was generated were already counted, never add tokens here
+        self._tokens = min(self._tokens, remaining)
+        if remaining < 1:
+            self.block(reset)
+        else:
+            self.rate = max(remaining / max(reset, 1.0), MIN_RATE)
+
+    def block(self, seconds: float) -> None:
+        """
+        Hold all requests for a while, such as when the backend asked to retry later.
+        :param seconds: How many seconds to hold requests for.
+        """
+
+        now = time.monotonic()
+        self._blocked_until = max(self._blocked_until, now + seconds)
+        # A single request may be sent once held requests are released, then tokens are refilled from then on
+        self._tokens = 1.0
+        self._updated = self._blocked_until
+        # The quota is reset by then, until the backend tells otherwise
+        self.rate = self.default_rate
+
+    def get_stats(self) -> dict[str, float]:
+        """
+        Get the state and counters of the rate limiter.
+        :return: The current rate, the number of waiting requests, of requests that had to wait and of retries.
+        """
+
+        return {"rate": self.rate, "waiting": self.waiting, "throttled": self.throttled, "retries": self.retries}
+
+    @property
+    def waiting(self) -> int:
+        """
+        The number of requests waiting to be sent.
+        """
+
+        return len(self._waiting)
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(float(self.burst), self._tokens + max(now - self._updated, 0.0) * self.rate)
+        self._updated = max(now, self._updated)
+
+    def _take(self) -> float:
+        # Take a token if one is available, otherwise tell how long until one is
+        now = time.monotonic()
+        if now < self._blocked_until:
+            return self._blocked_until - now
+        self._refill(now)
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+    def _notify(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def _wait(self, timeout: Optional[float]) -> None:
+        # Wait for the given time, or until the line of waiting requests changed
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+
+class RateLimitedTransport(httpx.AsyncBaseTransport):
+    """
+    HTTP transport sending requests through a rate limiter, at the priority of the current task, and retrying them when
+    the backend answers that it is rate limiting or temporarily unavailable.
+
+    Retries wait for the time given by the backend's Retry-After header, or back off exponentially if it has none.
+    Other requests to the backend are held meanwhile. Responses asking to wait longer than allowed are not retried.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, limiter: RateLimiter, max_retries: int,
+                 retry_backoff_seconds: float, max_retry_after_seconds: float):
+        self.transport = transport
+        self.limiter = limiter
+        self.max_retries = max_retries
+        self.retry_backoff_seconds = retry_backoff_seconds
+        self.max_retry_after_seconds = max_retry_after_seconds
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        priority = current_priority.get()
+        attempt = 0
+        while True:
+            await self.limiter.acquire(priority)
+            response = await self.transport.handle_async_request(request)
+            self.limiter.update(response.headers)
+            if response.status_code not in RETRIED_STATUS_CODES or attempt >= self.max_retries:
+                return response
+
+            delay = parse_retry_after(response.headers.get("Retry-After"))
+            if delay is None:
+                delay = self.retry_backoff_seconds * 2 ** attempt
+            if delay > self.max_retry_after_seconds:
+                return response
+
+            await response.aclose()
+            logger.warning("%s answered %d to %s, retrying in %.1f seconds", self.limiter.name, response.status_code,
+                           request.url, delay)
+            self.limiter.block(delay)
+            self.limiter.retries += 1
+            metrics.record_upstream_event(self.limiter.name, "retried")
+            attempt += 1
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
@@ -0,0 +1,240 @@
+import asyncio
+from typing import Optional, get_args
+
+import httpx
+from fastapi import HTTPException
+
+from app.hangar import platform_type, fetch_versions_metadata, fetch_version_metadata, get_version_download_url, \
+    parse_date
+from app.models.modrinth import Loader, Version, ExpandedDependency
+from app.models.resolution import ResolvedArtifact, ResolvedDependency
+from app.modrinth import fetch_modrinth_project_version, fetch_modrinth_project_versions_for_loader, \
+    resolve_modrinth_project_version, expand_modrinth_versions_dependencies
+from app.prefetch import Coordinate, HANGAR_GROUP_PREFIX, MODRINTH_GROUP_PREFIX, record_request
+from app.settings import settings
+
+
+# Upstream requests needed to resolve an artifact when nothing is cached: the versions of its project, then the version
+UPSTREAM_REQUESTS_PER_ARTIFACT = 2
+
+
+def get_max_coordinates() -> int:
+    """
+    Get the maximum number of coordinates a single request may resolve: the configured maximum, lowered to what the
+    rate limits of the backends allow to resolve before the deadline of the request when nothing is cached.
+    :return: The maximum number of coordinates.
+    """
+
+    max_coordinates = settings.resolve.max_coordinates
+    if settings.resolve.timeout_seconds <= 0:
+        return max_coordinates
+    upstream_requests = min(client.rate_limit_burst + client.rate_limit_per_second * settings.resolve.timeout_seconds
+                            for client in (settings.hangar.client, settings.modrinth.client))
+    return max(min(max_coordinates, int(upstream_requests // UPSTREAM_REQUESTS_PER_ARTIFACT)), 1)
+
+
+def parse_coordinates(value: str) -> tuple[Coordinate, Optional[str]]:
+    """
+    Parse coordinates in Maven's "groupId:artifactId[:version]" format.
+    :param value: The coordinates, e.g. "io.papermc.hangar.paper:Example:1.0.0" or "com.modrinth.fabric:example".
+    :return: The coordinates of the project, and the version, or None for the latest one.
+    :raises ValueError: If the coordinates are not of an artifact exposed by the bridge.
+    """
+
+    group_id, _, artifact_and_version = value.strip().partition(":")
+    artifact_id, _, version = artifact_and_version.partition(":")
+    try:
+        coordinate = Coordinate.parse(f"{group_id}:{artifact_id}")
+    except ValueError:
+        raise ValueError(f"Invalid coordinates {value!r}, expected io.papermc.hangar.<platform>[.<channel>]:<slug>"
+                         f"[:<version>] or com.modrinth.<loader>:<project>[:<version>]") from None
+    if coordinate.group_id.startswith(HANGAR_GROUP_PREFIX):
+        platform = coordinate.group_id.removeprefix(HANGAR_GROUP_PREFIX).partition(".")[0]
+        if platform not in get_args(platform_type):
+            raise ValueError(f"Unsupported Hangar platform {platform!r}")
+    elif coordinate.group_id.removeprefix(MODRINTH_GROUP_PREFIX) not in get_args(Loader):
+        raise ValueError(f"Unsupported Modrinth loader {coordinate.group_id.removeprefix(MODRINTH_GROUP_PREFIX)!r}")
+    return coordinate, version or None
+
+
+def get_failure(value: str, error: HTTPException | httpx.HTTPError) -> ResolvedArtifact:
+    """
+    Describe why an artifact could not be resolved, with the status its repository routes would answer.
+    :param value: The requested coordinates.
+    :param error: The error raised while resolving the artifact.
+    :return: The unresolved artifact.
+    """
+
+    if isinstance(error, HTTPException):
+        return ResolvedArtifact(coordinates=value, status=error.status_code, detail=str(error.detail))
+    if isinstance(error, httpx.TimeoutException):
+        return ResolvedArtifact(coordinates=value, status=504, detail="Upstream timed out")
+    return ResolvedArtifact(coordinates=value, status=502, detail="Upstream unavailable")
+
+
+async def resolve_hangar(value: str, coordinate: Coordinate, version: Optional[str]) -> ResolvedArtifact:
+    """
+    Resolve an artifact of a Hangar project, as its POM and JAR routes would.
+    :param value: The requested coordinates.
+    :param coordinate: The coordinates of the project.
+    :param version: The version, or None for the latest one.
+    :return: The resolved artifact.
+    """
+
+    platform, _, channel = coordinate.group_id.removeprefix(HANGAR_GROUP_PREFIX).partition(".")
+    slug = coordinate.artifact_id
+    if version is None:
+        versions = await fetch_versions_metadata(slug=slug, platform=platform, channel=channel or None)
+        if len(versions) == 0:
+            raise HTTPException(status_code=404, detail="No versions found")
+        version = versions[0]['name']
+
+    version_metadata = await fetch_version_metadata(slug, version)
+    download = (version_metadata.get("downloads") or {}).get(platform.upper()) or {}
+    file_info = download.get("fileInfo") or {}
+    hashes = {"sha256": file_info["sha256Hash"]} if file_info.get("sha256Hash") else {}
+    return ResolvedArtifact(coordinates=value, group_id=coordinate.group_id, artifact_id=slug, version=version,
+                            published=parse_date(version_metadata["createdAt"]),
+                            download_url=get_version_download_url(slug=slug, platform=platform, version=version),
+                            hashes=hashes,
+                            dependencies=[ResolvedDependency(group_id=dep['namespace'], artifact_id=dep['name'],
+                                                             version=dep['version'])
+                                          for dep in version_metadata.get("dependencies", [])])
+
+
+async def find_modrinth_version(coordinate: Coordinate, version_id_or_number: Optional[str]) -> tuple[str, Version]:
+    """
+    Find the version of a Modrinth artifact, from cached data when possible, without expanding its dependencies unless
+    it was cached with them.
+    :param coordinate: The coordinates of the project.
+    :param version_id_or_number: The ID or version number of the version, or None for the latest one of the loader.
+    :return: The ID or version number to cache the version with once expanded, and the version.
+    """
+
+    loader = coordinate.group_id.removeprefix(MODRINTH_GROUP_PREFIX)
+    project_id_or_slug = coordinate.artifact_id
+    if version_id_or_number is None:
+        versions = await fetch_modrinth_project_versions_for_loader(project_id_or_slug=project_id_or_slug,
+                                                                    loader=loader)
+        if not versions:
+            raise HTTPException(status_code=404, detail="Project not found")
+        version_id_or_number = versions[0].version_number
+
+    version = await fetch_modrinth_project_version.get_cached(project_id_or_slug, version_id_or_number, 1)
+    if version is None or loader not in version.loaders:
+        other_loader = version is not None
+        version = await resolve_modrinth_project_version(project_id_or_slug=project_id_or_slug,
+                                                         version_id_or_number=version_id_or_number,
+                                                         expand_dependencies_depth=0, loader=loader)
+        # The version number is already cached with the version of another loader, this one is cached by its ID
+        if other_loader and version and loader in version.loaders:
+            version_id_or_number = version.id
+    if not version:
+        raise HTTPException(status_code=404, detail="Version not found")
+    if loader not in version.loaders:
+        raise HTTPException(status_code=404, detail=f"Version does not contain a file for loader {loader}")
+    return version_id_or_number, version
+
+
+def get_modrinth_artifact(value: str, coordinate: Coordinate, version: Version) -> ResolvedArtifact:
+    """
+    Describe a resolved Modrinth artifact, as its POM and JAR routes would.
+    :param value: The requested coordinates.
+    :param coordinate: The coordinates of the project.
+    :param version: The version, with expanded dependencies.
+    :return: The resolved artifact.
+    """
+
+    primary_file = next((file for file in version.files if file.primary), None)
+    if primary_file is None:
+        return ResolvedArtifact(coordinates=value, status=404, detail="JAR file not found")
+    return ResolvedArtifact(coordinates=value, group_id=coordinate.group_id, artifact_id=coordinate.artifact_id,
+                            version=version.version_number, published=version.date_published,
+                            download_url=primary_file.url, hashes=primary_file.hashes.model_dump(),
+                            dependencies=[ResolvedDependency(group_id=coordinate.group_id,
+                                                             artifact_id=dependency.project_id,
+                                                             version=dependency.version_number)
+                                          for dependency in version.dependencies
+                                          if isinstance(dependency, ExpandedDependency)])
+
+
+def get_modrinth_dependency_coordinates(coordinate: Coordinate, version: Version) -> list[str]:
+    # Dependencies are resolved by version ID, under which their bulk fetch cached them
+    return [f"{coordinate.group_id}:{dependency.project_id}:{dependency.id}" for dependency in version.dependencies
+            if isinstance(dependency, ExpandedDependency)]
+
+
+async def resolve_all(values: list[str]) -> list[ResolvedArtifact]:
+    """
+    Resolve artifacts of Hangar and Modrinth projects at once: their version, download URL, checksums and dependencies,
+    as their repository routes would. See :func:`resolve_with_dependencies`.
+    :param values: Coordinates in Maven's "groupId:artifactId[:version]" format, without version for the latest one.
+    :return: The artifacts, in the order of the coordinates, with the status their routes would answer and why when
+        they could not be resolved.
+    """
+
+    resolved = await resolve_with_dependencies(values)
+    return [resolved[value][0] for value in values]
+
+
+async def resolve_with_dependencies(values: list[str]) -> dict[str, tuple[ResolvedArtifact, list[str]]]:
+    """
+    Resolve artifacts of Hangar and Modrinth projects at once, along with the coordinates to resolve their dependencies
+    with in turn. Artifacts are looked up with the configured concurrency, from cached data when possible. Dependencies
+    of Modrinth versions are then expanded all together, with Modrinth's bulk endpoint, and cached for their POMs.
+    :param values: Coordinates in Maven's "groupId:artifactId[:version]" format, without version for the latest one.
+    :return: The artifacts, and the coordinates of their dependencies, by requested coordinates. Artifacts that could
+        not be resolved have the status their routes would answer, and no dependencies.
+    """
+
+    semaphore = asyncio.Semaphore(settings.resolve.concurrency)
+    resolved: dict[str, tuple[ResolvedArtifact, list[str]]] = {}
+    # Modrinth versions whose dependencies are left to expand, by requested coordinates
+    unexpanded: dict[str, tuple[Coordinate, str, Version]] = {}
+    expanded: dict[str, tuple[Coordinate, Version]] = {}
+
+    async def resolve_one(value: str):
+        try:
+            coordinate, version = parse_coordinates(value)
+        except ValueError as error:
+            resolved[value] = ResolvedArtifact(coordinates=value, status=400, detail=str(error)), []
+            return
+
+        async with semaphore:
+            try:
+                if coordinate.group_id.startswith(HANGAR_GROUP_PREFIX):
+                    artifact = await resolve_hangar(value, coordinate, version)
+                    resolved[value] = artifact, [f"{dependency.group_id}:{dependency.artifact_id}:{dependency.version}"
+                                                 for dependency in artifact.dependencies]
+                else:
+                    version_id_or_number, found = await find_modrinth_version(coordinate, version)
+                    if all(isinstance(dependency, ExpandedDependency) or not dependency.version_id
+                           for dependency in found.dependencies):
+                        expanded[value] = (coordinate, found)
+                    else:
+                        unexpanded[value] = (coordinate, version_id_or_number, found)
+                record_request(coordinate.group_id, coordinate.artifact_id)
+            except (HTTPException, httpx.HTTPError) as error:
+                resolved[value] = get_failure(value, error), []
+
+    unique_values = list(dict.fromkeys(values))
+    await asyncio.gather(*(resolve_one(value) for value in unique_values))
+
+    if unexpanded:
+        try:
+            versions = await expand_modrinth_versions_dependencies([found for _, _, found in unexpanded.values()],
+                                                                   depth=1)
+        except httpx.HTTPError as error:
+            resolved.update((value, (get_failure(value, error), [])) for value in unexpanded)
+        else:
+            for (value, (coordinate, _, _)), version in zip(unexpanded.items(), versions):
+                expanded[value] = (coordinate, version)
+            # Their POMs are likely to be requested next
+            await asyncio.gather(*[fetch_modrinth_project_version.set_cached(version, coordinate.artifact_id,
+                                                                             version_id_or_number, 1)
+                                   for (coordinate, version_id_or_number, _), version in zip(unexpanded.values(),
+                                                                                             versions)])
+    resolved.update((value, (get_modrinth_artifact(value, coordinate, version),
+                             get_modrinth_dependency_coordinates(coordinate, version)))
+                    for value, (coordinate, version) in expanded.items())
+    return resolved
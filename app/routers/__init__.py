@@ -1,12 +1,16 @@
 from fastapi import APIRouter
 
+from .closure import router as closure_router
 from .hangar import router as hangar_router
 from .modrinth import router as modrinth_router
+from .resolve import router as resolve_router
 
 api_router = APIRouter()
 
 api_router.include_router(hangar_router)
 api_router.include_router(modrinth_router)
+api_router.include_router(resolve_router)
+api_router.include_router(closure_router)
 
 tags_metadata = [
     {
@@ -24,5 +28,10 @@ tags_metadata = [
     {
         "name": "modrinth",
         "description": "Maven Repository URL implementation for Modrinth.",
+    },
+    {
+        "name": "resolve",
+        "description": "Resolution of many Hangar and Modrinth artifacts at once, such as before a build, and of all "
+                       "the dependencies of an artifact.",
     }
 ]
@@ -0,0 +1,126 @@
+import hashlib
+import re
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+
+from starlette.requests import Request
+from starlette.responses import RedirectResponse, Response
+
+# Suffix of ETags of compressed variants of a response
+_ENCODING_SUFFIX = re.compile(r'-(gzip|br)"$')
+
+
+def compute_etag(*parts: str) -> str:
+    """
+    Compute a strong ETag from everything a response is generated from, so that it can be checked without generating
+    the response.
+    :param parts: The values the response is generated from.
+    :return: The ETag, quoted.
+    """
+
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        digest.update(str(part).encode())
+        digest.update(b"\0")
+    return f'"{digest.hexdigest()}"'
+
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    """
+    Get the ETag of a compressed variant of a response, as strong ETags must differ between representations.
+    :param etag: The ETag of the uncompressed response.
+    :param encoding: The content encoding of the variant.
+    :return: The ETag of the variant.
+    """
+
+    return f'{etag[:-1]}-{encoding}"'
+
+
+def format_http_date(value: datetime) -> str:
+    """
+    Format a date as an RFC 7231 HTTP date. Dates without timezone are considered as UTC.
+    :param value: The date.
+    :return: The formatted date, e.g. "Sun, 06 Nov 1994 08:49:37 GMT".
+    """
+
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def caching_headers(max_age: int, etag: str, last_modified: Optional[datetime]) -> dict[str, str]:
+    """
+    Get the caching headers of a response.
+    :param max_age: How many seconds clients may cache the response.
+    :param etag: The ETag of the response.
+    :param last_modified: When the response content last changed, if known.
+    :return: The headers.
+    """
+
+    headers = {"Cache-Control": f"public, max-age={max_age}", "ETag": etag}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_http_date(last_modified)
+    return headers
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime]) -> bool:
+    """
+    Evaluate the conditional headers of a GET or HEAD request, according to RFC 7232.
+
+    If-None-Match takes precedence over If-Modified-Since, which is only evaluated when the former is absent.
+    :param request: The request.
+    :param etag: The current ETag of the requested resource.
+    :param last_modified: When the requested resource last changed, if known.
+    :return: Whether the client's copy is still valid, and a 304 Not Modified response should be sent.
+    """
+
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        # Weak comparison, as mandated for If-None-Match, where all variants of a response match
+        candidates = {_ENCODING_SUFFIX.sub('"', candidate.strip().removeprefix("W/"))
+                      for candidate in if_none_match.split(",")}
+        return etag.removeprefix("W/") in candidates
+
+    if_modified_since = request.headers.get("If-Modified-Since")
+    if if_modified_since is not None and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        if last_modified.tzinfo is None:
+            last_modified = last_modified.replace(tzinfo=timezone.utc)
+        # HTTP dates have a precision of one second
+        return last_modified.replace(microsecond=0) <= since
+
+    return False
+
+
+def body_response(request: Request, body: bytes, media_type: str, headers: dict[str, str]) -> Response:
+    """
+    Respond with a body, or only with the headers describing it to HEAD requests.
+    :param request: The request.
+    :param body: The response body.
+    :param media_type: The media type of the body.
+    :param headers: The headers of the response.
+    :return: The response.
+    """
+
+    if request.method == "HEAD":
+        return Response(media_type=media_type, headers={**headers, "Content-Length": str(len(body))})
+    return Response(content=body, media_type=media_type, headers=headers)
+
+
+def redirect_response(url: str, max_age: int) -> RedirectResponse:
+    """
+    Redirect to an artifact hosted by the backend, letting clients cache the redirection.
+    :param url: The URL of the artifact.
+    :param max_age: How many seconds clients may cache the redirection.
+    :return: The response.
+    """
+
+    return RedirectResponse(url=url, headers={"Cache-Control": f"public, max-age={max_age}"})
@@ -0,0 +1,58 @@
+import hashlib
+from datetime import datetime
+from typing import Literal, Optional, get_args
+
+from fastapi import HTTPException
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app.routers.caching import caching_headers, is_not_modified, compute_etag, body_response
+
+# Checksum files requested by Maven and Gradle next to every artifact, by extension
+ChecksumAlgorithm = Literal["md5", "sha1", "sha256", "sha512"]
+checksum_algorithms: tuple[str, ...] = get_args(ChecksumAlgorithm)
+
+
+def compute_checksums(content: bytes) -> dict[str, str]:
+    """
+    Compute the checksums of a generated file, for every supported algorithm.
+    :param content: The file content.
+    :return: The hexadecimal checksums, by algorithm.
+    """
+
+    return {algorithm: hashlib.new(algorithm, content).hexdigest() for algorithm in checksum_algorithms}
+
+
+def validate_checksum_algorithm(algorithm: str) -> ChecksumAlgorithm:
+    """
+    Check that a checksum file extension is supported.
+    :param algorithm: The extension of the requested checksum file.
+    :return: The checksum algorithm.
+    :raises HTTPException: 404 if the algorithm is not supported, as build tools treat it as a missing checksum.
+    """
+
+    if algorithm not in checksum_algorithms:
+        raise HTTPException(status_code=404, detail="Checksum algorithm not supported")
+    return algorithm
+
+
+def checksum_response(request: Request, checksum: Optional[str], last_modified: Optional[datetime],
+                      max_age: int) -> Response:
+    """
+    Respond with a checksum file whose checksum is already known, such as one provided by the upstream.
+    :param request: The request.
+    :param checksum: The hexadecimal checksum, if known.
+    :param last_modified: When the checksummed file last changed, if known.
+    :param max_age: How many seconds clients may cache the response.
+    :return: A 304 Not Modified response if the client's copy is still valid, otherwise the checksum.
+    :raises HTTPException: 404 if the checksum is not known.
+    """
+
+    if checksum is None:
+        raise HTTPException(status_code=404, detail="Checksum not available")
+
+    etag = compute_etag(checksum)
+    headers = caching_headers(max_age, etag, last_modified)
+    if is_not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+    return body_response(request, checksum.encode(), media_type="text/plain", headers=headers)
@@ -0,0 +1,39 @@
+from fastapi import APIRouter
+from fastapi_xml import XmlAppResponse
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app.closure import fetch_dependency_closure, get_managed_dependencies
+from app.maven import iter_bom
+from app.models.resolution import DependencyClosure
+from app.routers.caching import compute_etag
+from app.routers.rendered import respond, pom_cache
+from app.settings import settings
+from app.timeouts import deadline
+
+router = APIRouter()
+
+
+@router.get("/closure/{coordinates}", response_model=DependencyClosure, tags=["resolve"])
+async def get_closure(coordinates: str) -> DependencyClosure:
+    # Dependency graphs may need many upstream requests, as batches of coordinates do
+    with deadline(settings.resolve.timeout_seconds):
+        return await fetch_dependency_closure(coordinates)
+
+
+@router.get("/closure/{coordinates}/bom.pom", response_class=XmlAppResponse, tags=["resolve"])
+@router.head("/closure/{coordinates}/bom.pom", tags=["resolve"])
+async def get_closure_bom(request: Request, coordinates: str) -> Response:
+    with deadline(settings.resolve.timeout_seconds):
+        closure = await fetch_dependency_closure(coordinates)
+    artifact = closure.artifact
+    dependencies = get_managed_dependencies(closure)
+
+    # Identify the BOM from the managed versions alone, so that it is only rendered if the client or the cache do not
+    # already have it
+    etag = compute_etag("bom", artifact.group_id, artifact.artifact_id, artifact.version,
+                        *(f"{group_id}:{artifact_id}:{version}" for group_id, artifact_id, version in dependencies))
+    return await respond(request, pom_cache, etag=etag, last_modified=None,
+                         max_age=settings.cache.pom_expiration_seconds,
+                         render=lambda: iter_bom(artifact.group_id, f"{artifact.artifact_id}-bom", artifact.version,
+                                                 dependencies))
@@ -1,22 +1,21 @@
 from typing import Optional
 
-from fastapi import HTTPException, APIRouter, Depends
+from fastapi import HTTPException, APIRouter
 from starlette.requests import Request
-from starlette.responses import RedirectResponse, Response
+from starlette.responses import RedirectResponse, Response, PlainTextResponse
 
-from app.hangar import platform_type, get_version_download_url
+from app.hangar import platform_type, get_version_download_url, fetch_version_metadata, parse_date
+from app.routers.caching import redirect_response
+from app.routers.checksums import checksum_response, validate_checksum_algorithm
 from app.settings import settings
 
-
-async def cache_control(request: Request, response: Response):
-    response.headers.update({"Cache-Control": f"public, max-age={settings.cache.jar_expiration_seconds}"})
-
-
-router = APIRouter(dependencies=[Depends(cache_control)])
+router = APIRouter()
 
 
 @router.get("/repository/io/papermc/hangar/{platform}/{slug}/{version}/{filename}.jar",
             response_class=RedirectResponse, tags=["hangar_with_platform"])
+@router.head("/repository/io/papermc/hangar/{platform}/{slug}/{version}/{filename}.jar",
+             tags=["hangar_with_platform"])
 async def get_jar_with_platform(platform: platform_type, slug: str, version: str, filename: str) -> RedirectResponse:
     return await get_jar_with_platform_and_channel(platform=platform, channel=None, slug=slug, version=version,
                                                    filename=filename)
@@ -24,6 +23,8 @@ async def get_jar_with_platform(platform: platform_type, slug: str, version: str
 
 @router.get("/repository/io/papermc/hangar/{platform}/{channel}/{slug}/{version}/{filename}.jar",
             response_class=RedirectResponse, tags=["hangar_with_platform_and_channel"])
+@router.head("/repository/io/papermc/hangar/{platform}/{channel}/{slug}/{version}/{filename}.jar",
+             tags=["hangar_with_platform_and_channel"])
 async def get_jar_with_platform_and_channel(platform: platform_type, channel: Optional[str], slug: str, version: str,
                                             filename: str) -> RedirectResponse:
     # Validate that the filename matches the expected "{slug}-{version}.jar" pattern
@@ -35,4 +36,43 @@ async def get_jar_with_platform_and_channel(platform: platform_type, channel: Op
     download_url = get_version_download_url(slug=slug, platform=platform, version=version)
 
     # Redirect directly to the Hangar download URL
-    return RedirectResponse(url=download_url)
+    return redirect_response(download_url, max_age=settings.cache.jar_expiration_seconds)
+
+
+async def respond_jar_checksum(request: Request, platform: platform_type, slug: str, version: str, filename: str,
+                               algorithm: str) -> Response:
+    algorithm = validate_checksum_algorithm(algorithm)
+    expected_filename = f"{slug}-{version}"
+    if filename != expected_filename:
+        raise HTTPException(status_code=400, detail="Filename does not match expected pattern")
+
+    # Hangar provides the SHA-256 hash of files it hosts, no need to download them. Externally hosted files have none.
+    version_metadata = await fetch_version_metadata(slug, version)
+    download = (version_metadata.get("downloads") or {}).get(platform.upper()) or {}
+    file_info = download.get("fileInfo") or {}
+    checksums = {"sha256": file_info.get("sha256Hash")}
+
+    created_at = parse_date(version_metadata["createdAt"])
+    return checksum_response(request, checksums.get(algorithm), last_modified=created_at,
+                             max_age=settings.cache.jar_expiration_seconds)
+
+
+@router.get("/repository/io/papermc/hangar/{platform}/{slug}/{version}/{filename}.jar.{algorithm}",
+            response_class=PlainTextResponse, tags=["hangar_with_platform"])
+@router.head("/repository/io/papermc/hangar/{platform}/{slug}/{version}/{filename}.jar.{algorithm}",
+             tags=["hangar_with_platform"])
+async def get_jar_checksum_with_platform(request: Request, platform: platform_type, slug: str, version: str,
+                                         filename: str, algorithm: str) -> Response:
+    return await respond_jar_checksum(request=request, platform=platform, slug=slug, version=version,
+                                      filename=filename, algorithm=algorithm)
+
+
+@router.get("/repository/io/papermc/hangar/{platform}/{channel}/{slug}/{version}/{filename}.jar.{algorithm}",
+            response_class=PlainTextResponse, tags=["hangar_with_platform_and_channel"])
+@router.head("/repository/io/papermc/hangar/{platform}/{channel}/{slug}/{version}/{filename}.jar.{algorithm}",
+             tags=["hangar_with_platform_and_channel"])
+async def get_jar_checksum_with_platform_and_channel(request: Request, platform: platform_type, channel: Optional[str],
+                                                     slug: str, version: str, filename: str,
+                                                     algorithm: str) -> Response:
+    return await respond_jar_checksum(request=request, platform=platform, slug=slug, version=version,
+                                      filename=filename, algorithm=algorithm)
@@ -1,26 +1,23 @@
-from datetime import datetime
 from typing import Optional
 
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException
 from fastapi_xml import XmlAppResponse
 from starlette.requests import Request
-from starlette.responses import Response
-
-from app.hangar import platform_type, fetch_versions_metadata
+from starlette.responses import Response, PlainTextResponse
+
+from app.hangar import platform_type, fetch_versions_metadata, parse_date
+from app.maven import iter_maven_metadata
+from app.prefetch import record_request
+from app.routers.caching import compute_etag
+from app.routers.checksums import ChecksumAlgorithm, validate_checksum_algorithm
+from app.routers.rendered import respond, metadata_cache, stream_versions
 from app.settings import settings
 
+router = APIRouter()
 
-async def cache_control(request: Request, response: Response):
-    response.headers.update({"Cache-Control": f"public, max-age={settings.cache.metadata_expiration_seconds}"})
-
-
-router = APIRouter(dependencies=[Depends(cache_control)])
 
-
-@router.get("/repository/io/papermc/hangar/{platform}/{channel}/{slug}/maven-metadata.xml",
-            response_class=XmlAppResponse, tags=["hangar_with_platform_and_channel"])
-async def get_maven_metadata_with_platform_and_channel(platform: platform_type, slug: str,
-                                                       channel: Optional[str]) -> Response:
+async def respond_maven_metadata(request: Request, platform: platform_type, channel: Optional[str], slug: str,
+                                 checksum: Optional[ChecksumAlgorithm] = None) -> Response:
     versions = await fetch_versions_metadata(slug=slug, platform=platform, channel=channel)
 
     # Validate the number of versions
@@ -32,7 +29,7 @@ async def get_maven_metadata_with_platform_and_channel(platform: platform_type,
     last_updated = latest_version.get("createdAt", "")
 
     # Convert to Maven's lastUpdated format (YYYYMMDDHHMMSS)
-    last_updated_dt = datetime.fromisoformat(last_updated.rstrip("Z"))
+    last_updated_dt = parse_date(last_updated)
     last_updated_maven_format = last_updated_dt.strftime("%Y%m%d%H%M%S")
 
     # Generate group ID depending on parameters
@@ -41,27 +38,50 @@ async def get_maven_metadata_with_platform_and_channel(platform: platform_type,
         maven_group_id += f".{platform}"
     if channel is not None:
         maven_group_id += f".{channel}"
+    record_request(maven_group_id, slug)
+
+    # Identify the metadata from the versions alone, so that it is only rendered if the client or the cache do not
+    # already have it
+    etag = compute_etag(maven_group_id, slug, last_updated_maven_format, *(version['name'] for version in versions))
+    return await respond(request, metadata_cache, etag=etag, last_modified=last_updated_dt,
+                         max_age=settings.cache.metadata_expiration_seconds,
+                         render=lambda: iter_maven_metadata(maven_group_id, slug, latest_version['name'],
+                                                            (version['name'] for version in versions),
+                                                            last_updated_maven_format),
+                         checksum=checksum, stream=stream_versions(versions))
+
 
-    metadata = f"""<metadata>
-  <groupId>{maven_group_id}</groupId>
-  <artifactId>{slug}</artifactId>
-  <versioning>
-    <latest>{latest_version['name']}</latest>
-    <release>{latest_version['name']}</release>
-    <versions>
-"""
-    for version in versions:
-        metadata += f"      <version>{version['name']}</version>\n"
-
-    metadata += f"""    </versions>
-    <lastUpdated>{last_updated_maven_format}</lastUpdated>
-  </versioning>
-</metadata>
-"""
-    return Response(content=metadata.strip(), media_type="application/xml")
+@router.get("/repository/io/papermc/hangar/{platform}/{channel}/{slug}/maven-metadata.xml",
+            response_class=XmlAppResponse, tags=["hangar_with_platform_and_channel"])
+@router.head("/repository/io/papermc/hangar/{platform}/{channel}/{slug}/maven-metadata.xml",
+             tags=["hangar_with_platform_and_channel"])
+async def get_maven_metadata_with_platform_and_channel(request: Request, platform: platform_type, slug: str,
+                                                       channel: Optional[str]) -> Response:
+    return await respond_maven_metadata(request=request, platform=platform, channel=channel, slug=slug)
 
 
 @router.get("/repository/io/papermc/hangar/{platform}/{slug}/maven-metadata.xml", response_class=XmlAppResponse,
             tags=["hangar_with_platform"])
-async def get_maven_metadata_with_platform(platform: platform_type, slug: str) -> Response:
-    return await get_maven_metadata_with_platform_and_channel(platform=platform, channel=None, slug=slug)
+@router.head("/repository/io/papermc/hangar/{platform}/{slug}/maven-metadata.xml", tags=["hangar_with_platform"])
+async def get_maven_metadata_with_platform(request: Request, platform: platform_type, slug: str) -> Response:
+    return await respond_maven_metadata(request=request, platform=platform, channel=None, slug=slug)
+
+
+@router.get("/repository/io/papermc/hangar/{platform}/{channel}/{slug}/maven-metadata.xml.{algorithm}",
+            response_class=PlainTextResponse, tags=["hangar_with_platform_and_channel"])
+@router.head("/repository/io/papermc/hangar/{platform}/{channel}/{slug}/maven-metadata.xml.{algorithm}",
+             tags=["hangar_with_platform_and_channel"])
+async def get_maven_metadata_checksum_with_platform_and_channel(request: Request, platform: platform_type, slug: str,
+                                                                channel: Optional[str], algorithm: str) -> Response:
+    return await respond_maven_metadata(request=request, platform=platform, channel=channel, slug=slug,
+                                        checksum=validate_checksum_algorithm(algorithm))
+
+
+@router.get("/repository/io/papermc/hangar/{platform}/{slug}/maven-metadata.xml.{algorithm}",
+            response_class=PlainTextResponse, tags=["hangar_with_platform"])
+@router.head("/repository/io/papermc/hangar/{platform}/{slug}/maven-metadata.xml.{algorithm}",
+             tags=["hangar_with_platform"])
+async def get_maven_metadata_checksum_with_platform(request: Request, platform: platform_type, slug: str,
+                                                    algorithm: str) -> Response:
+    return await respond_maven_metadata(request=request, platform=platform, channel=None, slug=slug,
+                                        checksum=validate_checksum_algorithm(algorithm))
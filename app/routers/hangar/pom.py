@@ -1,25 +1,23 @@
 from typing import Optional
 
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException
 from fastapi_xml import XmlAppResponse
 from starlette.requests import Request
-from starlette.responses import Response
-
-from app.hangar import platform_type, fetch_version_metadata
+from starlette.responses import Response, PlainTextResponse
+
+from app.hangar import platform_type, fetch_version_metadata, parse_date
+from app.maven import iter_pom, MavenDependency
+from app.prefetch import record_request
+from app.routers.caching import compute_etag
+from app.routers.checksums import ChecksumAlgorithm, validate_checksum_algorithm
+from app.routers.rendered import respond, pom_cache
 from app.settings import settings
 
+router = APIRouter()
 
-async def cache_control(request: Request, response: Response):
-    response.headers.update({"Cache-Control": f"public, max-age={settings.cache.pom_expiration_seconds}"})
-
-
-router = APIRouter(dependencies=[Depends(cache_control)])
 
-
-@router.get("/repository/io/papermc/hangar/{platform}/{channel}/{slug}/{version}/{filename}.pom",
-            response_class=XmlAppResponse, tags=["hangar_with_platform_and_channel"])
-async def get_pom_with_platform_and_channel(platform: platform_type, slug: str, channel: Optional[str], version: str,
-                                            filename: str) -> Response:
+async def respond_pom(request: Request, platform: platform_type, channel: Optional[str], slug: str, version: str,
+                      filename: str, checksum: Optional[ChecksumAlgorithm] = None) -> Response:
     # Check that the filename matches the pattern "{slug}-{version}.pom"
     expected_filename = f"{slug}-{version}"
     if filename != expected_filename:
@@ -33,68 +31,56 @@ async def get_pom_with_platform_and_channel(platform: platform_type, slug: str,
     maven_group_id = f"io.papermc.hangar.{platform}"
     if channel is not None:
         maven_group_id += f".{channel}"
+    record_request(maven_group_id, slug)
 
-    pom_content = f"""<project xmlns="http://maven.apache.org/POM/4.0.0"
-         xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"
-         xsi:schemaLocation="http://maven.apache.org/POM/4.0.0 http://maven.apache.org/xsd/maven-4.0.0.xsd">
-  <modelVersion>4.0.0</modelVersion>
-  <groupId>{maven_group_id}</groupId>
-  <artifactId>{slug}</artifactId>
-  <version>{version}</version>
-  <dependencies>
-"""
-    for dep in dependencies:
-        pom_content += f"""    <dependency>
-      <groupId>{dep['namespace']}</groupId>
-      <artifactId>{dep['name']}</artifactId>
-      <version>{dep['version']}</version>
-    </dependency>
-"""
-    pom_content += """  </dependencies>
-</project>
-"""
-    return Response(content=pom_content.strip(), media_type="application/xml")
-
-
-@router.get("/repository/io/papermc/hangar/{platform}/{slug}/{version}/{filename}.pom", response_class=XmlAppResponse,
-            tags=["hangar_with_platform"])
-async def get_pom_with_platform(platform: platform_type, slug: str, version: str, filename: str) -> Response:
-    return await get_pom_with_platform_and_channel(platform=platform, channel=None, slug=slug, version=version,
-                                                   filename=filename)
+    # Identify the POM from the version metadata alone, so that it is only rendered if the client or the cache do not
+    # already have it
+    created_at = parse_date(version_metadata["createdAt"])
+    etag = compute_etag(maven_group_id, slug, version,
+                        *(f"{dep['namespace']}:{dep['name']}:{dep['version']}" for dep in dependencies))
+    return await respond(request, pom_cache, etag=etag, last_modified=created_at,
+                         max_age=settings.cache.pom_expiration_seconds,
+                         render=lambda: iter_pom(maven_group_id, slug, version,
+                                                 (MavenDependency(dep['namespace'], dep['name'], dep['version'])
+                                                  for dep in dependencies)),
+                         checksum=checksum)
 
 
+@router.get("/repository/io/papermc/hangar/{platform}/{channel}/{slug}/{version}/{filename}.pom",
+            response_class=XmlAppResponse, tags=["hangar_with_platform_and_channel"])
 @router.head("/repository/io/papermc/hangar/{platform}/{channel}/{slug}/{version}/{filename}.pom",
              tags=["hangar_with_platform_and_channel"])
-async def head_pom_with_platform_and_channel(
-        platform: platform_type,
-        channel: Optional[str],
-        slug: str,
-        version: str,
-        filename: str
-) -> Response:
-    # Validate the filename pattern for POM files
-    expected_filename = f"{slug}-{version}"
-    if filename != expected_filename:
-        return Response(status_code=400)
-
-    # Fetch version metadata (same as in the GET method)
-    version_metadata = await fetch_version_metadata(slug, version)
-
-    if not version_metadata:
-        return Response(status_code=404)
+async def get_pom_with_platform_and_channel(request: Request, platform: platform_type, slug: str,
+                                            channel: Optional[str], version: str, filename: str) -> Response:
+    return await respond_pom(request=request, platform=platform, channel=channel, slug=slug, version=version,
+                             filename=filename)
 
-    # Prepare headers for the HEAD request
-    headers = {
-        "Content-Type": "application/xml",
-        "Content-Length": str(len(str(version_metadata))),
-        # Optional: size of the content (you may calculate it based on actual content)
-        "Last-Modified": version_metadata["createdAt"],  # Set to createdAt time of version
-    }
 
-    return Response(status_code=200, headers=headers)
+@router.get("/repository/io/papermc/hangar/{platform}/{slug}/{version}/{filename}.pom", response_class=XmlAppResponse,
+            tags=["hangar_with_platform"])
+@router.head("/repository/io/papermc/hangar/{platform}/{slug}/{version}/{filename}.pom", tags=["hangar_with_platform"])
+async def get_pom_with_platform(request: Request, platform: platform_type, slug: str, version: str,
+                                filename: str) -> Response:
+    return await respond_pom(request=request, platform=platform, channel=None, slug=slug, version=version,
+                             filename=filename)
 
 
-@router.head("/repository/io/papermc/hangar/{platform}/{slug}/{version}/{filename}.pom", tags=["hangar_with_platform"])
-async def head_pom_with_platform(platform: platform_type, slug: str, version: str, filename: str) -> Response:
-    return await head_pom_with_platform_and_channel(platform=platform, channel=None, slug=slug, version=version,
-                                                    filename=filename)
+@router.get("/repository/io/papermc/hangar/{platform}/{channel}/{slug}/{version}/{filename}.pom.{algorithm}",
+            response_class=PlainTextResponse, tags=["hangar_with_platform_and_channel"])
+@router.head("/repository/io/papermc/hangar/{platform}/{channel}/{slug}/{version}/{filename}.pom.{algorithm}",
+             tags=["hangar_with_platform_and_channel"])
+async def get_pom_checksum_with_platform_and_channel(request: Request, platform: platform_type, slug: str,
+                                                     channel: Optional[str], version: str, filename: str,
+                                                     algorithm: str) -> Response:
+    return await respond_pom(request=request, platform=platform, channel=channel, slug=slug, version=version,
+                             filename=filename, checksum=validate_checksum_algorithm(algorithm))
+
+
+@router.get("/repository/io/papermc/hangar/{platform}/{slug}/{version}/{filename}.pom.{algorithm}",
+            response_class=PlainTextResponse, tags=["hangar_with_platform"])
+@router.head("/repository/io/papermc/hangar/{platform}/{slug}/{version}/{filename}.pom.{algorithm}",
+             tags=["hangar_with_platform"])
+async def get_pom_checksum_with_platform(request: Request, platform: platform_type, slug: str, version: str,
+                                         filename: str, algorithm: str) -> Response:
+    return await respond_pom(request=request, platform=platform, channel=None, slug=slug, version=version,
+                             filename=filename, checksum=validate_checksum_algorithm(algorithm))
@@ -1,30 +1,50 @@
-from fastapi import HTTPException, APIRouter, Depends
+from fastapi import HTTPException, APIRouter
 from starlette.requests import Request
-from starlette.responses import RedirectResponse, Response
+from starlette.responses import RedirectResponse, Response, PlainTextResponse
 
-from app.models.modrinth import Loader
+from app.models.modrinth import Loader, Version, File
+from app.routers.caching import redirect_response
+from app.routers.checksums import checksum_response, validate_checksum_algorithm
 from app.routers.modrinth.pom import validate_and_get_version_for_loader
 from app.settings import settings
 
+router = APIRouter()
 
-async def cache_control(request: Request, response: Response):
-    response.headers.update({"Cache-Control": f"public, max-age={settings.cache.jar_expiration_seconds}"})
 
-
-router = APIRouter(dependencies=[Depends(cache_control)])
+def get_primary_file(version: Version) -> File:
+    primary_file = next((file for file in version.files if file.primary), None)
+    if not primary_file:
+        raise HTTPException(status_code=404, detail="JAR file not found")
+    return primary_file
 
 
 @router.get("/repository/com/modrinth/{loader}/{project_id_or_slug}/{version_id_or_number}/{filename}.jar",
             response_class=RedirectResponse, tags=["modrinth"])
+@router.head("/repository/com/modrinth/{loader}/{project_id_or_slug}/{version_id_or_number}/{filename}.jar",
+             tags=["modrinth"])
 async def get_jar_for_modrinth(loader: Loader, project_id_or_slug: str, version_id_or_number: str,
                                filename: str) -> RedirectResponse:
     version = await validate_and_get_version_for_loader(loader=loader, project_id_or_slug=project_id_or_slug,
-                                                        version_id_or_number=version_id_or_number, filename=filename)
-
-    # Get primary file URL
-    primary_file = next((file for file in version.files if file.primary), None)
-    if not primary_file:
-        raise HTTPException(status_code=404, detail="JAR file not found")
+                                                        version_id_or_number=version_id_or_number, filename=filename,
+                                                        expand_dependencies_depth=0)
+    primary_file = get_primary_file(version)
 
     # Redirect to Modrinth's file URL
-    return RedirectResponse(url=primary_file.url)
+    return redirect_response(primary_file.url, max_age=settings.cache.jar_expiration_seconds)
+
+
+@router.get("/repository/com/modrinth/{loader}/{project_id_or_slug}/{version_id_or_number}/{filename}.jar.{algorithm}",
+            response_class=PlainTextResponse, tags=["modrinth"])
+@router.head("/repository/com/modrinth/{loader}/{project_id_or_slug}/{version_id_or_number}/{filename}.jar.{algorithm}",
+             tags=["modrinth"])
+async def get_jar_checksum_for_modrinth(request: Request, loader: Loader, project_id_or_slug: str,
+                                        version_id_or_number: str, filename: str, algorithm: str) -> Response:
+    algorithm = validate_checksum_algorithm(algorithm)
+    version = await validate_and_get_version_for_loader(loader=loader, project_id_or_slug=project_id_or_slug,
+                                                        version_id_or_number=version_id_or_number, filename=filename,
+                                                        expand_dependencies_depth=0)
+    primary_file = get_primary_file(version)
+
+    # Modrinth provides some of the hashes of its files, no need to download them
+    return checksum_response(request, getattr(primary_file.hashes, algorithm, None),
+                             last_modified=version.date_published, max_age=settings.cache.jar_expiration_seconds)
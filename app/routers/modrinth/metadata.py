@@ -1,23 +1,24 @@
-from fastapi import HTTPException, APIRouter, Depends
+from typing import Optional
+
+from fastapi import HTTPException, APIRouter
 from fastapi_xml import XmlAppResponse
 from starlette.requests import Request
-from starlette.responses import Response
+from starlette.responses import Response, PlainTextResponse
 
+from app.maven import iter_maven_metadata
 from app.models.modrinth import Loader
 from app.modrinth import fetch_modrinth_project_versions_for_loader
+from app.prefetch import record_request
+from app.routers.caching import compute_etag
+from app.routers.checksums import ChecksumAlgorithm, validate_checksum_algorithm
+from app.routers.rendered import respond, metadata_cache, stream_versions
 from app.settings import settings
 
-
-async def cache_control(request: Request, response: Response):
-    response.headers.update({"Cache-Control": f"public, max-age={settings.cache.metadata_expiration_seconds}"})
-
-
-router = APIRouter(dependencies=[Depends(cache_control)])
+router = APIRouter()
 
 
-@router.get("/repository/com/modrinth/{loader}/{project_id_or_slug}/maven-metadata.xml",
-            response_class=XmlAppResponse, tags=["modrinth"])
-async def get_metadata_for_modrinth(loader: Loader, project_id_or_slug: str) -> Response:
+async def respond_maven_metadata(request: Request, loader: Loader, project_id_or_slug: str,
+                                 checksum: Optional[ChecksumAlgorithm] = None) -> Response:
     versions = await fetch_modrinth_project_versions_for_loader(project_id_or_slug=project_id_or_slug, loader=loader)
     if not versions:
         raise HTTPException(status_code=404, detail="Project not found")
@@ -26,25 +27,39 @@ async def get_metadata_for_modrinth(loader: Loader, project_id_or_slug: str) ->
     if len(versions) == 0:
         raise HTTPException(status_code=404, detail="No versions found")
 
+    record_request(f"com.modrinth.{loader}", project_id_or_slug)
+
     # Get latest version
     latest_version = versions[0]
     # Use latest version's publishing date as Maven's lastUpdated (in YYYYMMDDHHMMSS format)
     last_updated_maven_format = latest_version.date_published.strftime("%Y%m%d%H%M%S")
 
-    metadata = f"""<metadata>
-  <groupId>com.modrinth.{loader}</groupId>
-  <artifactId>{project_id_or_slug}</artifactId>
-  <versioning>
-    <latest>{latest_version.version_number}</latest>
-    <release>{latest_version.version_number}</release>
-    <versions>
-"""
-    for version in versions:
-        metadata += f"      <version>{version.version_number}</version>\n"
-
-    metadata += f"""    </versions>
-    <lastUpdated>{last_updated_maven_format}</lastUpdated>
-  </versioning>
-</metadata>
-"""
-    return Response(content=metadata.strip(), media_type="application/xml")
+    # Identify the metadata from the versions alone, so that it is only rendered if the client or the cache do not
+    # already have it
+    etag = compute_etag(loader, project_id_or_slug, last_updated_maven_format,
+                        *(version.version_number for version in versions))
+    return await respond(request, metadata_cache, etag=etag, last_modified=latest_version.date_published,
+                         max_age=settings.cache.metadata_expiration_seconds,
+                         render=lambda: iter_maven_metadata(f"com.modrinth.{loader}", project_id_or_slug,
+                                                            latest_version.version_number,
+                                                            (version.version_number for version in versions),
+                                                            last_updated_maven_format),
+                         checksum=checksum, stream=stream_versions(versions))
+
+
+@router.get("/repository/com/modrinth/{loader}/{project_id_or_slug}/maven-metadata.xml",
+            response_class=XmlAppResponse, tags=["modrinth"])
+@router.head("/repository/com/modrinth/{loader}/{project_id_or_slug}/maven-metadata.xml",
+             tags=["modrinth"])
+async def get_metadata_for_modrinth(request: Request, loader: Loader, project_id_or_slug: str) -> Response:
+    return await respond_maven_metadata(request=request, loader=loader, project_id_or_slug=project_id_or_slug)
+
+
+@router.get("/repository/com/modrinth/{loader}/{project_id_or_slug}/maven-metadata.xml.{algorithm}",
+            response_class=PlainTextResponse, tags=["modrinth"])
+@router.head("/repository/com/modrinth/{loader}/{project_id_or_slug}/maven-metadata.xml.{algorithm}",
+             tags=["modrinth"])
+async def get_metadata_checksum_for_modrinth(request: Request, loader: Loader, project_id_or_slug: str,
+                                             algorithm: str) -> Response:
+    return await respond_maven_metadata(request=request, loader=loader, project_id_or_slug=project_id_or_slug,
+                                        checksum=validate_checksum_algorithm(algorithm))
@@ -1,30 +1,32 @@
-from typing import cast
+from typing import cast, Optional
 
-from fastapi import HTTPException, APIRouter, Depends
+from fastapi import HTTPException, APIRouter
 from fastapi_xml import XmlAppResponse
 from starlette.requests import Request
-from starlette.responses import Response
+from starlette.responses import Response, PlainTextResponse
 
+from app.maven import iter_pom, MavenDependency
 from app.models.modrinth import Loader, ExpandedDependency
-from app.modrinth import fetch_modrinth_project_version
+from app.modrinth import resolve_modrinth_project_version
+from app.prefetch import record_request
+from app.routers.caching import compute_etag
+from app.routers.checksums import ChecksumAlgorithm, validate_checksum_algorithm
+from app.routers.rendered import respond, pom_cache
 from app.settings import settings
 
-
-async def cache_control(request: Request, response: Response):
-    response.headers.update({"Cache-Control": f"public, max-age={settings.cache.pom_expiration_seconds}"})
-
-
-router = APIRouter(dependencies=[Depends(cache_control)])
+router = APIRouter()
 
 
 async def validate_and_get_version_for_loader(loader: Loader, project_id_or_slug: str, version_id_or_number: str,
-                                              filename: str):
+                                              filename: str, expand_dependencies_depth: int = 1):
     expected_filename = f"{project_id_or_slug}-{version_id_or_number}"
     if filename != expected_filename:
         raise HTTPException(status_code=400, detail="Invalid filename")
 
-    version = await fetch_modrinth_project_version(project_id_or_slug=project_id_or_slug,
-                                                   version_id_or_number=version_id_or_number)
+    version = await resolve_modrinth_project_version(project_id_or_slug=project_id_or_slug,
+                                                     version_id_or_number=version_id_or_number,
+                                                     expand_dependencies_depth=expand_dependencies_depth,
+                                                     loader=loader)
     if not version:
         raise HTTPException(status_code=404, detail="Version not found")
 
@@ -34,49 +36,44 @@ async def validate_and_get_version_for_loader(loader: Loader, project_id_or_slug
     return version
 
 
-@router.get("/repository/com/modrinth/{loader}/{project_id_or_slug}/{version_id_or_number}/{filename}.pom",
-            response_class=XmlAppResponse, tags=["modrinth"])
-async def get_pom_for_modrinth(loader: Loader, project_id_or_slug: str, version_id_or_number: str,
-                               filename: str) -> Response:
+async def respond_pom(request: Request, loader: Loader, project_id_or_slug: str, version_id_or_number: str,
+                      filename: str, checksum: Optional[ChecksumAlgorithm] = None) -> Response:
     version = await validate_and_get_version_for_loader(loader=loader, project_id_or_slug=project_id_or_slug,
                                                         version_id_or_number=version_id_or_number, filename=filename)
-
-    pom_content = f"""<project xmlns="http://maven.apache.org/POM/4.0.0"
-         xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"
-         xsi:schemaLocation="http://maven.apache.org/POM/4.0.0 http://maven.apache.org/xsd/maven-4.0.0.xsd">
-  <modelVersion>4.0.0</modelVersion>
-  <groupId>com.modrinth.{loader}</groupId>
-  <artifactId>{project_id_or_slug}</artifactId>
-  <version>{version.version_number}</version>
-  <dependencies>
-"""
-    for dependency in version.dependencies:
-        if not isinstance(dependency, ExpandedDependency):
-            continue
-        expanded_dependency = cast(ExpandedDependency, dependency)
-        pom_content += f"""    <dependency>
-      <groupId>com.modrinth.{loader}</groupId>
-      <artifactId>{expanded_dependency.project_id}</artifactId>
-      <version>{expanded_dependency.version_number}</version>
-    </dependency>
-"""
-    pom_content += """  </dependencies>
-</project>
-"""
-    return Response(content=pom_content.strip(), media_type="application/xml")
+    record_request(f"com.modrinth.{loader}", project_id_or_slug)
+    expanded_dependencies = [cast(ExpandedDependency, dependency) for dependency in version.dependencies
+                             if isinstance(dependency, ExpandedDependency)]
+
+    # Identify the POM from the version alone, so that it is only rendered if the client or the cache do not already
+    # have it
+    etag = compute_etag(loader, project_id_or_slug, version.version_number,
+                        *(f"{dependency.project_id}:{dependency.version_number}"
+                          for dependency in expanded_dependencies))
+    return await respond(request, pom_cache, etag=etag, last_modified=version.date_published,
+                         max_age=settings.cache.pom_expiration_seconds,
+                         render=lambda: iter_pom(f"com.modrinth.{loader}", project_id_or_slug, version.version_number,
+                                                 (MavenDependency(f"com.modrinth.{loader}", dependency.project_id,
+                                                                  dependency.version_number)
+                                                  for dependency in expanded_dependencies)),
+                         checksum=checksum)
 
 
+@router.get("/repository/com/modrinth/{loader}/{project_id_or_slug}/{version_id_or_number}/{filename}.pom",
+            response_class=XmlAppResponse, tags=["modrinth"])
 @router.head("/repository/com/modrinth/{loader}/{project_id_or_slug}/{version_id_or_number}/{filename}.pom",
              tags=["modrinth"])
-async def head_pom_for_modrinth(loader: Loader, project_id_or_slug: str, version_id_or_number: str,
-                                filename: str) -> Response:
-    version = await validate_and_get_version_for_loader(loader=loader, project_id_or_slug=project_id_or_slug,
-                                                        version_id_or_number=version_id_or_number, filename=filename)
+async def get_pom_for_modrinth(request: Request, loader: Loader, project_id_or_slug: str, version_id_or_number: str,
+                               filename: str) -> Response:
+    return await respond_pom(request=request, loader=loader, project_id_or_slug=project_id_or_slug,
+                             version_id_or_number=version_id_or_number, filename=filename)
+
 
-    # Prepare headers
-    headers = {
-        "Content-Type": "application/xml",
-        "Content-Length": "0",
-        "Last-Modified": version.date_published.isoformat(),
-    }
-    return Response(status_code=200, headers=headers)
+@router.get("/repository/com/modrinth/{loader}/{project_id_or_slug}/{version_id_or_number}/{filename}.pom.{algorithm}",
+            response_class=PlainTextResponse, tags=["modrinth"])
+@router.head("/repository/com/modrinth/{loader}/{project_id_or_slug}/{version_id_or_number}/{filename}.pom.{algorithm}",
+             tags=["modrinth"])
+async def get_pom_checksum_for_modrinth(request: Request, loader: Loader, project_id_or_slug: str,
+                                        version_id_or_number: str, filename: str, algorithm: str) -> Response:
+    return await respond_pom(request=request, loader=loader, project_id_or_slug=project_id_or_slug,
+                             version_id_or_number=version_id_or_number, filename=filename,
+                             checksum=validate_checksum_algorithm(algorithm))
@@ -0,0 +1,190 @@
+import gzip
+import logging
+from datetime import datetime
+from typing import Callable, Iterable, Optional
+
+from pydantic import BaseModel
+from starlette.requests import Request
+from starlette.responses import Response, StreamingResponse
+
+from app.cache.memory import BoundedMemoryCache
+from app.metrics import record_cache_event, record_cache_state
+from app.routers.caching import caching_headers, is_not_modified, encoded_etag, compute_etag, body_response
+from app.routers.checksums import ChecksumAlgorithm, compute_checksums
+from app.settings import settings
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+
+class RenderedResponse(BaseModel):
+    """
+    A rendered response body, along with its precompressed variants and checksums.
+    """
+
+    body: bytes
+    gzip: Optional[bytes] = None
+    brotli: Optional[bytes] = None
+    checksums: dict[str, str] = {}
+    etag: str
+    last_modified: Optional[datetime] = None
+    media_type: str
+
+    class Config:
+        frozen = True
+
+    def variant(self, accept_encoding: str) -> tuple[bytes, Optional[str]]:
+        """
+        Select the smallest variant of the body accepted by the client.
+        :param accept_encoding: The Accept-Encoding header of the request.
+        :return: The body and its content encoding, if compressed.
+        """
+
+        accepted = _accepted_encodings(accept_encoding)
+        if self.brotli is not None and "br" in accepted:
+            return self.brotli, "br"
+        if self.gzip is not None and "gzip" in accepted:
+            return self.gzip, "gzip"
+        return self.body, None
+
+
+def _accepted_encodings(accept_encoding: str) -> set[str]:
+    accepted = set()
+    for item in accept_encoding.split(","):
+        coding, _, parameters = item.partition(";")
+        coding = coding.strip().lower()
+        parameters = parameters.replace(" ", "")
+        if coding and parameters not in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            accepted.add(coding)
+    return accepted
+
+
+def render_response(content: str, etag: str, last_modified: Optional[datetime],
+                    media_type: str = "application/xml") -> RenderedResponse:
+    """
+    Encode a rendered body, compute its checksums, and compress it if it is big enough for compression to pay off.
+    :param content: The rendered body.
+    :param etag: The ETag of the body.
+    :param last_modified: When the body content last changed, if known.
+    :param media_type: The media type of the body.
+    :return: The rendered response.
+    """
+
+    body = content.encode()
+    gzip_body = brotli_body = None
+    if len(body) >= settings.cache.compression_min_bytes:
+        gzip_body = gzip.compress(body, compresslevel=9, mtime=0)
+        if brotli is not None:
+            # Quality 11 is 10 to 25 times slower for a few percent, or even worse results on large version lists
+            brotli_body = brotli.compress(body, quality=9)
+    return RenderedResponse(body=body, gzip=gzip_body, brotli=brotli_body, checksums=compute_checksums(body), etag=etag,
+                            last_modified=last_modified, media_type=media_type)
+
+
+class RenderedCache:
+    """
+    Cache of rendered responses, by request path.
+
+    Entries are only used while their ETag matches the one computed from current upstream data, so that they are
+    rendered again as soon as the upstream data they were rendered from changed.
+    """
+
+    def __init__(self, name: str, ttl: int, max_size: int):
+        """
+        :param name: The name of the cache, in metrics.
+        :param ttl: How many seconds rendered responses are kept.
+        :param max_size: Maximum number of rendered responses kept.
+        """
+
+        self.name = name
+        self.ttl = ttl
+        self.cache = BoundedMemoryCache(max_size=max_size)
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, path: str, etag: str) -> Optional[RenderedResponse]:
+        rendered = await self.cache.get(path)
+        if rendered is None or rendered.etag != etag:
+            self.misses += 1
+            record_cache_event(self.name, "misses")
+            return None
+        self.hits += 1
+        record_cache_event(self.name, "hits")
+        return rendered
+
+    async def set(self, path: str, rendered: RenderedResponse) -> None:
+        await self.cache.set(path, rendered, ttl=self.ttl)
+        record_cache_state(self.name, self.cache)
+
+    def get_stats(self) -> dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self.cache), "bytes": self.cache.used_bytes,
+                "evictions": self.cache.evictions}
+
+
+metadata_cache = RenderedCache(name="rendered.metadata", ttl=settings.cache.metadata_expiration_seconds,
+                               max_size=settings.cache.rendered_max_size)
+pom_cache = RenderedCache(name="rendered.pom", ttl=settings.cache.pom_expiration_seconds,
+                          max_size=settings.cache.rendered_max_size)
+
+
+def stream_versions(versions: list) -> bool:
+    """
+    Whether a version list is long enough to be streamed rather than rendered whole, according to settings.
+    :param versions: The versions to be rendered.
+    :return: True if the versions should be streamed.
+    """
+
+    return 0 < settings.cache.stream_min_versions <= len(versions)
+
+
+async def respond(request: Request, cache: RenderedCache, etag: str, last_modified: Optional[datetime], max_age: int,
+                  render: Callable[[], Iterable[str]], checksum: Optional[ChecksumAlgorithm] = None,
+                  stream: bool = False) -> Response:
+    """
+    Respond with a rendered resource, or its checksum, rendering it only if it is not already cached.
+    :param request: The request.
+    :param cache: The cache of rendered responses of this kind of resource.
+    :param etag: The ETag of the resource, computed from the upstream data it is rendered from.
+    :param last_modified: When the resource last changed, if known.
+    :param max_age: How many seconds clients may cache the response.
+    :param render: Renders the resource, chunk by chunk.
+    :param checksum: The algorithm of the checksum to respond with, if a checksum file of the resource is requested.
+    :param stream: Whether to stream the chunks of the resource as they are rendered when it is not cached, instead of
+        rendering it whole. Streamed resources are neither compressed nor cached.
+    :return: A 304 Not Modified response if the client's copy is still valid, otherwise the resource, compressed if
+        the client supports it, or its checksum. HEAD requests get the same headers, with the length of the body.
+    """
+
+    # Checksum files share the rendered response of the resource they belong to
+    path = request.url.path
+    response_etag = etag
+    if checksum is not None:
+        path = path.removesuffix(f".{checksum}")
+        response_etag = compute_etag(etag, checksum)
+
+    headers = caching_headers(max_age, response_etag, last_modified)
+    if is_not_modified(request, response_etag, last_modified):
+        return Response(status_code=304, headers=headers)
+
+    rendered = await cache.get(path, etag)
+    if rendered is None:
+        if stream and checksum is None and request.method == "GET":
+            return StreamingResponse((chunk.encode() for chunk in render()), media_type="application/xml",
+                                     headers=headers)
+        rendered = render_response("".join(render()), etag=etag, last_modified=last_modified)
+        await cache.set(path, rendered)
+
+    if checksum is not None:
+        return body_response(request, rendered.checksums[checksum].encode(), media_type="text/plain", headers=headers)
+
+    body, encoding = rendered.variant(request.headers.get("Accept-Encoding", ""))
+    if rendered.gzip is not None:
+        headers["Vary"] = "Accept-Encoding"
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+        headers["ETag"] = encoded_etag(etag, encoding)
+    return body_response(request, body, media_type=rendered.media_type, headers=headers)
@@ -0,0 +1,21 @@
+from fastapi import APIRouter, HTTPException
+
+from app.models.resolution import ResolveRequest, ResolveResponse
+from app.resolution import resolve_all, get_max_coordinates
+from app.settings import settings
+from app.timeouts import deadline
+
+router = APIRouter()
+
+
+@router.post("/resolve", response_model=ResolveResponse, tags=["resolve"])
+async def resolve(request: ResolveRequest) -> ResolveResponse:
+    # Bound the work a single request may cause, each artifact may need several upstream requests
+    max_coordinates = get_max_coordinates()
+    if len(request.coordinates) > max_coordinates:
+        raise HTTPException(status_code=400,
+                            detail=f"Too many coordinates, at most {max_coordinates} are allowed")
+
+    # Resolving many artifacts takes much longer than answering a repository route
+    with deadline(settings.resolve.timeout_seconds):
+        return ResolveResponse(artifacts=await resolve_all(request.coordinates))
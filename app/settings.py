@@ -1,4 +1,6 @@
-from pydantic import BaseModel
+from typing import Literal, Optional
+
+from pydantic import BaseModel, Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -6,31 +8,99 @@ class Cache(BaseModel):
     pom_expiration_seconds: int = 3600
     metadata_expiration_seconds: int = 3600
     jar_expiration_seconds: int = 3600
+    max_memory_bytes: int = 0
+    rendered_max_size: int = 1024
+    compression_min_bytes: int = 1024
+    stream_min_versions: int = 0
+    stale_while_revalidate_seconds: int = 600
+    stale_if_error_seconds: int = 86400
+    expiration_jitter: float = 0.1
+    early_refresh_beta: float = 1.0
+    negative_expiration_seconds: int = 300
+    negative_max_size: int = 4096
+    backend: Literal["memory", "sqlite", "redis"] = "memory"
+    namespace: str = "minecraft-maven-bridge:"
+    sqlite_path: str = "/tmp/minecraft-maven-bridge/cache.sqlite3"
+    redis_endpoint: str = "127.0.0.1"
+    redis_port: int = 6379
+    redis_db: int = 0
+    redis_password: Optional[str] = None
+
+
+class Client(BaseModel):
+    http2: bool = True
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry_seconds: float = 60.0
+    connect_timeout_seconds: float = 5.0
+    read_timeout_seconds: float = 10.0
+    write_timeout_seconds: float = 10.0
+    pool_timeout_seconds: float = 5.0
+    rate_limit_per_second: float = Field(default=5.0, gt=0)
+    rate_limit_burst: int = Field(default=10, ge=1)
+    max_retries: int = 3
+    retry_backoff_seconds: float = 1.0
+    max_retry_after_seconds: float = 30.0
+    hedge_requests: bool = False
+    hedge_quantile: float = 0.95
+    hedge_min_delay_seconds: float = 0.1
 
 
 class Hangar(BaseModel):
     api_base_url: str = 'https://hangar.papermc.io/api/v1'
     cache_project_expiration_seconds: int = 3600
-    cache_project_max_size: int = 20
+    cache_project_max_size: int = 256
     cache_version_expiration_seconds: int = 3600
-    cache_version_max_size: int = 20
+    cache_version_max_size: int = 1024
     versions_limit_per_batch: int = 20
     versions_total_to_fetch: int = 20
+    versions_fetch_concurrency: int = 4
+    versions_incremental_sync: bool = True
+    client: Client = Client()
 
 
 class Modrinth(BaseModel):
     api_base_url: str = 'https://api.modrinth.com/v2'
     cache_project_expiration_seconds: int = 3600
-    cache_project_max_size: int = 20
+    cache_project_max_size: int = 256
+    cache_project_versions_max_size: int = 128
     cache_version_expiration_seconds: int = 3600
-    cache_version_max_size: int = 20
+    cache_version_max_size: int = 1024
+    ids_limit_per_batch: int = 100
+    client: Client = Client()
+
+
+class Prefetch(BaseModel):
+    coordinates: list[str] = []
+    learned_max: int = 0
+    concurrency: int = 4
+    interval_seconds: int = 60
+    refresh_ahead_seconds: int = 300
+
+
+class Resolve(BaseModel):
+    max_coordinates: int = 300
+    concurrency: int = 16
+    timeout_seconds: float = 120.0
+    closure_max_nodes: int = 1000
+    closure_expiration_seconds: int = 3600
+    closure_max_size: int = 1024
+    closure_node_max_size: int = 16384
+
+
+class Metrics(BaseModel):
+    enabled: bool = False
 
 
 class Settings(BaseSettings):
     debug: bool = False
+    request_timeout_seconds: float = 20.0
     cache: Cache = Cache()
     hangar: Hangar = Hangar()
     modrinth: Modrinth = Modrinth()
+    prefetch: Prefetch = Prefetch()
+    resolve: Resolve = Resolve()
+    metrics: Metrics = Metrics()
 
     model_config = SettingsConfigDict(env_prefix='MC_MAVEN_BRIDGE__', env_file='.env', env_nested_delimiter='__')
 
@@ -0,0 +1,242 @@
+import asyncio
+import math
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+import httpx
+
+from app import metrics
+from app.metrics import current_endpoint
+from app.ratelimit import RateLimiter
+
+# Event loop time by which the upstream requests of the current task must be answered, None for no deadline
+current_deadline: ContextVar[Optional[float]] = ContextVar("current_deadline", default=None)
+
+# Methods whose requests may be sent twice without side effects
+HEDGED_METHODS = ("GET", "HEAD")
+
+
+class DeadlineMiddleware:
+    """
+    ASGI middleware giving every request of clients a deadline, inherited by all the upstream requests sent to answer
+    it, so that a slow backend cannot hold a client longer than the request timeout.
+    """
+
+    def __init__(self, app, seconds: float):
+        self.app = app
+        self.seconds = seconds
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        token = current_deadline.set(asyncio.get_running_loop().time() + self.seconds)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_deadline.reset(token)
+
+
+@contextmanager
+def deadline(seconds: float) -> Iterator[None]:
+    """
+    Give the upstream requests sent within the block their own deadline, instead of the one of the request being
+    answered, such as for routes resolving many artifacts at once.
+    :param seconds: How many seconds the upstream requests may take in total from now. No deadline when 0.
+    """
+
+    token = current_deadline.set(asyncio.get_running_loop().time() + seconds if seconds > 0 else None)
+    try:
+        yield
+    finally:
+        current_deadline.reset(token)
+
+
+class LatencyTracker:
+    """
+    Recent latencies of the requests sent to a backend, by function sending them, telling after how long a request is
+    slower than usual and worth hedging.
+    """
+
+    def __init__(self, name: str, quantile: float, min_delay: float, window: int = 200, min_samples: int = 20):
+        """
+        :param name: The name of the backend.
+        :param quantile: The quantile of recent latencies after which a request is hedged, such as 0.95.
+        :param min_delay: Minimum number of seconds before a request is hedged, whatever its recent latencies.
+        :param window: How many recent latencies are kept, by function.
+        :param min_samples: How many latencies must be known before requests of a function are hedged.
+        """
+
+        self.name = name
+        self.quantile = quantile
+        self.min_delay = min_delay
+        self.min_samples = min_samples
+        self.hedged = 0
+        self.hedges_won = 0
+        self.deadline_exceeded = 0
+        self._latencies: dict[str, deque[float]] = defaultdict(lambda: deque(maxlen=window))
+        # Delays computed from the latencies, computed again every few new latencies
+        self._delays: dict[str, float] = {}
+        self._observed: dict[str, int] = defaultdict(int)
+
+    def observe(self, endpoint: str, seconds: float) -> None:
+        """
+        Record the latency of a request.
+        :param endpoint: The name of the function that sent the request.
+        :param seconds: How many seconds the backend took to answer once the request was sent, or how long it had not
+            answered when the request was cancelled.
+        """
+
+        self._latencies[endpoint].append(seconds)
+        self._observed[endpoint] += 1
+        if self._observed[endpoint] % 10 == 0:
+            self._delays.pop(endpoint, None)
+
+    def get_delay(self, endpoint: str) -> Optional[float]:
+        """
+        Get after how many seconds a request that was not answered yet should be hedged.
+        :param endpoint: The name of the function sending the request.
+        :return: The delay, or None if not enough latencies are known yet.
+        """
+
+        delay = self._delays.get(endpoint)
+        if delay is None:
+            latencies = self._latencies.get(endpoint)
+            if latencies is None or len(latencies) < self.min_samples:
+                return None
+            ordered = sorted(latencies)
+            delay = self._delays[endpoint] = max(ordered[min(math.ceil(self.quantile * len(ordered)),
+                                                             len(ordered)) - 1], self.min_delay)
+        return delay
+
+    def get_stats(self) -> dict[str, int]:
+        """
+        Get the counters of hedged requests and of exceeded deadlines.
+        :return: The number of hedged requests, of hedges answered first and of requests cut by their deadline.
+        """
+
+        return {"hedged": self.hedged, "hedges_won": self.hedges_won, "deadline_exceeded": self.deadline_exceeded}
+
+
+class DeadlineTransport(httpx.AsyncBaseTransport):
+    """
+    HTTP transport cutting upstream requests at the deadline of the current task, including the time they waited for
+    the rate limiter and their retries. Timeouts of each read are shortened to the time left as well, so that reading
+    the body of a response cannot exceed it either.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, tracker: LatencyTracker):
+        self.transport = transport
+        self.tracker = tracker
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        deadline = current_deadline.get()
+        if deadline is None:
+            return await self.transport.handle_async_request(request)
+
+        remaining = deadline - asyncio.get_running_loop().time()
+        if remaining <= 0:
+            self._exceeded()
+            raise httpx.TimeoutException("Request deadline exceeded", request=request)
+        timeout = request.extensions.get("timeout", {})
+        request.extensions["timeout"] = {key: remaining if value is None else min(value, remaining)
+                                         for key, value in timeout.items()}
+        try:
+            async with asyncio.timeout_at(deadline):
+                return await self.transport.handle_async_request(request)
+        except TimeoutError:
+            self._exceeded()
+            raise httpx.TimeoutException("Request deadline exceeded", request=request) from None
+
+    def _exceeded(self) -> None:
+        self.tracker.deadline_exceeded += 1
+        metrics.record_upstream_event(self.tracker.name, "deadline_exceeded")
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+
+
+class LatencyTransport(httpx.AsyncBaseTransport):
+    """
+    HTTP transport recording the latency of requests in a latency tracker. It is placed below the rate limiter, so that
+    the time requests wait before being sent does not count.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, tracker: LatencyTracker):
+        self.transport = transport
+        self.tracker = tracker
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        endpoint = current_endpoint.get()
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        cancelled = False
+        try:
+            return await self.transport.handle_async_request(request)
+        except asyncio.CancelledError:
+            cancelled = True
+            raise
+        finally:
+            seconds = loop.time() - start
+            # A cancelled request only tells that the backend took at least that long. This matters when it was already
+            # slower than usual, not for the hedge of a request answered meanwhile
+            delay = self.tracker.get_delay(endpoint) if cancelled else None
+            if not cancelled or (delay is not None and seconds >= delay):
+                self.tracker.observe(endpoint, seconds)
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+
+
+class HedgedTransport(httpx.AsyncBaseTransport):
+    """
+    HTTP transport hedging idempotent requests: when a request was not answered after the usual latency of the
+    function sending it, the same request is sent again, and the first answer is used while the other request is
+    cancelled. Latencies are recorded by a :class:`LatencyTransport` below the rate limiter.
+
+    Requests are not hedged while the rate limiter holds other requests, so that hedges never delay them.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, tracker: LatencyTracker,
+                 limiter: Optional[RateLimiter] = None):
+        self.transport = transport
+        self.tracker = tracker
+        self.limiter = limiter
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        endpoint = current_endpoint.get()
+        delay = self.tracker.get_delay(endpoint) if request.method in HEDGED_METHODS else None
+        attempts = [asyncio.ensure_future(self.transport.handle_async_request(request))]
+        winner = None
+        try:
+            done, _ = await asyncio.wait(attempts, timeout=delay)
+            if not done and (self.limiter is None or not self.limiter.waiting):
+                self.tracker.hedged += 1
+                metrics.record_upstream_event(self.tracker.name, "hedged")
+                attempts.append(asyncio.ensure_future(self.transport.handle_async_request(request)))
+
+            # Use the first answer, or the error of the first request once every attempt failed
+            pending = set(attempts)
+            while pending and winner is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                winner = next((attempt for attempt in attempts if attempt in done and attempt.exception() is None),
+                              None)
+            if winner is None:
+                return attempts[0].result()
+            if winner is not attempts[0]:
+                self.tracker.hedges_won += 1
+                metrics.record_upstream_event(self.tracker.name, "hedge_won")
+            return winner.result()
+        finally:
+            for attempt in attempts:
+                attempt.cancel()
+            await asyncio.gather(*attempts, return_exceptions=True)
+            # Close the responses of the other attempts, releasing their connections
+            for attempt in attempts:
+                if attempt is not winner and not attempt.cancelled() and attempt.exception() is None:
+                    await attempt.result().aclose()
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
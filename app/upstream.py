@@ -0,0 +1,143 @@
+import asyncio
+import logging
+from typing import Literal, Optional, get_args
+
+import httpx
+
+from app import metrics
+from app.ratelimit import RateLimiter, RateLimitedTransport
+from app.settings import settings, Client
+from app.timeouts import DeadlineTransport, HedgedTransport, LatencyTracker, LatencyTransport
+
+Backend = Literal["hangar", "modrinth"]
+
+logger = logging.getLogger(__name__)
+
+# Long-lived clients, one per backend, so that connections are pooled and kept alive between requests
+_clients: dict[Backend, httpx.AsyncClient] = {}
+# Rate limiter of each backend, kept when its client is created again so that its quota is still honored
+_limiters: dict[Backend, RateLimiter] = {}
+# Recent latencies of each backend, kept when its client is created again so that hedging delays are still known
+_trackers: dict[Backend, LatencyTracker] = {}
+
+
+def _create_client(backend: Backend, transport: Optional[httpx.AsyncBaseTransport] = None) -> httpx.AsyncClient:
+    """
+    Create a pooled HTTP client for a backend from its settings.
+    :param backend: The backend the client will talk to.
+    :param transport: The transport sending requests, instead of connections to the backend, such as a stub backend.
+    :return: A new client.
+    """
+
+    config: Client = getattr(settings, backend).client
+
+    http2 = config.http2
+    if http2:
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            logger.warning("HTTP/2 is enabled for %s but the h2 package is not installed, falling back to HTTP/1.1",
+                           backend)
+            http2 = False
+
+    limits = httpx.Limits(max_connections=config.max_connections,
+                          max_keepalive_connections=config.max_keepalive_connections,
+                          keepalive_expiry=config.keepalive_expiry_seconds)
+    timeout = httpx.Timeout(connect=config.connect_timeout_seconds, read=config.read_timeout_seconds,
+                            write=config.write_timeout_seconds, pool=config.pool_timeout_seconds)
+    limiter = _limiters.get(backend)
+    if limiter is None:
+        limiter = _limiters[backend] = RateLimiter(name=backend, rate=config.rate_limit_per_second,
+                                                   burst=config.rate_limit_burst)
+    tracker = _trackers.get(backend)
+    if tracker is None:
+        tracker = _trackers[backend] = LatencyTracker(name=backend, quantile=config.hedge_quantile,
+                                                      min_delay=config.hedge_min_delay_seconds)
+    if transport is None:
+        transport = httpx.AsyncHTTPTransport(http2=http2, limits=limits)
+    if metrics.enabled:
+        transport = metrics.InstrumentedTransport(transport, backend=backend)
+    # Latencies hedging delays are computed from do not include the time requests wait for the rate limiter
+    if config.hedge_requests:
+        transport = LatencyTransport(transport, tracker)
+    transport = RateLimitedTransport(transport, limiter,
+                                     max_retries=config.max_retries, retry_backoff_seconds=config.retry_backoff_seconds,
+                                     max_retry_after_seconds=config.max_retry_after_seconds)
+    # Each hedge goes through the rate limiter, and all of them are cut at the deadline of the request they serve
+    if config.hedge_requests:
+        transport = HedgedTransport(transport, tracker, limiter=limiter)
+    transport = DeadlineTransport(transport, tracker)
+    return httpx.AsyncClient(transport=transport, timeout=timeout)
+
+
+def get_client(backend: Backend) -> httpx.AsyncClient:
+    """
+    Get the shared HTTP client of a backend, creating it if needed.
+    :param backend: The backend to get the client for.
+    :return: The shared client. It must not be closed by callers.
+    """
+
+    client = _clients.get(backend)
+    if client is None or client.is_closed:
+        client = _clients[backend] = _create_client(backend)
+    return client
+
+
+async def open_clients(transports: Optional[dict[Backend, httpx.AsyncBaseTransport]] = None) -> None:
+    """
+    Create the shared HTTP clients of all backends. Called on application startup.
+    :param transports: Transports to send requests to backends with, instead of connecting to them, by backend.
+    """
+
+    for backend in get_args(Backend):
+        if transports and backend in transports:
+            client = _clients.pop(backend, None)
+            if client is not None:
+                await client.aclose()
+            _clients[backend] = _create_client(backend, transport=transports[backend])
+        else:
+            get_client(backend)
+
+
+async def close_clients() -> None:
+    """
+    Close the shared HTTP clients of all backends, releasing their pooled connections. Called on application shutdown.
+    """
+
+    clients = list(_clients.values())
+    _clients.clear()
+    await asyncio.gather(*(client.aclose() for client in clients))
+
+
+def get_stats() -> dict[Backend, dict[str, float]]:
+    """
+    Get the state and counters of the rate limiter of each backend, and its counters of hedged requests and exceeded
+    deadlines.
+    :return: The stats, by backend.
+    """
+
+    return {backend: {**limiter.get_stats(), **_trackers[backend].get_stats()}
+            for backend, limiter in _limiters.items()}
+
+
+def is_transient_status(status_code: int) -> bool:
+    """
+    Tell whether an upstream response status denotes a transient failure, that may succeed if retried later.
+    :param status_code: The status code of the response.
+    :return: Whether the failure is transient.
+    """
+
+    return status_code == 429 or status_code >= 500
+
+
+def is_transient_error(error: BaseException) -> bool:
+    """
+    Tell whether an error raised while calling an upstream is transient, such as a timeout or a server error, as
+    opposed to the requested resource not existing.
+    :param error: The error.
+    :return: Whether the error is transient.
+    """
+
+    if isinstance(error, httpx.HTTPStatusError):
+        return is_transient_status(error.response.status_code)
+    return isinstance(error, httpx.TransportError)
@@ -0,0 +1,86 @@
+"""
+Microbenchmarks of the parsing of Modrinth's version lists, and of the size of cached versions, comparing the slim
+models of :mod:`app.models.modrinth` validated from response bytes to the full models they replaced.
+
+Run from the repository root with ``python -m benchmarks.models``.
+"""
+
+import json
+import timeit
+from datetime import datetime
+from typing import List, Literal, Optional
+
+from pydantic import BaseModel, HttpUrl, TypeAdapter
+
+from app.cache.memory import estimate_size
+from app.cache.serializers import ModelSerializer
+from app.models.modrinth import Dependency, FileHashes, Version
+from benchmarks.upstreams import StubModrinth
+
+
+class LegacyFile(BaseModel):
+    hashes: FileHashes
+    url: HttpUrl
+    filename: str
+    primary: bool
+    size: int
+    file_type: Optional[Literal["required-resource-pack", "optional-resource-pack"]]
+
+
+class LegacyVersion(BaseModel):
+    name: str
+    version_number: str
+    changelog: Optional[str]
+    dependencies: List[Dependency]
+    game_versions: List[str]
+    version_type: Literal["release", "beta", "alpha", "unlisted", "scheduled", "unknown"]
+    loaders: List[str]
+    featured: bool
+    status: Literal["listed", "archived", "draft", "unlisted", "scheduled", "unknown"]
+    requested_status: Optional[Literal["listed", "archived", "draft", "unlisted"]]
+    id: str
+    project_id: str
+    author_id: str
+    date_published: datetime
+    downloads: int
+    changelog_url: Optional[str]
+    files: List[LegacyFile]
+
+
+def legacy_parse(content: bytes) -> list[LegacyVersion]:
+    return [LegacyVersion(**json_item) for json_item in json.loads(content)]
+
+
+_versions_adapter = TypeAdapter(List[Version])
+
+
+def parse(content: bytes) -> list[Version]:
+    return _versions_adapter.validate_json(content)
+
+
+def bench(name: str, function, number: int) -> None:
+    seconds = min(timeit.repeat(function, number=number, repeat=5)) / number
+    print(f"{name:<40} {seconds * 1e3:>12.2f} ms")
+
+
+def main() -> None:
+    serializer = ModelSerializer(compress_threshold=2 ** 62)
+    for count in (100, 1_000, 5_000):
+        stub = StubModrinth(projects=1, versions=count)
+        content = json.dumps(stub.project_versions["P0"]).encode()
+        number = max(1, 1_000 // count)
+        legacy_versions, versions = legacy_parse(content), parse(content)
+        assert [version.id for version in versions] == [version.id for version in legacy_versions]
+
+        print(f"Modrinth version list, {count} versions, {len(content) / count:.0f} bytes per version in responses")
+        bench("  response.json() and full models", lambda: legacy_parse(content), number)
+        bench("  slim models from bytes", lambda: parse(content), number)
+        for name, cached in (("full models", legacy_versions), ("slim models", versions)):
+            memory = estimate_size(cached) / count
+            shared = len(serializer.dumps(cached)) / count
+            print(f"  {name:<38} {memory:>8.0f} bytes per version in memory, {shared:>5.0f} in shared caches "
+                  f"before compression")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Microbenchmarks of Maven XML rendering, comparing :mod:`app.maven` to the string concatenation it replaced. Documents
+are rendered as :func:`app.routers.rendered.respond` renders them on a cache miss: the chunks of the renderer the routers
+use are joined, then encoded, checksummed and compressed once.
+
+Run from the repository root with ``python -m benchmarks.rendering``.
+"""
+
+import timeit
+
+from app.maven import MavenDependency, iter_maven_metadata, iter_pom
+from app.routers.rendered import render_response
+
+GROUP_ID = "io.papermc.hangar.paper"
+ARTIFACT_ID = "example"
+LAST_UPDATED = "20240101000000"
+
+
+def legacy_render_maven_metadata(versions: list[str]) -> str:
+    metadata = f"""<metadata>
+  <groupId>{GROUP_ID}</groupId>
+  <artifactId>{ARTIFACT_ID}</artifactId>
+  <versioning>
+    <latest>{versions[0]}</latest>
+    <release>{versions[0]}</release>
+    <versions>
+"""
+    for version in versions:
+        metadata += f"      <version>{version}</version>\n"
+
+    metadata += f"""    </versions>
+    <lastUpdated>{LAST_UPDATED}</lastUpdated>
+  </versioning>
+</metadata>
+"""
+    return metadata.strip()
+
+
+def legacy_render_pom(dependencies: list[MavenDependency]) -> str:
+    pom_content = f"""<project xmlns="http://maven.apache.org/POM/4.0.0"
+         xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"
+         xsi:schemaLocation="http://maven.apache.org/POM/4.0.0 http://maven.apache.org/xsd/maven-4.0.0.xsd">
+  <modelVersion>4.0.0</modelVersion>
+  <groupId>{GROUP_ID}</groupId>
+  <artifactId>{ARTIFACT_ID}</artifactId>
+  <version>1.0.0</version>
+  <dependencies>
+"""
+    for dep in dependencies:
+        pom_content += f"""    <dependency>
+      <groupId>{dep.group_id}</groupId>
+      <artifactId>{dep.artifact_id}</artifactId>
+      <version>{dep.version}</version>
+    </dependency>
+"""
+    pom_content += """  </dependencies>
+</project>
+"""
+    return pom_content.strip()
+
+
+def render_maven_metadata(versions: list[str]) -> str:
+    return "".join(iter_maven_metadata(GROUP_ID, ARTIFACT_ID, versions[0], versions, LAST_UPDATED))
+
+
+def render_pom(dependencies: list[MavenDependency]) -> str:
+    return "".join(iter_pom(GROUP_ID, ARTIFACT_ID, "1.0.0", dependencies))
+
+
+def bench(name: str, function, number: int) -> None:
+    seconds = min(timeit.repeat(function, number=number, repeat=5)) / number
+    print(f"{name:<40} {seconds * 1e6:>12.1f} µs")
+
+
+def main() -> None:
+    for count in (10, 1_000, 50_000):
+        versions = [f"{count - i}.0.{i}" for i in range(count)]
+        number = max(1, 10_000 // count)
+        assert render_maven_metadata(versions) == legacy_render_maven_metadata(versions)
+
+        print(f"maven-metadata.xml, {count} versions")
+        bench("  string concatenation", lambda: legacy_render_maven_metadata(versions), number)
+        bench("  app.maven", lambda: render_maven_metadata(versions), number)
+        bench("  app.maven, rendered response",
+              lambda: render_response(render_maven_metadata(versions), etag="", last_modified=None), number)
+        bench("  app.maven, first chunk (streaming)",
+              lambda: next(iter_maven_metadata(GROUP_ID, ARTIFACT_ID, versions[0], versions, LAST_UPDATED)), number)
+
+    for count in (5, 100, 5_000):
+        dependencies = [MavenDependency(GROUP_ID, f"dependency-{i}", f"{i}.0") for i in range(count)]
+        number = max(1, 10_000 // count)
+        assert render_pom(dependencies) == legacy_render_pom(dependencies)
+
+        print(f"POM, {count} dependencies")
+        bench("  string concatenation", lambda: legacy_render_pom(dependencies), number)
+        bench("  app.maven", lambda: render_pom(dependencies), number)
+        bench("  app.maven, rendered response",
+              lambda: render_response(render_pom(dependencies), etag="", last_modified=None), number)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+Load benchmark of the whole application against stub backends, replaying the requests Maven sends to resolve
+artifacts: ``maven-metadata.xml``, then the POM and its checksum, then the JAR and its checksum.
+
+Virtual users resolve projects picked with a Zipf distribution, so that a few projects are much more popular than the
+others, and sometimes probe artifacts that do not exist, as Maven does with every configured repository. The report
+gives latency percentiles by route family, throughput, peak memory and the number of requests sent to the backends per
+request to the bridge.
+
+Run from the repository root, for example with
+``python -m benchmarks.resolution --users 32 --duration 10 --latency 0.05 --error-rate 0.01``.
+Settings may be given with environment variables as usual. Backend rate limits are lifted unless they are set.
+"""
+
+import argparse
+import asyncio
+import itertools
+import logging
+import os
+import random
+import re
+import resource
+import statistics
+import sys
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Optional
+
+import httpx
+
+from benchmarks.upstreams import StubHangar, StubModrinth, load_recorded
+
+# The stub backends answer as fast as asked, do not let the rate limiters be what is measured
+for _backend in ("HANGAR", "MODRINTH"):
+    os.environ.setdefault(f"MC_MAVEN_BRIDGE__{_backend}__CLIENT__RATE_LIMIT_PER_SECOND", "1000000")
+    os.environ.setdefault(f"MC_MAVEN_BRIDGE__{_backend}__CLIENT__RATE_LIMIT_BURST", "1000000")
+    os.environ.setdefault(f"MC_MAVEN_BRIDGE__{_backend}__CLIENT__RETRY_BACKOFF_SECONDS", "0.01")
+
+from app import cache  # noqa: E402
+from app.main import app  # noqa: E402
+from app.metrics import get_route_family  # noqa: E402
+from app.upstream import open_clients, close_clients  # noqa: E402
+
+_VERSION = re.compile(r"<version>([^<]+)</version>")
+
+
+class Recorder:
+    """
+    Latencies and statuses of the responses of the bridge.
+    """
+
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.statuses: Counter[int] = Counter()
+
+    async def get(self, client: httpx.AsyncClient, path: str) -> httpx.Response:
+        start = time.perf_counter()
+        response = await client.get(path)
+        self.latencies[get_route_family(path)].append(time.perf_counter() - start)
+        self.statuses[response.status_code] += 1
+        return response
+
+    @property
+    def requests(self) -> int:
+        return self.statuses.total()
+
+
+def get_popularity(projects: int) -> list[float]:
+    """
+    Get the cumulative weights of projects following Zipf's law: project n is requested 1/(n+1) as often as the most
+    popular one.
+    """
+
+    return list(itertools.accumulate(1 / (project + 1) for project in range(projects)))
+
+
+def get_coordinates(rng: random.Random, popularity: list[float], missing_rate: float) -> tuple[str, str]:
+    """
+    Pick the artifact a virtual user resolves, from Hangar or Modrinth.
+    :return: The path of the Maven group, and the artifact ID.
+    """
+
+    if rng.random() < missing_rate:
+        project = len(popularity) + rng.randrange(1_000_000)
+    else:
+        project = rng.choices(range(len(popularity)), cum_weights=popularity)[0]
+    if rng.random() < 0.5:
+        return "io/papermc/hangar/paper", f"hangar-{project}"
+    return "com/modrinth/paper", f"modrinth-{project}"
+
+
+async def resolve(client: httpx.AsyncClient, recorder: Recorder, rng: random.Random, popularity: list[float],
+                  missing_rate: float) -> None:
+    """
+    Resolve an artifact as Maven does: its metadata, then the POM and JAR of its latest version, or of an older one,
+    along with their checksums.
+    """
+
+    group_path, artifact_id = get_coordinates(rng, popularity, missing_rate)
+    base = f"/repository/{group_path}/{artifact_id}"
+    response = await recorder.get(client, f"{base}/maven-metadata.xml")
+    if response.status_code != 200:
+        return
+    await recorder.get(client, f"{base}/maven-metadata.xml.sha1")
+
+    versions = _VERSION.findall(response.text)
+    if not versions:
+        return
+    version = versions[0] if rng.random() < 0.8 else rng.choice(versions)
+    for extension in ("pom", "pom.sha1", "jar", "jar.sha1"):
+        await recorder.get(client, f"{base}/{version}/{artifact_id}-{version}.{extension}")
+
+
+async def user(client: httpx.AsyncClient, recorder: Recorder, seed: int, deadline: float, popularity: list[float],
+               missing_rate: float) -> None:
+    rng = random.Random(seed)
+    while time.perf_counter() < deadline:
+        await resolve(client, recorder, rng, popularity, missing_rate)
+
+
+def percentiles(latencies: list[float]) -> str:
+    if len(latencies) < 2:
+        return "-"
+    quantiles = statistics.quantiles(latencies, n=100, method="inclusive")
+    return "  ".join(f"p{p} {quantiles[p - 1] * 1000:8.2f}" for p in (50, 95, 99))
+
+
+def peak_rss_mib() -> float:
+    # Kilobytes on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def report(recorder: Recorder, seconds: float, hangar: StubHangar, modrinth: StubModrinth) -> None:
+    requests = recorder.requests
+    print(f"requests             {requests} in {seconds:.1f} s, {requests / seconds:.1f} requests/s")
+    print(f"latency (ms)         {percentiles([latency for family in recorder.latencies.values() for latency in family])}")
+    for family, latencies in sorted(recorder.latencies.items()):
+        print(f"  {family:<18} {percentiles(latencies)}  ({len(latencies)} requests)")
+    print(f"statuses             {', '.join(f'{status}: {count}' for status, count in sorted(recorder.statuses.items()))}")
+    upstream_calls = hangar.calls + modrinth.calls
+    print(f"upstream calls       {upstream_calls / max(requests, 1):.3f} per request (hangar {hangar.calls}, modrinth "
+          f"{modrinth.calls}, {hangar.errors + modrinth.errors} injected errors)")
+    print(f"peak RSS             {peak_rss_mib():.1f} MiB (bridge, stubs and load generator)")
+
+
+async def run(users: int, duration: float, projects: int, versions: int, latency: float, error_rate: float,
+              missing_rate: float, recorded: Optional[Path], seed: int) -> None:
+    responses = load_recorded(recorded)
+    hangar = StubHangar(projects, versions, latency=latency, error_rate=error_rate, recorded=responses, seed=seed)
+    modrinth = StubModrinth(projects, versions, latency=latency, error_rate=error_rate, recorded=responses, seed=seed)
+    await open_clients(transports={"hangar": hangar, "modrinth": modrinth})
+
+    recorder = Recorder()
+    popularity = get_popularity(projects)
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bridge") as client:
+            start = time.perf_counter()
+            await asyncio.gather(*(user(client, recorder, seed + index, start + duration, popularity, missing_rate)
+                                   for index in range(users)))
+            seconds = time.perf_counter() - start
+    finally:
+        await close_clients()
+        await cache.close()
+    report(recorder, seconds, hangar, modrinth)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--users", type=int, default=16, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds to run for")
+    parser.add_argument("--projects", type=int, default=200, help="projects of each stub backend")
+    parser.add_argument("--versions", type=int, default=50, help="versions of each project")
+    parser.add_argument("--latency", type=float, default=0.05, help="mean latency of the stub backends, in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="fraction of backend requests answered with 429 or 503")
+    parser.add_argument("--missing-rate", type=float, default=0.2,
+                        help="fraction of resolutions of artifacts that do not exist")
+    parser.add_argument("--recorded", type=Path, help="JSON file of recorded backend responses, by URL")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    # Retries of injected errors are logged as warnings, keep the report readable
+    logging.basicConfig(level=logging.ERROR)
+    asyncio.run(run(users=args.users, duration=args.duration, projects=args.projects, versions=args.versions,
+                    latency=args.latency, error_rate=args.error_rate, missing_rate=args.missing_rate,
+                    recorded=args.recorded, seed=args.seed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""
+Stub Hangar and Modrinth backends, serving synthetic projects, or recorded responses, without network access.
+
+They are HTTP transports, given to :func:`app.upstream.open_clients` in place of connections to the backends, so that
+requests still go through the application's rate limiting, retries and metrics.
+"""
+
+import abc
+import asyncio
+import json
+import random
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Optional
+
+import httpx
+
+# Statuses answered in place of responses, at the configured error rate
+INJECTED_STATUSES = (429, 503)
+
+_EPOCH = datetime(2024, 1, 1)
+
+
+def _date(days: int) -> str:
+    return (_EPOCH + timedelta(days=days)).isoformat() + "Z"
+
+
+class StubBackend(httpx.AsyncBaseTransport, abc.ABC):
+    """
+    Transport answering requests from synthetic data, with a simulated latency and rate of transient errors.
+
+    Responses recorded from the real backend may be given as a mapping from request URL to JSON body. They are served
+    in place of synthetic ones for the same URLs.
+    """
+
+    def __init__(self, latency: float = 0.0, error_rate: float = 0.0, recorded: Optional[dict[str, Any]] = None,
+                 seed: int = 0):
+        """
+        :param latency: Mean number of seconds to answer a request, exponentially distributed.
+        :param error_rate: Fraction of requests answered with a transient error, without Retry-After.
+        :param recorded: Recorded JSON bodies, by request URL.
+        :param seed: Seed of the random latencies and errors.
+        """
+
+        self.latency = latency
+        self.error_rate = error_rate
+        self.recorded = recorded or {}
+        self.calls = 0
+        self.errors = 0
+        self._random = random.Random(seed)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self._random.expovariate(1 / self.latency))
+        if self.error_rate and self._random.random() < self.error_rate:
+            self.errors += 1
+            return httpx.Response(self._random.choice(INJECTED_STATUSES), json={"error": "injected"})
+
+        recorded = self.recorded.get(str(request.url))
+        if recorded is not None:
+            return httpx.Response(200, json=recorded)
+        body = self.route(request)
+        if body is None:
+            return httpx.Response(404, json={"error": "not_found"})
+        return httpx.Response(200, json=body)
+
+    @abc.abstractmethod
+    def route(self, request: httpx.Request) -> Any:
+        """
+        Answer a request from synthetic data.
+        :param request: The request.
+        :return: The JSON body of the response, or None to answer 404 Not Found.
+        """
+
+
+class StubHangar(StubBackend):
+    """
+    Stub of Hangar's API v1, with projects whose versions are published for Paper.
+    """
+
+    def __init__(self, projects: int, versions: int, **kwargs):
+        """
+        :param projects: Number of projects, named ``hangar-<n>``.
+        :param versions: Number of versions of each project.
+        """
+
+        super().__init__(**kwargs)
+        self.projects: dict[str, list[dict[str, Any]]] = {}
+        for project in range(projects):
+            slug = f"hangar-{project}"
+            self.projects[slug] = [self._version(project, number, projects) for number in range(versions, 0, -1)]
+
+    def _version(self, project: int, number: int, projects: int) -> dict[str, Any]:
+        dependencies = [{"namespace": "io.papermc.hangar.paper", "name": f"hangar-{dependency}", "version": "1.0.0"}
+                        for dependency in self._random.sample(range(projects), min(projects, 3))
+                        if dependency != project]
+        return {"name": f"{number}.0.0", "createdAt": _date(number), "dependencies": dependencies,
+                "downloads": {"PAPER": {"fileInfo": {"name": f"hangar-{project}-{number}.0.0.jar", "sizeBytes": 1024,
+                                                     "sha256Hash": f"{project:032x}{number:032x}"},
+                                        "downloadUrl": None, "externalUrl": None}}}
+
+    def route(self, request: httpx.Request) -> Any:
+        parts = request.url.path.strip("/").split("/")
+        # api/v1/projects/{slug}[/versions[/{name}]]
+        if len(parts) < 4 or parts[2] != "projects" or parts[3] not in self.projects:
+            return None
+        versions = self.projects[parts[3]]
+        if len(parts) == 4:
+            return {"name": parts[3], "namespace": {"owner": "stub", "slug": parts[3]}}
+        if len(parts) == 5 and parts[4] == "versions":
+            limit = int(request.url.params.get("limit", 10))
+            offset = int(request.url.params.get("offset", 0))
+            return {"result": versions[offset:offset + limit],
+                    "pagination": {"count": len(versions), "limit": limit, "offset": offset}}
+        if len(parts) == 6 and parts[4] == "versions":
+            return next((version for version in versions if version["name"] == parts[5]), None)
+        return None
+
+
+class StubModrinth(StubBackend):
+    """
+    Stub of Modrinth's API v2, with projects whose versions are published for Paper and Fabric, and depend on versions
+    of other projects.
+    """
+
+    def __init__(self, projects: int, versions: int, **kwargs):
+        """
+        :param projects: Number of projects, with slugs ``modrinth-<n>`` and IDs ``P<n>``.
+        :param versions: Number of versions of each project.
+        """
+
+        super().__init__(**kwargs)
+        self.projects: dict[str, dict[str, Any]] = {}
+        self.versions: dict[str, dict[str, Any]] = {}
+        # Versions of each project, newest first, by project ID
+        self.project_versions: dict[str, list[dict[str, Any]]] = {}
+        self._slugs: dict[str, str] = {}
+
+        for project in range(projects):
+            project_id = f"P{project}"
+            self._slugs[f"modrinth-{project}"] = project_id
+            self.project_versions[project_id] = []
+            for number in range(versions, 0, -1):
+                version = self._version(project, number, projects, versions)
+                self.versions[version["id"]] = version
+                self.project_versions[project_id].append(version)
+            self.projects[project_id] = self._project(project_id, self.project_versions[project_id])
+
+    def _version(self, project: int, number: int, projects: int, versions: int) -> dict[str, Any]:
+        dependencies = [{"version_id": f"V{dependency}-{self._random.randint(1, versions)}",
+                         "project_id": f"P{dependency}", "file_name": None, "dependency_type": "required"}
+                        for dependency in self._random.sample(range(projects), min(projects, 3))
+                        if dependency != project]
+        filename = f"modrinth-{project}-{number}.0.0.jar"
+        return {"name": f"Version {number}.0.0", "version_number": f"{number}.0.0", "changelog": "Changes. " * 200,
+                "dependencies": dependencies, "game_versions": ["1.20.4", "1.21"], "version_type": "release",
+                "loaders": ["paper", "fabric"], "featured": False, "status": "listed", "requested_status": "listed",
+                "id": f"V{project}-{number}", "project_id": f"P{project}", "author_id": "stub",
+                "date_published": _date(number), "downloads": number * 100, "changelog_url": None,
+                "files": [{"hashes": {"sha512": f"{project:064x}{number:064x}", "sha1": f"{project:020x}{number:020x}"},
+                           "url": f"https://cdn.modrinth.com/data/P{project}/{filename}", "filename": filename,
+                           "primary": True, "size": 1024, "file_type": None}]}
+
+    def _project(self, project_id: str, versions: list[dict[str, Any]]) -> dict[str, Any]:
+        return {"id": project_id, "team": "stub", "body_url": None, "moderator_message": None,
+                "published": _date(0), "updated": versions[0]["date_published"] if versions else _date(0),
+                "approved": _date(0), "queued": None, "followers": 0,
+                "license": {"id": "MIT", "name": "MIT License", "url": None},
+                "versions": [version["id"] for version in versions], "game_versions": ["1.20.4", "1.21"],
+                "loaders": ["paper", "fabric"], "gallery": []}
+
+    def route(self, request: httpx.Request) -> Any:
+        parts = request.url.path.strip("/").split("/")
+        # v2/projects?ids=[...] and v2/versions?ids=[...]
+        if parts[1:] in (["projects"], ["versions"]):
+            items = self.projects if parts[1] == "projects" else self.versions
+            return [items[item_id] for item_id in json.loads(request.url.params["ids"]) if item_id in items]
+        # v2/project/{id|slug}[/version[/{id|number}]]
+        if len(parts) < 3 or parts[1] != "project":
+            return None
+        project_id = self._slugs.get(parts[2], parts[2])
+        if project_id not in self.projects:
+            return None
+        if len(parts) == 3:
+            return self.projects[project_id]
+        versions = self.project_versions[project_id]
+        if len(parts) == 4 and parts[3] == "version":
+            return versions
+        if len(parts) == 5 and parts[3] == "version":
+            return next((version for version in versions if parts[4] in (version["id"], version["version_number"])),
+                        None)
+        return None
+
+
+def load_recorded(path: Optional[Path]) -> dict[str, Any]:
+    """
+    Load recorded backend responses.
+    :param path: A JSON file, mapping request URLs, as sent by the application, to response bodies. None for none.
+    :return: The recorded responses, by URL.
+    """
+
+    if path is None:
+        return {}
+    with path.open() as file:
+        return json.load(file)
@@ -0,0 +1,25 @@
+import asyncio
+
+import pytest
+
+from app.cache.decorators import registry
+from app.routers.rendered import metadata_cache, pom_cache
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """
+    Start every test with empty caches, as cached functions are shared by the whole application.
+    """
+
+    yield
+
+    async def clear():
+        for function in registry.values():
+            await function.cache.clear()
+            if function.missing_cache is not None:
+                await function.missing_cache.clear()
+        for rendered in (metadata_cache, pom_cache):
+            await rendered.cache.clear()
+
+    asyncio.run(clear())
@@ -0,0 +1,38 @@
+import json
+
+import httpx
+
+
+def create_version(version_id: str, version_number: str, loaders: list[str], project_id: str = "project",
+                   dependencies: list[dict] = ()) -> dict:
+    return {"id": version_id, "version_number": version_number, "loaders": loaders, "project_id": project_id,
+            "date_published": "2024-01-01T00:00:00Z", "dependencies": list(dependencies), "changelog": "Changes",
+            "files": [{"hashes": {"sha512": f"{version_id}-sha512", "sha1": f"{version_id}-sha1"},
+                       "url": f"https://cdn.modrinth.com/{version_id}.jar", "filename": f"{version_id}.jar",
+                       "primary": True}]}
+
+
+class StubModrinth:
+    """
+    Versions of Modrinth projects, answered by the endpoints the bridge uses.
+    """
+
+    def __init__(self, versions: list[dict]):
+        self.versions = versions
+        self.paths: list[str] = []
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        self.paths.append(request.url.path)
+        parts = request.url.path.split("/")[2:]
+        if parts == ["versions"]:
+            ids = json.loads(request.url.params["ids"])
+            return httpx.Response(200, json=[version for version in self.versions if version["id"] in ids])
+        project_versions = [version for version in self.versions if version["project_id"] == parts[1]]
+        if not project_versions:
+            return httpx.Response(404)
+        if len(parts) == 3:
+            return httpx.Response(200, json=project_versions)
+        # Like Modrinth, answer with a single version for a version number
+        found = next((version for version in project_versions if parts[3] in (version["id"],
+                                                                               version["version_number"])), None)
+        return httpx.Response(200, json=found) if found is not None else httpx.Response(404)
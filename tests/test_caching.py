@@ -0,0 +1,51 @@
+from datetime import datetime, timezone
+
+from starlette.requests import Request
+
+from app.routers.caching import compute_etag, encoded_etag, format_http_date, is_not_modified
+
+ETAG = compute_etag("metadata", "example", "1.0.0")
+LAST_MODIFIED = datetime(2024, 1, 2, 3, 4, 5, 678000)
+
+
+def create_request(**headers: str) -> Request:
+    return Request({"type": "http", "method": "GET",
+                    "headers": [(name.replace("_", "-").lower().encode(), value.encode())
+                                for name, value in headers.items()]})
+
+
+def test_etags_change_with_their_parts():
+    assert compute_etag("a", "b") == compute_etag("a", "b")
+    assert compute_etag("a", "b") != compute_etag("ab")
+    assert ETAG.startswith('"') and ETAG.endswith('"')
+
+
+def test_matching_etags_are_not_modified():
+    assert is_not_modified(create_request(If_None_Match=ETAG), ETAG, None)
+    assert is_not_modified(create_request(If_None_Match=f'"other", W/{ETAG}'), ETAG, None)
+    assert is_not_modified(create_request(If_None_Match="*"), ETAG, None)
+    assert not is_not_modified(create_request(If_None_Match='"other"'), ETAG, None)
+
+
+def test_etags_of_compressed_variants_match():
+    assert is_not_modified(create_request(If_None_Match=encoded_etag(ETAG, "gzip")), ETAG, None)
+    assert is_not_modified(create_request(If_None_Match=encoded_etag(ETAG, "br")), ETAG, None)
+
+
+def test_if_modified_since_is_compared_to_the_second():
+    since = format_http_date(LAST_MODIFIED)
+    assert is_not_modified(create_request(If_Modified_Since=since), ETAG, LAST_MODIFIED)
+    assert is_not_modified(create_request(If_Modified_Since=since), ETAG, LAST_MODIFIED.replace(tzinfo=timezone.utc))
+    earlier = format_http_date(LAST_MODIFIED.replace(second=4))
+    assert not is_not_modified(create_request(If_Modified_Since=earlier), ETAG, LAST_MODIFIED)
+    assert not is_not_modified(create_request(If_Modified_Since="not a date"), ETAG, LAST_MODIFIED)
+    assert not is_not_modified(create_request(If_Modified_Since=since), ETAG, None)
+
+
+def test_if_none_match_takes_precedence():
+    since = format_http_date(LAST_MODIFIED)
+    assert not is_not_modified(create_request(If_None_Match='"other"', If_Modified_Since=since), ETAG, LAST_MODIFIED)
+
+
+def test_requests_without_conditions_are_modified():
+    assert not is_not_modified(create_request(), ETAG, LAST_MODIFIED)
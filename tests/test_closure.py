@@ -0,0 +1,90 @@
+from xml.etree import ElementTree
+
+import httpx
+import pytest
+from starlette.testclient import TestClient
+
+from app import closure, upstream
+from app.closure import fetch_dependency_node
+from app.main import app
+from tests.stubs import StubModrinth, create_version
+
+POM_NAMESPACE = {"pom": "http://maven.apache.org/POM/4.0.0"}
+
+
+def depend_on(*versions: tuple[str, str]) -> list[dict]:
+    return [{"version_id": version_id, "project_id": project_id, "file_name": None, "dependency_type": "required"}
+            for version_id, project_id in versions]
+
+
+@pytest.fixture
+def modrinth(monkeypatch):
+    # A diamond: root depends on left and right, which both depend on base. Base depends on the root again, and on
+    # an older version of it
+    stub = StubModrinth([
+        create_version("R2", "2.0", ["paper"], project_id="root", dependencies=depend_on(("L1", "left"),
+                                                                                          ("Q1", "right"))),
+        create_version("R1", "1.0", ["paper"], project_id="root"),
+        create_version("L1", "1.0", ["paper"], project_id="left", dependencies=depend_on(("B1", "base"))),
+        create_version("Q1", "1.0", ["paper"], project_id="right", dependencies=depend_on(("B1", "base"))),
+        create_version("B1", "1.0", ["paper"], project_id="base", dependencies=depend_on(("R2", "root"),
+                                                                                          ("R1", "root"))),
+    ])
+    monkeypatch.setitem(upstream._clients, "modrinth", httpx.AsyncClient(transport=httpx.MockTransport(stub.handle)))
+    return stub
+
+
+def test_closures_of_diamonds_and_cycles_have_every_artifact_once(modrinth):
+    response = TestClient(app).get("/closure/com.modrinth.paper:root")
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["artifact"]["artifact_id"], body["artifact"]["version"]) == ("root", "2.0")
+    # Nearest first, the requested artifact is not repeated when the cycle reaches it again
+    assert [(dependency["artifact_id"], dependency["version"]) for dependency in body["dependencies"]] == \
+           [("left", "1.0"), ("right", "1.0"), ("base", "1.0"), ("root", "1.0")]
+
+
+def test_boms_manage_the_nearest_version_of_each_artifact(modrinth):
+    response = TestClient(app).get("/closure/com.modrinth.paper:root/bom.pom")
+    assert response.status_code == 200
+    project = ElementTree.fromstring(response.content)
+    assert project.findtext("pom:artifactId", namespaces=POM_NAMESPACE) == "root-bom"
+    managed = [tuple(dependency.findtext(f"pom:{name}", namespaces=POM_NAMESPACE)
+                     for name in ("artifactId", "version"))
+               for dependency in project.iterfind("pom:dependencyManagement/pom:dependencies/pom:dependency",
+                                                  namespaces=POM_NAMESPACE)]
+    assert managed == [("base", "1.0"), ("left", "1.0"), ("right", "1.0"), ("root", "2.0")]
+
+
+def test_shared_nodes_are_resolved_once(modrinth, monkeypatch):
+    resolved = []
+    resolve_dependency_nodes = closure.resolve_dependency_nodes
+
+    async def record(values: list[str]):
+        resolved.extend(values)
+        return await resolve_dependency_nodes(values)
+
+    monkeypatch.setattr(closure, "resolve_dependency_nodes", record)
+    client = TestClient(app)
+    assert client.get("/closure/com.modrinth.paper:root").status_code == 200
+    # Base is reached through both sides of the diamond, and the root again through the cycle
+    assert sorted(resolved) == ["com.modrinth.paper:base:B1", "com.modrinth.paper:left:L1",
+                                "com.modrinth.paper:right:Q1", "com.modrinth.paper:root",
+                                "com.modrinth.paper:root:R1", "com.modrinth.paper:root:R2"]
+
+    # Every node of the graph of a dependency is cached already
+    resolved.clear()
+    paths = list(modrinth.paths)
+    hits = fetch_dependency_node.stats.hits
+    response = client.get("/closure/com.modrinth.paper:left:L1")
+    assert response.status_code == 200
+    assert [dependency["artifact_id"] for dependency in response.json()["dependencies"]] == \
+           ["base", "root", "root", "right"]
+    assert resolved == []
+    assert modrinth.paths == paths
+    assert fetch_dependency_node.stats.hits - hits == 5
+
+
+def test_closures_of_missing_artifacts_are_missing(modrinth):
+    response = TestClient(app).get("/closure/com.modrinth.paper:unknown")
+    assert response.status_code == 404
@@ -0,0 +1,247 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from app.cache import cached
+from app.cache.revalidation import NotModified, current_revalidation
+
+
+def test_concurrent_misses_are_coalesced():
+    calls = []
+
+    @cached(ttl=60)
+    async def fetch(key: str) -> dict:
+        calls.append(key)
+        await asyncio.sleep(0.01)
+        return {"key": key}
+
+    async def main():
+        results = await asyncio.gather(*(fetch("a") for _ in range(10)), fetch("b"))
+        assert results[:10] == [{"key": "a"}] * 10
+        assert results[10] == {"key": "b"}
+        assert await fetch("a") == {"key": "a"}
+
+    asyncio.run(main())
+    assert sorted(calls) == ["a", "b"]
+    assert fetch.stats.misses == 2
+    assert fetch.stats.coalesced == 9
+    assert fetch.stats.hits == 1
+
+
+def test_coalesced_callers_share_errors_which_are_not_cached():
+    calls = []
+
+    @cached(ttl=60)
+    async def fetch(key: str) -> dict:
+        calls.append(key)
+        await asyncio.sleep(0.01)
+        if len(calls) == 1:
+            raise httpx.ConnectError("unreachable")
+        return {"key": key}
+
+    async def main():
+        results = await asyncio.gather(fetch("a"), fetch("a"), return_exceptions=True)
+        assert all(isinstance(result, httpx.ConnectError) for result in results)
+        assert await fetch("a") == {"key": "a"}
+
+    asyncio.run(main())
+    assert calls == ["a", "a"]
+
+
+def test_cancelling_a_caller_does_not_cancel_the_shared_call():
+    @cached(ttl=60)
+    async def fetch(key: str) -> dict:
+        await asyncio.sleep(0.05)
+        return {"key": key}
+
+    async def main():
+        first = asyncio.ensure_future(fetch("a"))
+        second = asyncio.ensure_future(fetch("a"))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        assert await second == {"key": "a"}
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        assert await fetch.get_cached("a") == {"key": "a"}
+
+    asyncio.run(main())
+
+
+def test_get_cached_and_set_cached_normalize_arguments():
+    calls = []
+
+    @cached(ttl=60)
+    async def fetch(project: str, version: str, depth: int = 1) -> dict:
+        calls.append((project, version, depth))
+        return {"version": version}
+
+    async def main():
+        assert await fetch.get_cached("p", "1.0") is None
+        await fetch.set_cached({"version": "stored"}, "p", version="1.0")
+        assert await fetch.get_cached(project="p", version="1.0", depth=1) == {"version": "stored"}
+        assert await fetch("p", "1.0") == {"version": "stored"}
+        # Other arguments are other entries
+        assert await fetch.get_cached("p", "1.0", 2) is None
+        assert await fetch("p", "1.0", 2) == {"version": "1.0"}
+
+    asyncio.run(main())
+    assert calls == [("p", "1.0", 2)]
+
+
+def test_set_cached_ignores_missing_values():
+    @cached(ttl=60)
+    async def fetch(key: str) -> dict:
+        return {"key": key}
+
+    async def main():
+        await fetch.set_cached(None, "a")
+        assert await fetch.get_cached("a") is None
+
+    asyncio.run(main())
+
+
+def test_stale_values_are_served_while_revalidated():
+    values = iter(["first", "second"])
+
+    @cached(ttl=0.05, stale_while_revalidate=60)
+    async def fetch(key: str) -> str:
+        return next(values)
+
+    async def main():
+        assert await fetch("a") == "first"
+        await asyncio.sleep(0.1)
+        assert await fetch("a") == "first"
+        await asyncio.sleep(0.01)
+        assert await fetch("a") == "second"
+
+    asyncio.run(main())
+    assert fetch.stats.stale == 1
+    assert fetch.stats.refreshes == 1
+
+
+def test_values_stale_for_too_long_are_computed_again():
+    values = iter(["first", "second"])
+
+    @cached(ttl=0.05, stale_while_revalidate=0, stale_if_error=0)
+    async def fetch(key: str) -> str:
+        return next(values)
+
+    async def main():
+        assert await fetch("a") == "first"
+        await asyncio.sleep(0.1)
+        assert await fetch("a") == "second"
+
+    asyncio.run(main())
+
+
+def test_stale_values_are_served_on_transient_errors_only():
+    errors = iter([httpx.ConnectError("unreachable"), ValueError("bug")])
+
+    @cached(ttl=0.05, stale_while_revalidate=0, stale_if_error=60)
+    async def fetch(key: str) -> str:
+        if fetch.stats.misses > 1:
+            raise next(errors)
+        return "first"
+
+    async def main():
+        assert await fetch("a") == "first"
+        await asyncio.sleep(0.1)
+        assert await fetch("a") == "first"
+        with pytest.raises(ValueError):
+            await fetch("a")
+
+    asyncio.run(main())
+    assert fetch.stats.stale_on_error == 1
+
+
+def test_not_modified_values_are_kept():
+    @cached(ttl=0.05, stale_while_revalidate=0)
+    async def fetch(key: str) -> list:
+        if current_revalidation.get().previous is not None:
+            raise NotModified()
+        return ["first"]
+
+    async def main():
+        first = await fetch("a")
+        await asyncio.sleep(0.1)
+        assert await fetch("a") is first
+        assert await fetch.get_cached("a") is first
+
+    asyncio.run(main())
+    assert fetch.stats.not_modified == 1
+
+
+def test_missing_resources_are_cached_for_the_negative_ttl():
+    calls = []
+
+    @cached(ttl=60, negative_ttl=0.05)
+    async def fetch(key: str):
+        calls.append(key)
+        if key == "deleted":
+            raise HTTPException(status_code=404, detail="Project not found")
+        return None
+
+    async def main():
+        assert await fetch("missing") is None
+        assert await fetch("missing") is None
+        for _ in range(2):
+            with pytest.raises(HTTPException) as error:
+                await fetch("deleted")
+            assert (error.value.status_code, error.value.detail) == (404, "Project not found")
+        # Not for the TTL of values
+        await asyncio.sleep(0.1)
+        assert await fetch("missing") is None
+
+    asyncio.run(main())
+    assert calls == ["missing", "deleted", "missing"]
+    assert fetch.stats.missing_hits == 2
+
+
+def test_missing_resources_replace_their_cached_value():
+    calls = []
+
+    @cached(ttl=0.05, stale_while_revalidate=60, negative_ttl=60)
+    async def fetch(key: str):
+        calls.append(key)
+        return "first" if len(calls) == 1 else None
+
+    async def main():
+        assert await fetch("a") == "first"
+        await asyncio.sleep(0.1)
+        # The stale value is served while the resource is found missing
+        assert await fetch("a") == "first"
+        await asyncio.sleep(0.01)
+        assert await fetch("a") is None
+        assert await fetch.get_cached("a") is None
+
+    asyncio.run(main())
+
+
+@pytest.mark.parametrize("error", [
+    httpx.HTTPStatusError("Too many requests", request=httpx.Request("GET", "https://upstream/"),
+                          response=httpx.Response(429)),
+    httpx.HTTPStatusError("Unavailable", request=httpx.Request("GET", "https://upstream/"),
+                          response=httpx.Response(503)),
+    httpx.ReadTimeout("Timed out"),
+    HTTPException(status_code=503, detail="Unavailable"),
+])
+def test_transient_errors_are_not_cached_as_missing(error):
+    calls = []
+
+    @cached(ttl=60, negative_ttl=60)
+    async def fetch(key: str):
+        calls.append(key)
+        if len(calls) == 1:
+            raise error
+        return "found"
+
+    async def main():
+        with pytest.raises(type(error)):
+            await fetch("a")
+        assert await fetch("a") == "found"
+
+    asyncio.run(main())
+    assert calls == ["a", "a"]
+    assert fetch.stats.missing_hits == 0
@@ -0,0 +1,191 @@
+import asyncio
+import math
+
+import httpx
+import pytest
+
+from app import upstream
+from app.cache.decorators import registry
+from app.hangar import fetch_all_versions, fetch_paginated_versions, fetch_versions_history, request_versions_page, \
+    set_cached_pages, sync_versions
+from app.settings import settings
+
+
+class StubHangar:
+    """
+    Versions of a Hangar project, newest first, answered by pages with an ETag.
+    """
+
+    def __init__(self, count: int):
+        self.versions = [{"name": f"{i}.0"} for i in range(count, 0, -1)]
+        self.requests = 0
+        # Offset and If-None-Match header of each request
+        self.sent: list[tuple[str, str | None]] = []
+
+    def publish(self, *names: str) -> None:
+        self.versions[:0] = [{"name": name} for name in names]
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        self.sent.append((request.url.params["offset"], request.headers.get("If-None-Match")))
+        limit, offset = int(request.url.params["limit"]), int(request.url.params["offset"])
+        page = self.versions[offset:offset + limit]
+        etag = f'"{len(self.versions)}-{offset}-{self.names(page)[0] if page else ""}"'
+        if request.headers.get("If-None-Match") == etag:
+            return httpx.Response(304, headers={"ETag": etag})
+        return httpx.Response(200, headers={"ETag": etag},
+                              json={"result": page, "pagination": {"count": len(self.versions), "limit": limit,
+                                                                   "offset": offset}})
+
+    def names(self, versions: list[dict]) -> list[str]:
+        return [version["name"] for version in versions]
+
+
+@pytest.fixture
+def hangar(monkeypatch):
+    monkeypatch.setattr(settings.hangar, "versions_limit_per_batch", 10)
+    monkeypatch.setattr(settings.hangar, "versions_total_to_fetch", 100)
+    stub = StubHangar(25)
+    monkeypatch.setitem(upstream._clients, "hangar", httpx.AsyncClient(transport=httpx.MockTransport(stub.handle)))
+    return stub
+
+
+async def sync(slug: str, known_versions: list[dict], known_count: int):
+    page, pagination = await request_versions_page(slug, "paper", None, limit=10, offset=0)
+    return sync_versions(page, pagination, known_versions=known_versions, known_count=known_count)
+
+
+def test_new_versions_are_merged_from_the_newest_page(hangar):
+    async def main():
+        known, count = await fetch_all_versions("merged", "paper")
+        hangar.publish("27.0", "26.0")
+        hangar.requests = 0
+        return await sync("merged", known, count)
+
+    versions, count = asyncio.run(main())
+    assert hangar.names(versions) == hangar.names(hangar.versions)
+    assert count == 27
+    assert hangar.requests == 1
+
+
+def test_unchanged_versions_are_kept(hangar):
+    async def main():
+        known, count = await fetch_all_versions("unchanged", "paper")
+        return known, await sync("unchanged", known, count)
+
+    known, (versions, count) = asyncio.run(main())
+    assert versions == known
+    assert count == 25
+
+
+@pytest.mark.parametrize("change", ["delete", "publish_many"])
+def test_versions_that_cannot_be_merged_are_fetched_again(hangar, change):
+    async def main():
+        known, count = await fetch_all_versions(change, "paper")
+        if change == "delete":
+            del hangar.versions[3]
+        else:
+            hangar.publish(*(f"{i}.0" for i in range(40, 25, -1)))
+        return await sync(change, known, count)
+
+    assert asyncio.run(main()) is None
+
+
+def test_nothing_is_merged_without_known_versions(hangar):
+    assert sync_versions([{"name": "1.0"}], {"count": 1}, known_versions=[], known_count=0) is None
+
+
+def test_cached_pages_are_shifted_after_a_sync(hangar):
+    async def main():
+        known, count = await fetch_all_versions("shifted", "paper")
+        hangar.publish("27.0", "26.0")
+        versions, count = await sync("shifted", known, count)
+        await set_cached_pages("shifted", "paper", None, versions=versions, count=count)
+        hangar.requests = 0
+        return await fetch_all_versions("shifted", "paper")
+
+    versions, count = asyncio.run(main())
+    assert hangar.names(versions) == hangar.names(hangar.versions)
+    assert count == 27
+    assert hangar.requests == 0
+
+
+def test_fresh_pages_are_not_merged_with_cached_ones(hangar):
+    async def main():
+        await fetch_all_versions("mixed", "paper")
+        hangar.publish("26.0")
+        # A page is evicted, every page must be fetched again
+        pages = registry["app.hangar.fetch_paginated_versions"]
+        await pages.cache.delete(pages.get_cache_key(pages._function, ("mixed", "paper"), {"limit": 10, "offset": 10}))
+        assert await fetch_paginated_versions.get_cached("mixed", "paper", limit=10, offset=10) is None
+        hangar.requests = 0
+        return await fetch_all_versions("mixed", "paper")
+
+    versions, count = asyncio.run(main())
+    assert hangar.names(versions) == hangar.names(hangar.versions)
+    assert count == 26
+    assert hangar.requests == 3
+
+
+def test_refreshes_are_conditional_and_keep_unchanged_versions(hangar):
+    async def main():
+        versions = await fetch_versions_history("revalidated", "paper")
+        hangar.sent.clear()
+        return versions, await fetch_versions_history.prefetch("revalidated", "paper", within=math.inf)
+
+    versions, refreshed = asyncio.run(main())
+    assert refreshed == versions
+    assert hangar.sent == [("0", '"25-0-25.0"')]
+
+
+def test_refreshes_merge_new_versions_after_a_conditional_request(hangar):
+    async def main():
+        await fetch_versions_history("refreshed", "paper")
+        hangar.publish("26.0")
+        hangar.sent.clear()
+        refreshed = await fetch_versions_history.prefetch("refreshed", "paper", within=math.inf)
+        # Cached pages are consistent with the merged versions
+        return refreshed, await fetch_all_versions("refreshed", "paper")
+
+    (versions, count), pages = asyncio.run(main())
+    assert hangar.names(versions) == hangar.names(hangar.versions)
+    assert count == 26
+    assert hangar.sent == [("0", '"25-0-25.0"')]
+    assert pages == (versions, count)
+
+
+class SlowStubHangar(StubHangar):
+    """
+    Hangar answering the first pages last, and counting requests in flight.
+    """
+
+    def __init__(self, count: int):
+        super().__init__(count)
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def handle_slowly(self, request: httpx.Request) -> httpx.Response:
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0.02 - int(request.url.params["offset"]) / 10000)
+            return self.handle(request)
+        finally:
+            self.in_flight -= 1
+
+
+@pytest.mark.parametrize("count, requests", [(95, 10), (250, 10), (10, 1), (0, 1)])
+def test_pages_are_fetched_concurrently_in_order(monkeypatch, count, requests):
+    monkeypatch.setattr(settings.hangar, "versions_limit_per_batch", 10)
+    monkeypatch.setattr(settings.hangar, "versions_total_to_fetch", 100)
+    monkeypatch.setattr(settings.hangar, "versions_fetch_concurrency", 3)
+    stub = SlowStubHangar(count)
+    monkeypatch.setitem(upstream._clients, "hangar",
+                        httpx.AsyncClient(transport=httpx.MockTransport(stub.handle_slowly)))
+
+    versions, total = asyncio.run(fetch_all_versions("concurrent", "paper"))
+    assert stub.names(versions) == stub.names(stub.versions[:100])
+    assert total == count
+    assert stub.requests == requests
+    # The first page is fetched alone, then at most 3 pages at once
+    assert stub.max_in_flight == max(min(requests - 1, 3), 1)
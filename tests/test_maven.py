@@ -0,0 +1,49 @@
+from xml.etree import ElementTree
+
+from app.maven import MavenDependency, escape, iter_bom, iter_maven_metadata, iter_pom
+
+POM_NAMESPACE = {"pom": "http://maven.apache.org/POM/4.0.0"}
+
+
+def test_escape():
+    assert escape("1.0.0") == "1.0.0"
+    assert escape("a<b>&c") == "a&lt;b&gt;&amp;c"
+
+
+def test_maven_metadata_escapes_versions():
+    versions = [f"{i}.0" for i in range(3000, 0, -1)] + ["1.0-<beta>&more"]
+    document = "".join(iter_maven_metadata("io.papermc.hangar.paper", "a&b", versions[0], versions, "20240101000000"))
+
+    metadata = ElementTree.fromstring(document)
+    assert metadata.findtext("artifactId") == "a&b"
+    assert metadata.findtext("versioning/latest") == "3000.0"
+    assert [version.text for version in metadata.iterfind("versioning/versions/version")] == versions
+    assert metadata.findtext("versioning/lastUpdated") == "20240101000000"
+
+
+def test_pom_escapes_dependencies_only_when_needed():
+    dependencies = [MavenDependency("com.modrinth.fabric", f"dependency-{i}", f"{i}.0") for i in range(2000)]
+    dependencies[1500] = MavenDependency("com.modrinth.fabric", "dependency<&>", "1.0 <beta>")
+    document = "".join(iter_pom("com.modrinth.fabric", "example", "1.0", dependencies))
+
+    project = ElementTree.fromstring(document)
+    assert project.findtext("pom:version", namespaces=POM_NAMESPACE) == "1.0"
+    rendered = [MavenDependency(*(dependency.findtext(f"pom:{name}", namespaces=POM_NAMESPACE)
+                                  for name in ("groupId", "artifactId", "version")))
+                for dependency in project.iterfind("pom:dependencies/pom:dependency", namespaces=POM_NAMESPACE)]
+    assert rendered == dependencies
+
+
+def test_pom_without_dependencies():
+    project = ElementTree.fromstring("".join(iter_pom("g", "a", "1", [])))
+    assert project.find("pom:dependencies", namespaces=POM_NAMESPACE) is not None
+
+
+def test_bom_manages_dependencies():
+    dependencies = [MavenDependency("g", "a", "1"), MavenDependency("g", "b&c", "2")]
+    project = ElementTree.fromstring("".join(iter_bom("g", "root-bom", "1", dependencies)))
+
+    assert project.findtext("pom:packaging", namespaces=POM_NAMESPACE) == "pom"
+    assert project.find("pom:dependencies", namespaces=POM_NAMESPACE) is None
+    managed = project.findall("pom:dependencyManagement/pom:dependencies/pom:dependency", namespaces=POM_NAMESPACE)
+    assert [dependency.findtext("pom:artifactId", namespaces=POM_NAMESPACE) for dependency in managed] == ["a", "b&c"]
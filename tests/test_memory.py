@@ -0,0 +1,86 @@
+import asyncio
+
+from app.cache.memory import BoundedMemoryCache, MemoryBudget, estimate_size
+
+
+def test_least_recently_used_entries_are_evicted_first():
+    cache = BoundedMemoryCache(max_size=2, memory_budget=MemoryBudget())
+
+    async def main():
+        await cache.set("a", 1)
+        await cache.set("b", 2)
+        assert await cache.get("a") == 1
+        await cache.set("c", 3)
+        assert await cache.get("b") is None
+        assert await cache.get("a") == 1
+        assert await cache.get("c") == 3
+
+    asyncio.run(main())
+    assert len(cache) == 2
+    assert cache.evictions == 1
+
+
+def test_expired_entries_are_not_returned():
+    cache = BoundedMemoryCache(memory_budget=MemoryBudget())
+
+    async def main():
+        await cache.set("a", 1, ttl=0.01)
+        await asyncio.sleep(0.02)
+        assert await cache.get("a") is None
+        assert not await cache.exists("a")
+
+    asyncio.run(main())
+    assert cache.used_bytes == 0
+
+
+def test_byte_budget_evicts_from_the_biggest_cache():
+    budget = MemoryBudget(max_bytes=0)
+    small = BoundedMemoryCache(memory_budget=budget)
+    big = BoundedMemoryCache(memory_budget=budget)
+    value = "x" * 1000
+
+    async def main():
+        await small.set("a", "y")
+        for key in range(4):
+            await big.set(str(key), value)
+        budget.max_bytes = budget.used_bytes - estimate_size(value)
+        budget.enforce()
+        assert await big.get("0") is None
+        assert await big.get("3") == value
+        assert await small.get("a") == "y"
+
+    asyncio.run(main())
+    assert budget.used_bytes == small.used_bytes + big.used_bytes <= budget.max_bytes
+
+
+def test_replaced_and_deleted_entries_release_their_bytes():
+    budget = MemoryBudget()
+    cache = BoundedMemoryCache(memory_budget=budget)
+
+    async def main():
+        await cache.set("a", "x" * 1000)
+        await cache.set("a", "x")
+        assert cache.used_bytes == estimate_size("x")
+        await cache.delete("a")
+
+    asyncio.run(main())
+    assert cache.used_bytes == budget.used_bytes == 0
+
+
+def test_estimate_size_counts_shared_objects_once():
+    shared = "x" * 1000
+    assert estimate_size([shared, shared]) < 2 * estimate_size(shared)
+    assert estimate_size({"a": [shared]}) > estimate_size(shared)
+
+
+def test_increment_keeps_expiration():
+    cache = BoundedMemoryCache(memory_budget=MemoryBudget())
+
+    async def main():
+        assert await cache.increment("a") == 1
+        await cache.expire("a", 0.01)
+        assert await cache.increment("a", 2) == 3
+        await asyncio.sleep(0.02)
+        assert await cache.get("a") is None
+
+    asyncio.run(main())
@@ -0,0 +1,93 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("prometheus_client")
+
+# Metrics are enabled when the application is imported, so they are scraped from a separate process
+SCRAPE = """
+import asyncio
+
+import httpx
+from starlette.testclient import TestClient
+
+from app import upstream
+from app.main import app
+from tests.stubs import StubModrinth, create_version
+
+stub = StubModrinth([create_version("M2", "2.0", ["paper"], project_id="measured"),
+                     create_version("M1", "1.0", ["paper"], project_id="measured"),
+                     create_version("O1", "1.0", ["paper"], project_id="other")])
+answered = []
+
+
+def handle(request):
+    answered.append(request.url.path)
+    # The first request is rate limited, and retried
+    if len(answered) == 1:
+        return httpx.Response(429, headers={"Retry-After": "0"})
+    return stub.handle(request)
+
+
+asyncio.run(upstream.open_clients({"modrinth": httpx.MockTransport(handle)}))
+client = TestClient(app)
+# The POM of the version list is rendered from the cached list, the other one is fetched
+for path in ("measured/maven-metadata.xml", "measured/maven-metadata.xml", "measured/2.0/measured-2.0.pom",
+             "other/1.0/other-1.0.pom"):
+    assert client.get(f"/repository/com/modrinth/paper/{path}").status_code == 200
+print(client.get("/metrics").text)
+"""
+
+
+@pytest.fixture(scope="module")
+def scraped() -> str:
+    root = Path(__file__).parent.parent
+    env = {**os.environ, "PYTHONPATH": str(root), "MC_MAVEN_BRIDGE__METRICS__ENABLED": "true",
+           # A single request may be sent at once, the next ones wait for the rate limiter
+           "MC_MAVEN_BRIDGE__MODRINTH__CLIENT__RATE_LIMIT_BURST": "1",
+           "MC_MAVEN_BRIDGE__MODRINTH__CLIENT__RATE_LIMIT_PER_SECOND": "50"}
+    env.pop("PROMETHEUS_MULTIPROC_DIR", None)
+    result = subprocess.run([sys.executable, "-c", SCRAPE], cwd=root, env=env, capture_output=True, text=True,
+                            timeout=60)
+    assert result.returncode == 0, result.stderr
+    return result.stdout
+
+
+def get_value(scraped: str, series: str) -> float:
+    values = [float(line.rpartition(" ")[2]) for line in scraped.splitlines() if line.startswith(f"{series} ")]
+    assert values, f"{series} is not exposed"
+    return values[0]
+
+
+def test_upstream_requests_are_exposed(scraped):
+    prefix = ('minecraft_maven_bridge_upstream_requests_total{backend="modrinth",'
+              'endpoint="fetch_modrinth_project_versions"')
+    assert get_value(scraped, f'{prefix},status="429"}}') == 1
+    assert get_value(scraped, f'{prefix},status="200"}}') == 1
+    assert get_value(scraped, 'minecraft_maven_bridge_upstream_request_duration_seconds_count{backend="modrinth",'
+                              'endpoint="fetch_modrinth_project_version"}') == 1
+    assert get_value(scraped, 'minecraft_maven_bridge_upstream_requests_in_flight{backend="modrinth"}') == 0
+
+
+def test_cache_hits_and_misses_are_exposed(scraped):
+    prefix = 'minecraft_maven_bridge_cache_events_total{cache="app.modrinth.fetch_modrinth_project_versions"'
+    assert get_value(scraped, f'{prefix},event="misses"}}') == 1
+    assert get_value(scraped, f'{prefix},event="hits"}}') >= 1
+    assert get_value(scraped, 'minecraft_maven_bridge_cache_events_total{cache="rendered.metadata",'
+                              'event="hits"}') == 1
+    assert get_value(scraped, 'minecraft_maven_bridge_cache_entries{cache="rendered.pom"}') == 2
+
+
+def test_rate_limiter_is_exposed(scraped):
+    assert get_value(scraped, 'minecraft_maven_bridge_upstream_events_total{backend="modrinth",event="retried"}') == 1
+    assert get_value(scraped, 'minecraft_maven_bridge_upstream_events_total{backend="modrinth",'
+                              'event="throttled"}') >= 1
+    assert get_value(scraped, 'minecraft_maven_bridge_upstream_requests_waiting{backend="modrinth"}') == 0
+
+
+def test_responses_are_exposed_by_route_family(scraped):
+    assert get_value(scraped, 'minecraft_maven_bridge_responses_total{family="metadata",status="200"}') == 2
+    assert get_value(scraped, 'minecraft_maven_bridge_responses_total{family="pom",status="200"}') == 2
@@ -0,0 +1,93 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app import upstream
+from app.models.modrinth import Dependency, ExpandedDependency, ProjectVersions, Version
+from app.modrinth import fetch_modrinth_project_version, fetch_modrinth_versions, resolve_modrinth_project_version
+from app.settings import settings
+from tests.stubs import StubModrinth, create_version
+
+
+@pytest.fixture
+def modrinth(monkeypatch):
+    stub = StubModrinth([create_version("P1", "1.0", ["paper"], project_id="shared"),
+                         create_version("F1", "1.0", ["fabric"], project_id="shared")])
+    monkeypatch.setitem(upstream._clients, "modrinth", httpx.AsyncClient(transport=httpx.MockTransport(stub.handle)))
+    return stub
+
+
+def test_versions_sharing_a_number_are_found_by_loader():
+    versions = ProjectVersions.from_versions([Version.model_validate(create_version("P1", "1.0", ["paper"])),
+                                              Version.model_validate(create_version("F1", "1.0", ["fabric"]))])
+    assert versions.find("1.0", "fabric").id == "F1"
+    assert versions.find("1.0", "paper").id == "P1"
+    assert versions.find("1.0").id == "P1"
+    # IDs are unique, the version of another loader is found anyway
+    assert versions.find("F1", "paper").id == "F1"
+    assert versions.find("1.0", "forge").id == "P1"
+    assert versions.find("2.0", "paper") is None
+
+
+def test_versions_sharing_a_number_are_resolved_by_loader(modrinth):
+    async def main():
+        resolved = []
+        for loader in ("paper", "fabric", "paper", "fabric"):
+            version = await resolve_modrinth_project_version("shared", "1.0", loader=loader)
+            resolved.append(version.id)
+        return resolved
+
+    assert asyncio.run(main()) == ["P1", "F1", "P1", "F1"]
+    # The version of another loader was answered for the number, the versions of the project were fetched instead
+    assert modrinth.paths == ["/v2/project/shared/version/1.0", "/v2/project/shared/version"]
+
+
+def create_dependency(version_id: str | None, project_id: str) -> dict:
+    return {"version_id": version_id, "project_id": project_id, "file_name": None, "dependency_type": "required"}
+
+
+@pytest.fixture
+def dependencies(monkeypatch):
+    stub = StubModrinth([
+        create_version("A2", "2.0", ["paper"], project_id="dependent",
+                       dependencies=[create_dependency("B1", "library"), create_dependency("C1", "api")]),
+        create_version("A1", "1.0", ["paper"], project_id="dependent",
+                       dependencies=[create_dependency("B1", "library"), create_dependency(None, "optional")]),
+        create_version("B1", "1.0", ["paper"], project_id="library", dependencies=[create_dependency("C1", "api")]),
+        create_version("C1", "1.0", ["paper"], project_id="api"),
+    ])
+    monkeypatch.setitem(upstream._clients, "modrinth", httpx.AsyncClient(transport=httpx.MockTransport(stub.handle)))
+    return stub
+
+
+def test_dependencies_are_expanded_with_one_bulk_request(dependencies):
+    version = asyncio.run(resolve_modrinth_project_version("dependent", "2.0"))
+    assert [(type(dependency), dependency.id) for dependency in version.dependencies] == \
+           [(ExpandedDependency, "B1"), (ExpandedDependency, "C1")]
+    assert dependencies.paths == ["/v2/project/dependent/version/2.0", "/v2/versions"]
+
+
+def test_bulk_fetched_versions_fill_the_per_version_cache(dependencies):
+    async def main():
+        await fetch_modrinth_versions(["B1", "C1", "unknown"], expand_dependencies_depth=1)
+        library = await fetch_modrinth_project_version.get_cached("library", "B1", 1)
+        # Dependencies are stored the same way, at the next depth
+        api = await fetch_modrinth_project_version.get_cached("api", "C1", 0)
+        # Dependencies of other versions are taken from the cache
+        await fetch_modrinth_versions(["B1"])
+        dependencies.paths.clear()
+        return library, api, await resolve_modrinth_project_version("dependent", "1.0")
+
+    library, api, version = asyncio.run(main())
+    assert library.id == "B1" and isinstance(library.dependencies[0], ExpandedDependency)
+    assert api.id == "C1"
+    assert [type(dependency) for dependency in version.dependencies] == [ExpandedDependency, Dependency]
+    assert dependencies.paths == ["/v2/project/dependent/version/1.0"]
+
+
+def test_bulk_requests_are_batched(dependencies, monkeypatch):
+    monkeypatch.setattr(settings.modrinth, "ids_limit_per_batch", 2)
+    versions = asyncio.run(fetch_modrinth_versions(["A1", "B1", "C1", "B1"]))
+    assert [version.id for version in versions] == ["A1", "B1", "C1"]
+    assert dependencies.paths == ["/v2/versions", "/v2/versions"]
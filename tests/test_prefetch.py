@@ -0,0 +1,109 @@
+import asyncio
+import math
+from collections import Counter
+
+import httpx
+import pytest
+
+from app import prefetch, upstream
+from app.hangar import fetch_version_metadata, fetch_versions_history
+from app.modrinth import fetch_modrinth_project_version, fetch_modrinth_project_versions
+from app.prefetch import Coordinate
+from app.ratelimit import Priority, current_priority
+from app.settings import settings
+from tests.stubs import StubModrinth, create_version
+
+HOT = [Coordinate("com.modrinth.paper", "hot"), Coordinate("io.papermc.hangar.paper", "Hot")]
+
+
+class Backends:
+    """
+    Modrinth and Hangar, recording the priority of every request.
+    """
+
+    def __init__(self):
+        self.modrinth = StubModrinth([create_version("H2", "2.0", ["paper"], project_id="hot"),
+                                      create_version("H1", "1.0", ["paper"], project_id="hot")])
+        self.priorities: list[Priority] = []
+
+    def handle_modrinth(self, request: httpx.Request) -> httpx.Response:
+        self.priorities.append(current_priority.get())
+        return self.modrinth.handle(request)
+
+    def handle_hangar(self, request: httpx.Request) -> httpx.Response:
+        self.priorities.append(current_priority.get())
+        if request.url.path.endswith("/versions"):
+            return httpx.Response(200, json={"result": [{"name": "3.0"}], "pagination": {"count": 1}})
+        return httpx.Response(200, json={"name": "3.0", "createdAt": "2024-01-01T00:00:00Z"})
+
+
+@pytest.fixture
+def backends(monkeypatch):
+    stub = Backends()
+    monkeypatch.setitem(upstream._clients, "modrinth",
+                        httpx.AsyncClient(transport=httpx.MockTransport(stub.handle_modrinth)))
+    monkeypatch.setitem(upstream._clients, "hangar",
+                        httpx.AsyncClient(transport=httpx.MockTransport(stub.handle_hangar)))
+    monkeypatch.setattr(prefetch, "_requests", Counter())
+    return stub
+
+
+def test_configured_projects_are_prefetched_at_startup(backends, monkeypatch):
+    monkeypatch.setattr(settings.prefetch, "coordinates", [str(coordinate) for coordinate in HOT])
+
+    async def main():
+        prefetch.start()
+        try:
+            async with asyncio.timeout(5):
+                while await fetch_modrinth_project_version.get_cached("hot", "2.0") is None or \
+                        await fetch_version_metadata.get_cached("Hot", "3.0") is None:
+                    await asyncio.sleep(0.01)
+        finally:
+            await prefetch.stop()
+        return (await fetch_modrinth_project_versions.get_cached("hot"),
+                await fetch_modrinth_project_version.get_cached("hot", "2.0"),
+                await fetch_versions_history.get_cached("Hot", "paper", None),
+                await fetch_version_metadata.get_cached("Hot", "3.0"))
+
+    project_versions, version, (versions, count), version_metadata = asyncio.run(main())
+    assert [version.id for version in project_versions.versions] == ["H2", "H1"]
+    assert version.id == "H2"
+    assert versions == [{"name": "3.0"}] and count == 1
+    assert version_metadata["name"] == "3.0"
+
+
+def test_prefetches_are_sent_with_a_background_priority(backends):
+    async def main():
+        await prefetch.prefetch_all(HOT, within=0)
+        requests = len(backends.priorities)
+        # Fresh for long enough, nothing is fetched
+        await prefetch.prefetch_all(HOT, within=0)
+        assert len(backends.priorities) == requests
+        # Expiring soon, everything is refreshed
+        await prefetch.prefetch_all(HOT, within=math.inf)
+        return requests
+
+    requests = asyncio.run(main())
+    assert len(backends.priorities) == 2 * requests
+    assert set(backends.priorities) == {Priority.BACKGROUND}
+
+
+def test_failures_do_not_stop_other_prefetches(backends):
+    asyncio.run(prefetch.prefetch_all([Coordinate("com.modrinth.paper", "unknown"), *HOT], within=0))
+    assert asyncio.run(fetch_modrinth_project_versions.get_cached("hot")) is not None
+
+
+def test_most_requested_projects_are_prefetched(backends, monkeypatch):
+    monkeypatch.setattr(settings.prefetch, "learned_max", 2)
+    monkeypatch.setattr(prefetch, "_configured", [HOT[1]])
+    for _ in range(3):
+        prefetch.record_request("com.modrinth.paper", "popular")
+    prefetch.record_request("com.modrinth.paper", "rare")
+    prefetch.record_request("io.papermc.hangar.paper", "Hot")
+    assert prefetch.get_hot_coordinates() == [HOT[1], Coordinate("com.modrinth.paper", "popular"),
+                                              Coordinate("com.modrinth.paper", "rare")]
+    # Counts are halved at every round, projects not requested anymore are forgotten
+    prefetch._decay_requests()
+    assert prefetch.get_hot_coordinates() == [HOT[1], Coordinate("com.modrinth.paper", "popular")]
+    prefetch._decay_requests()
+    assert prefetch.get_hot_coordinates() == [HOT[1]]
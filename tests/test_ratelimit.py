@@ -0,0 +1,107 @@
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import httpx
+
+from app.ratelimit import MIN_RATE, Priority, RateLimitedTransport, RateLimiter, parse_retry_after
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("2") == 2.0
+    assert parse_retry_after("-1") == 0.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after("inf") is None
+    in_a_minute = format_datetime(datetime.now(timezone.utc) + timedelta(minutes=1), usegmt=True)
+    assert 55 < parse_retry_after(in_a_minute) <= 60
+
+
+def test_requests_above_the_burst_wait_for_tokens():
+    limiter = RateLimiter("test", rate=50, burst=2)
+
+    async def main():
+        start = time.monotonic()
+        for _ in range(4):
+            await limiter.acquire()
+        return time.monotonic() - start
+
+    assert 0.03 <= asyncio.run(main()) < 0.5
+    assert limiter.throttled == 2
+
+
+def test_waiting_requests_are_sent_by_priority():
+    limiter = RateLimiter("test", rate=100, burst=1)
+    order = []
+
+    async def send(name: str, priority: Priority):
+        await limiter.acquire(priority)
+        order.append(name)
+
+    async def main():
+        await limiter.acquire()
+        await asyncio.gather(send("background", Priority.BACKGROUND), send("interactive", Priority.INTERACTIVE))
+
+    asyncio.run(main())
+    assert order == ["interactive", "background"]
+
+
+def test_rate_is_adapted_to_the_quota():
+    limiter = RateLimiter("test", rate=5, burst=10)
+    limiter.update(httpx.Headers({"X-Ratelimit-Remaining": "30", "X-Ratelimit-Reset": "60"}))
+    assert limiter.rate == 0.5
+    limiter.update(httpx.Headers({"X-Ratelimit-Remaining": "1", "X-Ratelimit-Reset": "1e12"}))
+    assert limiter.rate == MIN_RATE
+    limiter.update(httpx.Headers({"X-Ratelimit-Remaining": "30", "X-Ratelimit-Reset": "inf"}))
+    assert limiter.rate == MIN_RATE
+    # Without requests remaining, requests are held until the reset, and the quota is expected to be reset then
+    limiter.update(httpx.Headers({"X-Ratelimit-Remaining": "0", "X-Ratelimit-Reset": "30"}))
+    assert limiter.rate == 5
+    assert 29 < limiter._take() <= 30
+
+
+def create_transport(statuses: list[int], headers: dict[str, str], **kwargs) -> tuple[RateLimitedTransport, list]:
+    requests = []
+
+    def handle(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(statuses[min(len(requests), len(statuses)) - 1], headers=headers)
+
+    limiter = RateLimiter("test", rate=1000, burst=1000)
+    options = {"max_retries": 3, "retry_backoff_seconds": 0.01, "max_retry_after_seconds": 1, **kwargs}
+    return RateLimitedTransport(httpx.MockTransport(handle), limiter, **options), requests
+
+
+def test_rate_limited_requests_are_retried():
+    transport, requests = create_transport([429, 503, 200], {"Retry-After": "0"})
+
+    async def main():
+        async with httpx.AsyncClient(transport=transport) as client:
+            return await client.get("https://upstream/")
+
+    assert asyncio.run(main()).status_code == 200
+    assert len(requests) == 3
+    assert transport.limiter.retries == 2
+
+
+def test_retries_are_bounded():
+    transport, requests = create_transport([429], {}, max_retries=2)
+
+    async def main():
+        async with httpx.AsyncClient(transport=transport) as client:
+            return await client.get("https://upstream/")
+
+    assert asyncio.run(main()).status_code == 429
+    assert len(requests) == 3
+
+
+def test_requests_are_not_retried_after_too_long():
+    transport, requests = create_transport([429], {"Retry-After": "60"})
+
+    async def main():
+        async with httpx.AsyncClient(transport=transport) as client:
+            return await client.get("https://upstream/")
+
+    assert asyncio.run(main()).status_code == 429
+    assert len(requests) == 1
@@ -0,0 +1,63 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+
+from app import upstream
+from app.hangar import parse_date
+from app.resolution import get_max_coordinates, parse_coordinates, resolve_all
+from app.settings import settings
+from tests.stubs import StubModrinth, create_version
+
+
+def test_coordinates_are_parsed():
+    coordinate, version = parse_coordinates(" io.papermc.hangar.paper:Example:1.0.0 ")
+    assert (coordinate.group_id, coordinate.artifact_id, version) == ("io.papermc.hangar.paper", "Example", "1.0.0")
+    coordinate, version = parse_coordinates("com.modrinth.fabric:example")
+    assert (coordinate.group_id, coordinate.artifact_id, version) == ("com.modrinth.fabric", "example", None)
+
+
+@pytest.mark.parametrize("value", ["example", "org.example:example:1.0", "io.papermc.hangar.unknown:Example",
+                                   "com.modrinth.unknown:example"])
+def test_invalid_coordinates_are_rejected(value):
+    with pytest.raises(ValueError):
+        parse_coordinates(value)
+
+
+def test_max_coordinates_are_capped_by_rate_limits(monkeypatch):
+    monkeypatch.setattr(settings.resolve, "max_coordinates", 300)
+    monkeypatch.setattr(settings.resolve, "timeout_seconds", 120.0)
+    for client in (settings.hangar.client, settings.modrinth.client):
+        monkeypatch.setattr(client, "rate_limit_per_second", 5.0)
+        monkeypatch.setattr(client, "rate_limit_burst", 10)
+    assert get_max_coordinates() == 300
+
+    monkeypatch.setattr(settings.modrinth.client, "rate_limit_per_second", 1.0)
+    assert get_max_coordinates() == 65
+    monkeypatch.setattr(settings.resolve, "timeout_seconds", 0.0)
+    assert get_max_coordinates() == 300
+    monkeypatch.setattr(settings.resolve, "timeout_seconds", 0.001)
+    monkeypatch.setattr(settings.modrinth.client, "rate_limit_burst", 1)
+    assert get_max_coordinates() == 1
+
+
+@pytest.mark.parametrize("value", ["2024-01-01T12:00:00Z", "2024-01-01T12:00:00.000Z", "2024-01-01T12:00:00",
+                                   "2024-01-01T14:00:00+02:00"])
+def test_hangar_dates_are_parsed_as_utc(value):
+    assert parse_date(value) == datetime(2024, 1, 1, 12, tzinfo=timezone.utc)
+    assert parse_date(value).utcoffset() == timedelta(0)
+
+
+def test_artifacts_of_both_backends_have_comparable_dates(monkeypatch):
+    modrinth = StubModrinth([create_version("D1", "1.0", ["paper"], project_id="dated")])
+    monkeypatch.setitem(upstream._clients, "modrinth",
+                        httpx.AsyncClient(transport=httpx.MockTransport(modrinth.handle)))
+    monkeypatch.setitem(upstream._clients, "hangar", httpx.AsyncClient(transport=httpx.MockTransport(
+        lambda request: httpx.Response(200, json={"name": "1.0", "createdAt": "2024-02-01T00:00:00.000Z",
+                                                  "dependencies": []}))))
+
+    artifacts = asyncio.run(resolve_all(["io.papermc.hangar.paper:Dated:1.0", "com.modrinth.paper:dated:1.0"]))
+    assert [artifact.status for artifact in artifacts] == [200, 200]
+    assert [artifact.artifact_id for artifact in sorted(artifacts, key=lambda artifact: artifact.published)] == \
+           ["dated", "Dated"]
@@ -0,0 +1,60 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.cache.entry import CacheEntry
+from app.cache.revalidation import NotModified, Revalidation, conditional_get, current_revalidation
+
+
+def create_client(requests: list[httpx.Request], status_code: int = 200) -> httpx.AsyncClient:
+    def handle(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(status_code, headers={"ETag": '"new"', "Last-Modified": "Mon, 01 Jan 2024 00:00:00 GMT"})
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(handle))
+
+
+def test_requests_outside_cached_calls_are_not_conditional():
+    requests = []
+
+    async def main():
+        response = await conditional_get(create_client(requests), "https://upstream/")
+        assert response.status_code == 200
+
+    asyncio.run(main())
+    assert "If-None-Match" not in requests[0].headers
+
+
+def test_validators_of_the_previous_value_are_sent():
+    requests = []
+    previous = CacheEntry(value=1, created_at=0, fresh_until=0, etag='"old"',
+                          last_modified="Sun, 31 Dec 2023 00:00:00 GMT")
+
+    async def main():
+        current_revalidation.set(Revalidation(previous=previous))
+        with pytest.raises(NotModified):
+            await conditional_get(create_client(requests, status_code=304), "https://upstream/")
+
+    asyncio.run(main())
+    assert requests[0].headers["If-None-Match"] == '"old"'
+    assert requests[0].headers["If-Modified-Since"] == "Sun, 31 Dec 2023 00:00:00 GMT"
+
+
+def test_validators_of_new_responses_are_recorded_for_the_first_request_only():
+    requests = []
+    previous = CacheEntry(value=1, created_at=0, fresh_until=0, etag='"old"')
+
+    async def main():
+        revalidation = Revalidation(previous=previous)
+        current_revalidation.set(revalidation)
+        client = create_client(requests)
+        await conditional_get(client, "https://upstream/first")
+        await conditional_get(client, "https://upstream/second")
+        return revalidation
+
+    revalidation = asyncio.run(main())
+    assert revalidation.etag == '"new"'
+    assert revalidation.last_modified == "Mon, 01 Jan 2024 00:00:00 GMT"
+    assert "If-None-Match" in requests[0].headers
+    assert "If-None-Match" not in requests[1].headers
@@ -0,0 +1,103 @@
+import hashlib
+
+import httpx
+import pytest
+from starlette.testclient import TestClient
+
+from app import upstream
+from app.main import app
+from tests.stubs import StubModrinth, create_version
+
+MODRINTH = "/repository/com/modrinth/paper/routed"
+HANGAR = "/repository/io/papermc/hangar/paper/Routed/1.0"
+
+
+def handle_hangar(request: httpx.Request) -> httpx.Response:
+    # Hangar only provides the SHA-256 hash of the files it hosts
+    return httpx.Response(200, json={"name": "1.0", "createdAt": "2024-01-01T00:00:00Z",
+                                     "downloads": {"PAPER": {"fileInfo": {"sha256Hash": "hangar-sha256"}}}})
+
+
+@pytest.fixture
+def client(monkeypatch):
+    stub = StubModrinth([create_version("R2", "2.0", ["paper"], project_id="routed"),
+                         create_version("R1", "1.0", ["paper"], project_id="routed")])
+    monkeypatch.setitem(upstream._clients, "modrinth", httpx.AsyncClient(transport=httpx.MockTransport(stub.handle)))
+    monkeypatch.setitem(upstream._clients, "hangar", httpx.AsyncClient(transport=httpx.MockTransport(handle_hangar)))
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("path", [f"{MODRINTH}/2.0/routed-2.0.pom", f"{MODRINTH}/maven-metadata.xml"])
+@pytest.mark.parametrize("algorithm", ["md5", "sha1", "sha256", "sha512"])
+def test_checksums_of_rendered_files_match_their_body(client, path, algorithm):
+    body = client.get(path).content
+    response = client.get(f"{path}.{algorithm}")
+    assert response.status_code == 200
+    assert response.text == hashlib.new(algorithm, body).hexdigest()
+    assert response.headers["Content-Type"].startswith("text/plain")
+    assert response.headers["ETag"] != client.get(path).headers["ETag"]
+
+
+@pytest.mark.parametrize("path, algorithm, checksum", [
+    (f"{MODRINTH}/2.0/routed-2.0.jar", "sha1", "R2-sha1"),
+    (f"{MODRINTH}/2.0/routed-2.0.jar", "sha512", "R2-sha512"),
+    (f"{HANGAR}/Routed-1.0.jar", "sha256", "hangar-sha256"),
+])
+def test_checksums_of_jars_are_the_ones_of_the_backend(client, path, algorithm, checksum):
+    response = client.get(f"{path}.{algorithm}")
+    assert response.status_code == 200
+    assert response.text == checksum
+    assert response.headers["Cache-Control"].startswith("public, max-age=")
+
+
+@pytest.mark.parametrize("path, algorithm", [
+    (f"{MODRINTH}/2.0/routed-2.0.jar", "md5"),
+    (f"{MODRINTH}/2.0/routed-2.0.jar", "sha256"),
+    (f"{HANGAR}/Routed-1.0.jar", "sha1"),
+])
+def test_checksums_unknown_to_the_backend_are_missing(client, path, algorithm):
+    response = client.get(f"{path}.{algorithm}")
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Checksum not available"
+
+
+@pytest.mark.parametrize("path", [f"{MODRINTH}/2.0/routed-2.0.jar.crc32", f"{MODRINTH}/2.0/routed-2.0.pom.crc32",
+                                  f"{MODRINTH}/maven-metadata.xml.crc32"])
+def test_unsupported_checksum_algorithms_are_missing(client, path):
+    response = client.get(path)
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Checksum algorithm not supported"
+
+
+def test_checksums_are_answered_conditionally(client):
+    response = client.get(f"{MODRINTH}/2.0/routed-2.0.pom.sha1")
+    assert client.get(f"{MODRINTH}/2.0/routed-2.0.pom.sha1",
+                      headers={"If-None-Match": response.headers["ETag"]}).status_code == 304
+
+
+@pytest.mark.parametrize("path", [f"{MODRINTH}/2.0/routed-2.0.pom", f"{MODRINTH}/maven-metadata.xml",
+                                  f"{MODRINTH}/2.0/routed-2.0.pom.sha1", f"{MODRINTH}/maven-metadata.xml.md5",
+                                  f"{MODRINTH}/2.0/routed-2.0.jar.sha512", f"{HANGAR}/Routed-1.0.jar.sha256"])
+@pytest.mark.parametrize("encoding", ["identity", "gzip"])
+def test_head_requests_get_the_headers_of_get_requests(client, path, encoding):
+    get = client.get(path, headers={"Accept-Encoding": encoding})
+    head = client.head(path, headers={"Accept-Encoding": encoding})
+    assert head.status_code == get.status_code == 200
+    assert head.content == b""
+    assert dict(head.headers) == dict(get.headers)
+    if encoding == "identity":
+        assert int(head.headers["Content-Length"]) == len(get.content)
+
+
+@pytest.mark.parametrize("path", [f"{MODRINTH}/2.0/routed-2.0.jar", f"{HANGAR}/Routed-1.0.jar"])
+@pytest.mark.parametrize("method", ["GET", "HEAD"])
+def test_jars_are_redirected_to_the_backend_with_caching_headers(client, path, method):
+    response = client.request(method, path, follow_redirects=False)
+    assert response.status_code == 307
+    assert response.headers["Location"].startswith("https://")
+    assert response.headers["Cache-Control"].startswith("public, max-age=")
+
+
+def test_head_requests_of_missing_artifacts_are_missing(client):
+    assert client.head(f"{MODRINTH}/9.0/routed-9.0.pom").status_code == 404
+    assert client.head("/repository/com/modrinth/paper/unknown/maven-metadata.xml").status_code == 404
@@ -0,0 +1,61 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from app.cache.entry import CacheEntry
+from app.cache.serializers import ModelSerializer
+from app.cache.sqlite import SQLiteCache
+from app.models.modrinth import Dependency, FileHashes
+
+
+def test_models_round_trip_with_their_exact_class():
+    serializer = ModelSerializer()
+    dependency = Dependency(version_id="v1", project_id="p1", file_name=None, dependency_type="required")
+    value = {"dependencies": [dependency], "published": datetime(2024, 1, 2, 3, 4, 5), "pair": ("a", 1)}
+
+    loaded = serializer.loads(serializer.dumps(value))
+    assert loaded == value
+    assert type(loaded["dependencies"][0]) is Dependency
+    assert isinstance(loaded["pair"], tuple)
+
+
+def test_cache_entries_round_trip():
+    serializer = ModelSerializer()
+    entry = CacheEntry(value=[FileHashes(sha1="a", sha512="b")], created_at=1.0, fresh_until=None, etag='"x"')
+    assert serializer.loads(serializer.dumps(entry)) == entry
+
+
+def test_large_payloads_are_compressed():
+    serializer = ModelSerializer(compress_threshold=100)
+    assert serializer.dumps("x" * 10)[:1] == b"j"
+    dumped = serializer.dumps("x" * 1000)
+    assert dumped[:1] == b"z"
+    assert len(dumped) < 100
+    assert serializer.loads(dumped) == "x" * 1000
+
+
+def test_unknown_models_are_not_restored():
+    serializer = ModelSerializer()
+    with pytest.raises(ValueError):
+        serializer.loads(b'j{"$model":"Popen","$fields":{}}')
+    with pytest.raises(ValueError):
+        serializer.loads(b"?")
+
+
+def test_sqlite_cache_round_trip_and_increment(tmp_path):
+    cache = SQLiteCache(path=str(tmp_path / "cache.sqlite3"), namespace="test:", max_size=2)
+
+    async def main():
+        await cache.set("a", {"value": [1, 2]})
+        assert await cache.get("a") == {"value": [1, 2]}
+        assert await cache.increment("counter") == 1
+        assert await cache.increment("counter", 2) == 3
+        assert await cache.get("counter") == 3
+        with pytest.raises(TypeError):
+            await cache.increment("a")
+        # The least recently used entry is evicted
+        await cache.set("b", "b")
+        assert await cache.get("a") is None
+
+    asyncio.run(main())
@@ -0,0 +1,70 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.metrics import current_endpoint
+from app.timeouts import DeadlineTransport, LatencyTracker, LatencyTransport, current_deadline, deadline
+
+
+def create_transport(seconds: float) -> httpx.MockTransport:
+    async def handle(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(seconds)
+        return httpx.Response(200)
+
+    return httpx.MockTransport(handle)
+
+
+def test_deadline_replaces_the_one_of_the_request():
+    async def main():
+        current_deadline.set(1.0)
+        with deadline(10):
+            assert current_deadline.get() > asyncio.get_running_loop().time() + 9
+            with deadline(0):
+                assert current_deadline.get() is None
+        assert current_deadline.get() == 1.0
+
+    asyncio.run(main())
+
+
+def test_requests_are_cut_at_the_deadline():
+    tracker = LatencyTracker("test", quantile=0.95, min_delay=0.01)
+
+    async def main():
+        async with httpx.AsyncClient(transport=DeadlineTransport(create_transport(0.2), tracker)) as client:
+            with deadline(0.05), pytest.raises(httpx.TimeoutException):
+                await client.get("https://upstream/")
+            with deadline(1):
+                assert (await client.get("https://upstream/", timeout=0.5)).status_code == 200
+
+    asyncio.run(main())
+    assert tracker.deadline_exceeded == 1
+
+
+def test_hedging_delay_is_a_quantile_of_latencies():
+    tracker = LatencyTracker("test", quantile=0.9, min_delay=0.05, min_samples=10)
+    for latency in [0.1] * 9:
+        tracker.observe("fetch", latency)
+    assert tracker.get_delay("fetch") is None
+    tracker.observe("fetch", 1.0)
+    assert tracker.get_delay("fetch") == 0.1
+    assert tracker.get_delay("other") is None
+
+
+def test_latencies_of_cancelled_requests_only_count_when_slow():
+    tracker = LatencyTracker("test", quantile=0.5, min_delay=0.01, min_samples=1)
+    tracker.observe("fetch", 0.02)
+
+    async def main():
+        current_endpoint.set("fetch")
+        transport = LatencyTransport(create_transport(1), tracker)
+        for seconds in (0.001, 0.05):
+            request = asyncio.ensure_future(transport.handle_async_request(httpx.Request("GET", "https://upstream/")))
+            await asyncio.sleep(seconds)
+            request.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await request
+
+    asyncio.run(main())
+    latencies = tracker._latencies["fetch"]
+    assert len(latencies) == 2 and latencies[-1] >= 0.05